@@ -4,11 +4,12 @@ Grid actions.
 Should be used in replay and undo features.
 """
 
-from dataclasses import dataclass, field
+from array import array
+from dataclasses import dataclass
 from layer_util import Layer
 from grid import Grid
 
-@dataclass
+@dataclass(slots=True)
 class PaintStep:
 
     affected_grid_square: tuple[int, int]
@@ -23,25 +24,136 @@ class PaintStep:
         sq.add(self.affected_layer)
 
 
-@dataclass
+class PaintSteps(list):
+    """
+    The steps of a PaintAction as PaintStep objects, built on request.
+    Compares equal to a list of the same steps, but cannot be changed, since changing it
+    would not change the action: use PaintAction.add or add_step.
+    """
+    __slots__ = ()
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("PaintAction.steps is read-only, use PaintAction.add or add_step")
+
+    append = extend = insert = remove = pop = clear = sort = reverse = _read_only
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+
+
 class PaintAction:
+    """
+    A list of paint steps, stored packed rather than as PaintStep objects.
+
+    Attributes:
+        cells (array[int]): the affected squares, packed as `x << 16 | y`.
+        layers (list[Layer]): the distinct layers used by this action.
+        layer_ids (array[int] | None): for each step, the index into `layers` of its layer.
+            None while the whole action uses a single layer, which is the case for every paint.
+        is_special (bool): whether this is a special action rather than a paint.
+
+    `steps` still gives the action as a read-only list of PaintSteps, built on request.
+    """
+
+    __slots__ = ('cells', 'layers', 'layer_ids', 'is_special')
+
+    CELL_BITS = 16
+    CELL_MASK = (1 << CELL_BITS) - 1
+    # Rough size of an action object with its arrays and palette, excluding the steps themselves.
+    BASE_NBYTES = 256
+
+    def __init__(self, steps: list[PaintStep] | None = None, is_special: bool = False) -> None:
+        self.cells = array('I')
+        self.layers = []
+        self.layer_ids = None
+        self.is_special = is_special
+        for step in steps or ():
+            self.add_step(step)
 
-    steps: list[PaintStep] = field(default_factory=list)
-    is_special: bool = False
+    @property
+    def steps(self) -> PaintSteps:
+        return PaintSteps(PaintStep((x, y), layer) for x, y, layer in self)
+
+    def __iter__(self):
+        """ Iterates the steps as (x, y, layer) triples. """
+        mask, bits, layers = self.CELL_MASK, self.CELL_BITS, self.layers
+        if self.layer_ids is None:
+            for cell in self.cells:
+                yield cell >> bits, cell & mask, layers[0]
+        else:
+            for cell, layer_id in zip(self.cells, self.layer_ids):
+                yield cell >> bits, cell & mask, layers[layer_id]
+
+    def __len__(self) -> int:
+        """ The number of steps in the action. """
+        return len(self.cells)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, PaintAction):
+            return NotImplemented
+        return self.is_special == other.is_special and list(self) == list(other)
+
+    def __repr__(self) -> str:
+        return f"PaintAction(steps={self.steps!r}, is_special={self.is_special!r})"
+
+    def nbytes(self) -> int:
+        """ Estimated memory held by this action, from its number of steps. """
+        per_step = self.cells.itemsize
+        if self.layer_ids is not None:
+            per_step += self.layer_ids.itemsize
+        return self.BASE_NBYTES + per_step * len(self.cells)
 
     def undo_apply(self, grid: Grid):
         if self.is_special:
             grid.special()
             return
-        for step in self.steps:
-            step.undo_apply(grid)
+        mask, bits = self.CELL_MASK, self.CELL_BITS
+        if self.layer_ids is None:
+            if self.cells:
+                layer = self.layers[0]
+                for cell in self.cells:
+                    grid[cell >> bits][cell & mask].erase(layer)
+            return
+        layers = self.layers
+        for cell, layer_id in zip(self.cells, self.layer_ids):
+            grid[cell >> bits][cell & mask].erase(layers[layer_id])
 
     def redo_apply(self, grid: Grid):
         if self.is_special:
             grid.special()
             return
-        for step in self.steps:
-            step.redo_apply(grid)
+        mask, bits = self.CELL_MASK, self.CELL_BITS
+        if self.layer_ids is None:
+            if self.cells:
+                layer = self.layers[0]
+                for cell in self.cells:
+                    grid[cell >> bits][cell & mask].add(layer)
+            return
+        layers = self.layers
+        for cell, layer_id in zip(self.cells, self.layer_ids):
+            grid[cell >> bits][cell & mask].add(layers[layer_id])
 
     def add_step(self, step: PaintStep):
-        self.steps.append(step)
+        self.add(step.affected_grid_square[0], step.affected_grid_square[1], step.affected_layer)
+
+    def add(self, x: int, y: int, layer: Layer):
+        """
+        Add the step painting `layer` on square (x, y).
+        :raises ValueError: if x or y is not in between 0 and 2**16 - 1, as they could not be packed.
+        """
+        if not (0 <= x <= self.CELL_MASK and 0 <= y <= self.CELL_MASK):
+            raise ValueError(f"Square ({x}, {y}) is outside the 0 to {self.CELL_MASK} range of a PaintAction")
+        self.cells.append(x << self.CELL_BITS | y)
+        layers = self.layers
+        for layer_id in range(len(layers)):
+            if layers[layer_id] is layer:
+                break
+        else:
+            layer_id = len(layers)
+            layers.append(layer)
+        if self.layer_ids is None:
+            if layer_id == 0:
+                return
+            # A second layer: every earlier step used the first one.
+            self.layer_ids = array('B', bytes(len(self.cells) - 1))
+        elif layer_id > 0xFF and self.layer_ids.typecode == 'B':
+            self.layer_ids = array('H', self.layer_ids)
+        self.layer_ids.append(layer_id)
@@ -0,0 +1,134 @@
+from __future__ import annotations
+"""
+Append-only log of replay entries, read through independent cursors.
+"""
+
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import weakref
+from action import PaintAction
+
+
+class ActionLog:
+    """
+    Append-only log of (action, is_undo) entries, with no fixed capacity.
+
+    Entries are stored in chunks of `chunk_size`. When `max_resident_chunks` is given,
+    full chunks beyond that many are pickled to files in `spill_dir` (a temporary
+    directory by default) and loaded back when a cursor reaches them.
+    Reading never removes anything, so any number of cursors can read the log independently.
+    Appending and reading hold a lock, so cursors on other threads (such as the background
+    compaction of ReplayTracker) can read the log while it is appended to.
+    """
+
+    CHUNK_SIZE = 1024
+
+    def __init__(self, chunk_size: int = CHUNK_SIZE, max_resident_chunks: int | None = None,
+                 spill_dir: str | None = None) -> None:
+        self.chunk_size = chunk_size
+        self.max_resident_chunks = max_resident_chunks
+        self.spill_dir = spill_dir
+        self.length = 0
+        self.lock = threading.Lock()
+        # Each chunk is a list of entries while in memory, or the path of its file once spilled.
+        self.chunks = []
+        self.resident = []
+        # (chunk index, entries) of the last spilled chunk read back.
+        self.loaded = None
+        self.owns_spill_dir = max_resident_chunks is not None and spill_dir is None
+        if self.owns_spill_dir:
+            self.spill_dir = tempfile.mkdtemp(prefix="actionlog-")
+            weakref.finalize(self, shutil.rmtree, self.spill_dir, True)
+
+    def empty_copy(self) -> ActionLog:
+        """ Returns a new empty log with the same chunking and spilling settings. """
+        return ActionLog(self.chunk_size, self.max_resident_chunks,
+                         None if self.owns_spill_dir else self.spill_dir)
+
+    def __len__(self) -> int:
+        return self.length
+
+# Complexity analysis:
+# O(1), plus O(chunk_size) when a full chunk is spilled to disk.
+    def append(self, action: PaintAction, is_undo: bool = False) -> None:
+        """ Adds an entry at the end of the log. """
+        with self.lock:
+            if self.length % self.chunk_size == 0:
+                self.chunks.append([])
+                self.resident.append(len(self.chunks) - 1)
+                self._spill()
+            self.chunks[-1].append((action, is_undo))
+            self.length += 1
+
+    def _spill(self) -> None:
+        """ Writes the oldest full chunks to disk until few enough are left in memory. """
+        if self.max_resident_chunks is None:
+            return
+        # The last chunk is still being written to, so it always stays in memory.
+        while len(self.resident) > self.max_resident_chunks + 1:
+            index = self.resident.pop(0)
+            # A unique new file, so logs sharing a spill_dir never overwrite each other's chunks.
+            fd, path = tempfile.mkstemp(prefix=f"chunk-{index}-", suffix=".pickle", dir=self.spill_dir)
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(self.chunks[index], f, pickle.HIGHEST_PROTOCOL)
+            self.chunks[index] = path
+
+# Complexity analysis:
+# O(1) for entries in memory. Reading a spilled chunk loads it whole, O(chunk_size),
+# and it is kept until another spilled chunk is read, so sequential reads stay O(1) amortised.
+    def __getitem__(self, index: int) -> tuple[PaintAction, bool]:
+        """ Returns the entry at position index. """
+        if not 0 <= index < self.length:
+            raise IndexError("No such entry in the log")
+        chunk_index, offset = divmod(index, self.chunk_size)
+        with self.lock:
+            chunk = self.chunks[chunk_index]
+            if isinstance(chunk, str):
+                if self.loaded is None or self.loaded[0] != chunk_index:
+                    with open(chunk, "rb") as f:
+                        self.loaded = (chunk_index, pickle.load(f))
+                chunk = self.loaded[1]
+            return chunk[offset]
+
+    def cursor(self, position: int = 0) -> LogCursor:
+        """ Returns a new cursor reading the log from position. """
+        return LogCursor(self, position)
+
+
+class LogCursor:
+    """
+    Read position in an ActionLog. Cursors never change the log, so replays can be
+    paused, restarted, or run side by side.
+    """
+    __slots__ = ('log', 'position')
+
+    def __init__(self, log: ActionLog, position: int = 0) -> None:
+        self.log = log
+        self.position = position
+
+    def has_next(self) -> bool:
+        """ True if there are entries after the cursor. """
+        return self.position < len(self.log)
+
+    def remaining(self) -> int:
+        """ The number of entries after the cursor. """
+        return len(self.log) - self.position
+
+    def next(self) -> tuple[PaintAction, bool]:
+        """ Returns the entry at the cursor and moves past it.
+        :raises IndexError: if there are no entries left
+        """
+        entry = self.log[self.position]
+        self.position += 1
+        return entry
+
+    def seek(self, position: int) -> None:
+        """ Moves the cursor to position, clamped to the log. """
+        self.position = max(0, min(position, len(self.log)))
+
+    def reset(self) -> None:
+        """ Moves the cursor back to the start of the log. """
+        self.position = 0
@@ -0,0 +1,106 @@
+"""
+Colour allocations per frame: tuple-returning layers vs the in-place protocol.
+
+Evaluates one frame of a painted grid in each draw style, both through
+LayerStore.get_color (a start colour list per square, a new tuple per layer)
+and through LayerStore.get_color_into (one reusable buffer per frame).
+
+The colour objects created during the frame are counted by keeping each one alive
+until the frame ends: the start colours, and every value a layer returns.
+Time per frame is measured separately, without the counting.
+
+    python -m benchmarks.colour_allocations [--size 32] [--frames 20]
+"""
+
+import argparse
+import time
+
+from grid import Grid
+from layer_util import get_layers
+
+BG = [255, 255, 255]
+
+
+def painted_grid(draw_style: str, size: int) -> Grid:
+    """ A grid with a few overlapping layers on every square. """
+    layers = [layer for layer in get_layers() if layer is not None]
+    grid = Grid(draw_style, size, size)
+    for x in range(size):
+        for y in range(size):
+            for k in range(3):
+                grid[x][y].add(layers[(x * 7 + y * 3 + k * 5) % len(layers)])
+    return grid
+
+
+def frame_tuples(grid: Grid, size: int, timestamp: float) -> None:
+    for x in range(size):
+        for y in range(size):
+            grid[x][y].get_color(BG[:], timestamp, x, y)
+
+
+def frame_into(grid: Grid, size: int, timestamp: float) -> None:
+    rgb = bytearray(3)
+    bg_r, bg_g, bg_b = BG
+    for x in range(size):
+        for y in range(size):
+            rgb[0] = bg_r
+            rgb[1] = bg_g
+            rgb[2] = bg_b
+            grid[x][y].get_color_into(rgb, timestamp, x, y)
+
+
+def count_colours(grid: Grid, size: int, frame) -> int:
+    """ Runs one frame, counting every start colour and layer result created during it. """
+    global BG
+    created = []
+    layers = [layer for layer in get_layers() if layer is not None]
+    originals = [layer.apply for layer in layers]
+
+    def keeping(apply):
+        def wrapper(color, timestamp, x, y):
+            result = apply(color, timestamp, x, y)
+            created.append(result)
+            return result
+        return wrapper
+
+    background = BG
+
+    class CountingList(list):
+        def __getitem__(self, index):
+            result = list.__getitem__(self, index)
+            if isinstance(index, slice):
+                created.append(result)
+            return result
+
+    for layer in layers:
+        layer.apply = keeping(layer.apply)
+    BG = CountingList(background)
+    try:
+        frame(grid, size, 0)
+    finally:
+        BG = background
+        for layer, apply in zip(layers, originals):
+            layer.apply = apply
+    return len(created)
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    p.add_argument("--size", type=int, default=32)
+    p.add_argument("--frames", type=int, default=20)
+    args = p.parse_args()
+
+    print(f"{'style':>8} {'protocol':>8} {'colours/frame':>14} {'ms/frame':>9}")
+    for draw_style in Grid.DRAW_STYLE_OPTIONS:
+        grid = painted_grid(draw_style, args.size)
+        for name, frame in [("tuple", frame_tuples), ("into", frame_into)]:
+            colours = count_colours(grid, args.size, frame)
+            start = time.perf_counter()
+            for i in range(args.frames):
+                frame(grid, args.size, i / 60)
+            elapsed = (time.perf_counter() - start) / args.frames
+            print(f"{draw_style:>8} {name:>8} {colours:>14} {elapsed * 1000:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
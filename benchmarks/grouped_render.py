@@ -0,0 +1,64 @@
+"""
+Frame time of the grouped renderer against evaluating every square.
+
+Paints a size x size canvas of each draw style in blocks of flat colour, with a share
+of the squares (--animated) under the animated rainbow layer, then times frames rendered
+by render.render_rgb, which evaluates the layers of every square, and by GroupedRenderer,
+which evaluates each distinct stack once and only the animated squares every frame.
+
+    python -m benchmarks.grouped_render [--size 256] [--frames 5] [--animated 0.05]
+"""
+
+import argparse
+import random
+import time
+
+from grid import Grid
+from layers import blue, darken, invert, lighten, rainbow, red
+from render import GroupedRenderer, render_rgb
+
+
+def painted_grid(draw_style: str, size: int, animated: float) -> Grid:
+    grid = Grid(draw_style, size, size)
+    stacks = [(red,), (blue, lighten), (invert,), (red, darken, invert)]
+    rng = random.Random(size)
+    for x in range(size):
+        for y in range(size):
+            layers = stacks[(x // 32 + y // 32) % len(stacks)]
+            if rng.random() < animated:
+                layers = layers + (rainbow,)
+            for layer in layers:
+                grid[x][y].add(layer)
+    return grid
+
+
+def per_frame(render, frames: int) -> float:
+    start = time.perf_counter()
+    for frame in range(frames):
+        render(frame / 10)
+    return (time.perf_counter() - start) / frames
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    p.add_argument("--size", type=int, default=256)
+    p.add_argument("--frames", type=int, default=5)
+    p.add_argument("--animated", type=float, default=0.05, help="share of squares under the rainbow layer")
+    args = p.parse_args()
+
+    print(f"{args.size}x{args.size} canvas, {args.animated:.0%} animated squares")
+    for draw_style in Grid.DRAW_STYLE_OPTIONS:
+        grid = painted_grid(draw_style, args.size, args.animated)
+        every = per_frame(lambda timestamp: render_rgb(grid, 1, timestamp), args.frames)
+        renderer = GroupedRenderer(grid)
+        start = time.perf_counter()
+        renderer.render(0)
+        first = time.perf_counter() - start
+        grouped = per_frame(renderer.render, args.frames)
+        print(f"{draw_style:>8}  every square {every * 1000:8.1f} ms  grouped {grouped * 1000:8.1f} ms "
+              f"(x{every / grouped:.1f}, first frame {first * 1000:.1f} ms, "
+              f"{len(renderer.groups)} groups, {len(renderer.animated)} animated)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Recovery time for a journal of paint steps.
+
+Writes a journal of brush-sized paint actions (with some undos and redos) totalling
+--steps paint steps, then times reading it back with the streaming reader, and
+reading it back while applying every action to a grid.
+
+    python -m benchmarks.journal_recovery [--steps 1000000] [--style SET] [--size 256]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from action import PaintAction
+from grid import Grid
+from journal import Journal
+from layer_util import get_layers
+
+
+def write_journal(path: str, steps: int, draw_style: str, size: int) -> int:
+    """ Writes a journal with at least `steps` paint steps, and returns the number of records. """
+    layers = [layer for layer in get_layers() if layer is not None]
+    journal = Journal(path, fsync_interval=None)
+    journal.start()
+    journal.reset(draw_style, size, size)
+    written = 0
+    i = 0
+    previous = None
+    while written < steps:
+        action = PaintAction()
+        px, py = i * 7 % (size - 4) + 2, i * 3 // (size - 4) * 5 % (size - 4) + 2
+        for dx in range(-2, 3):
+            for dy in range(-2 + abs(dx), 3 - abs(dx)):
+                action.add(px + dx, py + dy, layers[i % len(layers)])
+        journal.record(action)
+        written += len(action)
+        # Every 10th action is undone and redone again, as happens with ctrl-z / ctrl-y.
+        if previous is not None and i % 10 == 0:
+            journal.record(previous, True)
+            journal.record(previous, False)
+        previous = action
+        i += 1
+    journal.close()
+    return journal.seq
+
+
+def recover(path: str, apply: bool) -> float:
+    """ Seconds taken to read the journal back, applying every action to a grid if asked. """
+    start = time.perf_counter()
+    grid = None
+    for record in Journal(path).recover():
+        if record.action is None:
+            grid = Grid(record.draw_style, record.width, record.height) if apply else None
+        elif grid is not None:
+            if record.is_undo:
+                record.action.undo_apply(grid)
+            else:
+                record.action.redo_apply(grid)
+    return time.perf_counter() - start
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    p.add_argument("--steps", type=int, default=1_000_000)
+    p.add_argument("--style", choices=Grid.DRAW_STYLE_OPTIONS, default=Grid.DRAW_STYLE_SET)
+    p.add_argument("--size", type=int, default=256)
+    args = p.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "benchmark.journal")
+        start = time.perf_counter()
+        records = write_journal(path, args.steps, args.style, args.size)
+        written = time.perf_counter() - start
+        size = os.path.getsize(path)
+        print(f"journal:        {records} records, {args.steps} steps, {size / 2**20:.1f} MiB "
+              f"({size / args.steps:.2f} bytes per step)")
+        print(f"write:          {written:8.2f} s")
+        print(f"read:           {recover(path, False):8.2f} s")
+        print(f"read and apply: {recover(path, True):8.2f} s")
+
+
+if __name__ == "__main__":
+    main()
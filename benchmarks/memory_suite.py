@@ -0,0 +1,201 @@
+"""
+Memory benchmark suite: grids of each draw style and size, and paint histories.
+
+Every case runs in a fresh interpreter, so that its RSS is not mixed up with the
+cases before it. For each draw style and grid size it reports the construction time,
+the growth of RSS and the peak RSS, the tracemalloc peak, and the top allocation sites.
+The history cases report the memory per 1k brush-sized paint actions held by an
+UndoTracker, and per entry of a ReplayTracker.
+
+The results are written as JSON, with the commit they were measured at, and
+--compare prints the change of each figure against an earlier report.
+
+    python -m benchmarks.memory_suite [--sizes 16 32] [--actions 10000] [-o memory.json] [--compare old.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOP_SITES = 5
+
+
+def current_rss() -> int | None:
+    """ Resident memory of this process in bytes, where /proc can be read. """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def traced(build) -> dict:
+    """ Runs build() under tracemalloc, and returns its peak and the top allocation sites of what it keeps. """
+    tracemalloc.start()
+    result = build()
+    current, peak = tracemalloc.get_traced_memory()
+    statistics = tracemalloc.take_snapshot().statistics("lineno")
+    tracemalloc.stop()
+    del result
+    return {
+        "tracemalloc_current": current,
+        "tracemalloc_peak": peak,
+        "top_sites": [
+            {"site": f"{os.path.relpath(stat.traceback[0].filename, ROOT)}:{stat.traceback[0].lineno}",
+             "size": stat.size, "count": stat.count}
+            for stat in statistics[:TOP_SITES]
+        ],
+    }
+
+
+def grid_case(draw_style: str, size: int) -> dict:
+    from grid import Grid
+    from replay_cli import peak_rss
+
+    rss = current_rss()
+    start = time.perf_counter()
+    grid = Grid(draw_style, size, size)
+    seconds = time.perf_counter() - start
+    after = current_rss()
+    del grid
+    result = {
+        "construct_seconds": seconds,
+        "rss_growth": None if rss is None or after is None else after - rss,
+        "peak_rss": peak_rss(),
+    }
+    result.update(traced(lambda: Grid(draw_style, size, size)))
+    return result
+
+
+def paint_actions(count: int):
+    """ count diamond, brush size 2, paint actions spread over a 200x200 canvas. """
+    from action import PaintAction
+    from layer_util import layer_list
+
+    layers = layer_list()
+    for i in range(count):
+        action = PaintAction()
+        for dx in range(-2, 3):
+            for dy in range(-2 + abs(dx), 3 - abs(dx)):
+                action.add(i % 200 + dx + 2, i // 200 % 200 + dy + 2, layers[i % len(layers)])
+        yield action
+
+
+def history_case(actions: int) -> dict:
+    from replay import ReplayTracker
+    from undo import UndoTracker
+
+    def undo():
+        tracker = UndoTracker()
+        for action in paint_actions(actions):
+            tracker.add_action(action)
+        return tracker
+
+    def replay():
+        tracker = ReplayTracker()
+        for action in paint_actions(actions):
+            tracker.add_action(action, False)
+        return tracker
+
+    undo_result = traced(undo)
+    replay_result = traced(replay)
+    return {
+        "undo_bytes_per_1k_actions": undo_result["tracemalloc_current"] * 1000 / actions,
+        "replay_bytes_per_entry": replay_result["tracemalloc_current"] / actions,
+        "top_sites": undo_result["top_sites"],
+    }
+
+
+def run_case(case: dict) -> dict:
+    """ Runs a case in a fresh interpreter, and returns its results (or the error that stopped it). """
+    process = subprocess.run(
+        [sys.executable, "-m", "benchmarks.memory_suite", "--case", json.dumps(case)],
+        capture_output=True, text=True, cwd=ROOT,
+    )
+    if process.returncode != 0:
+        lines = process.stderr.strip().splitlines()
+        return dict(case, error=lines[-1] if lines else f"exit code {process.returncode}")
+    return dict(case, **json.loads(process.stdout))
+
+
+def commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, cwd=ROOT, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def case_name(case: dict) -> str:
+    if case["kind"] == "grid":
+        return f"{case['draw_style']} {case['size']}x{case['size']}"
+    return f"history {case['actions']}"
+
+
+def compare(report: dict, old: dict) -> None:
+    """ Prints the change of every figure of report against the old one. """
+    previous = {case_name(case): case for case in old["cases"]}
+    print(f"\nchanges since {old.get('commit') or 'the old report'}:")
+    for case in report["cases"]:
+        before = previous.get(case_name(case))
+        if before is None:
+            continue
+        for key, value in case.items():
+            old_value = before.get(key)
+            if isinstance(value, (int, float)) and isinstance(old_value, (int, float)) and old_value \
+                    and key not in ("size", "actions"):
+                print(f"{case_name(case):>20} {key:>28}: {old_value:>14.6g} -> {value:>14.6g} ({(value - old_value) / old_value:+.1%})")
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    p.add_argument("--sizes", type=int, nargs="+", default=[16, 32])
+    p.add_argument("--actions", type=int, default=10000)
+    p.add_argument("-o", "--output", default="memory.json", help="JSON report (default: memory.json)")
+    p.add_argument("--compare", help="earlier JSON report to compare against")
+    p.add_argument("--case", help=argparse.SUPPRESS)
+    args = p.parse_args()
+
+    if args.case:
+        case = json.loads(args.case)
+        if case["kind"] == "grid":
+            result = grid_case(case["draw_style"], case["size"])
+        else:
+            result = history_case(case["actions"])
+        print(json.dumps(result))
+        return
+
+    from grid import Grid
+    cases = [{"kind": "grid", "draw_style": draw_style, "size": size}
+             for draw_style in Grid.DRAW_STYLE_OPTIONS for size in args.sizes]
+    cases.append({"kind": "history", "actions": args.actions})
+
+    report = {"commit": commit(), "python": platform.python_version(), "platform": platform.platform(), "cases": []}
+    for case in cases:
+        result = run_case(case)
+        report["cases"].append(result)
+        if "error" in result:
+            print(f"{case_name(case):>20}  failed: {result['error']}")
+        elif case["kind"] == "grid":
+            rss = "?" if result["rss_growth"] is None else f"{result['rss_growth'] / 2**20:.1f}"
+            print(f"{case_name(case):>20}  {result['construct_seconds']:7.3f} s  RSS +{rss} MiB  "
+                  f"traced peak {result['tracemalloc_peak'] / 2**20:.1f} MiB  top: {result['top_sites'][0]['site']}")
+        else:
+            print(f"{case_name(case):>20}  undo {result['undo_bytes_per_1k_actions'] / 1024:.1f} KiB per 1k actions, "
+                  f"replay {result['replay_bytes_per_entry']:.1f} B per entry")
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"report written to {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
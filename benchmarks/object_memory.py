@@ -0,0 +1,91 @@
+"""
+Memory report for the core object model.
+
+Measures, with tracemalloc, the memory held by a 256x256 grid in each draw style
+and by a 10k-action paint history in the undo and replay trackers.
+
+    python -m benchmarks.object_memory [--size 256] [--actions 10000]
+
+The SEQUENCE store preallocates large arrays, so building a full grid of them
+does not fit in memory. For that style a strip of the grid is built and the
+result is scaled up to the full size (marked with `~`).
+"""
+
+import argparse
+import tracemalloc
+
+from action import PaintAction
+from grid import Grid
+from layer_util import get_layers
+from replay import ReplayTracker
+from undo import UndoTracker
+
+MAX_CELLS = {
+    Grid.DRAW_STYLE_SET: None,
+    Grid.DRAW_STYLE_ADD: None,
+    Grid.DRAW_STYLE_SEQUENCE: 1024,
+}
+
+
+def measure(build):
+    """ Returns the memory held by the result of build(), and the result itself. """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return after - before, result
+
+
+def grid_memory(draw_style: str, size: int) -> tuple[int, bool]:
+    """ Bytes held by a size x size grid, and whether that was extrapolated from a strip. """
+    max_cells = MAX_CELLS[draw_style]
+    rows = size if max_cells is None else max(1, min(size, max_cells // size))
+    layers = [layer for layer in get_layers() if layer is not None]
+
+    def build():
+        grid = Grid(draw_style, size, rows)
+        for x in range(size):
+            for y in range(rows):
+                grid[x][y].add(layers[(x + y) % len(layers)])
+        return grid
+
+    used, _ = measure(build)
+    return used * size // rows, rows != size
+
+
+def history_memory(actions: int) -> int:
+    """ Bytes held by `actions` brush-sized paint actions in the undo and replay trackers. """
+    layers = [layer for layer in get_layers() if layer is not None]
+
+    def build():
+        undo = UndoTracker()
+        replay = ReplayTracker()
+        for i in range(actions):
+            action = PaintAction()
+            for dx in range(-2, 3):
+                for dy in range(-2 + abs(dx), 3 - abs(dx)):
+                    action.add(i % 200 + dx + 2, i // 200 % 200 + dy + 2, layers[i % len(layers)])
+            undo.add_action(action)
+            replay.add_action(action)
+        return undo, replay
+
+    used, _ = measure(build)
+    return used
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    p.add_argument("--size", type=int, default=256)
+    p.add_argument("--actions", type=int, default=10000)
+    args = p.parse_args()
+
+    for draw_style in Grid.DRAW_STYLE_OPTIONS:
+        used, estimated = grid_memory(draw_style, args.size)
+        print(f"{draw_style:>8} {args.size}x{args.size} grid: {'~' if estimated else ' '}{used / 2**20:10.1f} MiB")
+    used = history_memory(args.actions)
+    print(f"{args.actions} action history:   {used / 2**20:10.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Frame throughput of the process-pool renderer against rendering in one process.
+
+Paints a size x size SET canvas with the animated rainbow and sparkle layers, then
+times frames rendered by render.render_rgb, and by ParallelRenderer with 1, 2, 4, ...
+workers up to the number of cores. The first parallel frame, which sends the whole
+canvas to the workers, is timed separately.
+
+    python -m benchmarks.parallel_render [--size 1024] [--frames 3] [--workers 1 2 4]
+"""
+
+import argparse
+import os
+import time
+
+from grid import Grid
+from layers import rainbow, sparkle
+from parallel_render import ParallelRenderer
+from render import render_rgb
+
+
+def animated_grid(size: int) -> Grid:
+    grid = Grid(Grid.DRAW_STYLE_SET, size, size)
+    for x in range(size):
+        for y in range(size):
+            grid[x][y].add(rainbow if (x // 8 + y // 8) % 2 else sparkle)
+    return grid
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    p.add_argument("--size", type=int, default=1024)
+    p.add_argument("--frames", type=int, default=3)
+    p.add_argument("--workers", type=int, nargs="+")
+    args = p.parse_args()
+    cores = os.cpu_count() or 1
+    workers = args.workers or [1 << i for i in range(cores.bit_length()) if 1 << i <= cores]
+
+    grid = animated_grid(args.size)
+    print(f"{args.size}x{args.size} canvas, {cores} cores")
+    start = time.perf_counter()
+    for frame in range(args.frames):
+        render_rgb(grid, 1, frame / 10)
+    single = (time.perf_counter() - start) / args.frames
+    print(f"one process:  {1 / single:8.2f} frames/s")
+
+    for count in workers:
+        with ParallelRenderer(grid, count) as renderer:
+            start = time.perf_counter()
+            renderer.render(0)
+            first = time.perf_counter() - start
+            start = time.perf_counter()
+            for frame in range(args.frames):
+                renderer.render(frame / 10)
+            per_frame = (time.perf_counter() - start) / args.frames
+        print(f"{count:3} workers:  {1 / per_frame:8.2f} frames/s "
+              f"(x{single / per_frame:.2f}, first frame {first:.2f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Scaling of the SortedList implementations, up to 1M items.
+
+For each size n, fills an ArraySortedList and a TreeSortedList with n items of
+random keys, then times, per operation: add and delete at random positions,
+membership of an item, and select of the median (the median of SequenceLayerStore.special).
+Arrays larger than --array-limit are skipped, since filling them one add at a time is O(n^2).
+
+    python -m benchmarks.sorted_list_scaling [--sizes 1000 10000 100000 1000000] [--ops 2000]
+"""
+
+import argparse
+import random
+import time
+
+from data_structures.array_sorted_list import ArraySortedList
+from data_structures.sorted_list_adt import ListItem
+from data_structures.tree_sorted_list import TreeSortedList
+
+
+def per_op(function, count: int) -> float:
+    """ Microseconds per call of function(i), for i in range(count). """
+    start = time.perf_counter()
+    for i in range(count):
+        function(i)
+    return (time.perf_counter() - start) / count * 1e6
+
+
+def measure(sorted_list, n: int, ops: int, rng: random.Random) -> dict[str, float]:
+    items = [ListItem(i, rng.random()) for i in range(n + ops)]
+    start = time.perf_counter()
+    for item in items[:n]:
+        sorted_list.add(item)
+    fill = time.perf_counter() - start
+    probes = rng.sample(items[:n], min(ops, n))
+    positions = [rng.randrange(n) for _ in range(ops)]
+    return {
+        "fill s": fill,
+        "add us": per_op(lambda i: sorted_list.add(items[n + i]), ops),
+        "delete us": per_op(lambda i: sorted_list.delete_at_index(positions[i]), ops),
+        "contains us": per_op(lambda i: probes[i % len(probes)] in sorted_list, ops),
+        "median us": per_op(lambda i: sorted_list[(len(sorted_list) - 1) // 2], ops),
+    }
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    p.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 1000000])
+    p.add_argument("--ops", type=int, default=2000)
+    p.add_argument("--array-limit", type=int, default=10000)
+    args = p.parse_args()
+
+    columns = ["fill s", "add us", "delete us", "contains us", "median us"]
+    print(f"{'list':>6} {'n':>9} " + " ".join(f"{column:>12}" for column in columns))
+    for n in args.sizes:
+        for name, make in (("array", lambda: ArraySortedList(1)), ("tree", TreeSortedList)):
+            if name == "array" and n > args.array_limit:
+                continue
+            result = measure(make(), n, args.ops, random.Random(n))
+            print(f"{name:>6} {n:>9} " + " ".join(f"{result[column]:>12.2f}" for column in columns))
+
+
+if __name__ == "__main__":
+    main()
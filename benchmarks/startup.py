@@ -0,0 +1,57 @@
+"""
+Import-to-first-paint time of the headless engine, against going through main.py.
+
+Each run starts a fresh interpreter, which imports the engine, sets up a session
+(without a journal) and paints one square. "main" imports main.py first, as headless
+code had to before the engine was split out, so it also pays for importing arcade,
+pyglet and their dependencies. The median of the runs is reported.
+
+    python -m benchmarks.startup [--runs 10]
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+
+FIRST_PAINT = """
+import time
+start = time.perf_counter()
+{imports}
+from layers import red
+session = DrawingSession()
+session.setup()
+session.on_paint(red, 3, 3)
+print(time.perf_counter() - start, 'arcade' in sys.modules)
+"""
+
+VARIANTS = {
+    "session": "from session import DrawingSession",
+    "main": "import main\nfrom session import DrawingSession",
+}
+
+
+def time_run(imports: str) -> tuple[float, bool]:
+    code = "import sys\n" + FIRST_PAINT.format(imports=imports)
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    seconds, arcade = output.split()
+    return float(seconds), arcade == "True"
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    p.add_argument("--runs", type=int, default=10)
+    args = p.parse_args()
+
+    for name, imports in VARIANTS.items():
+        try:
+            runs = [time_run(imports) for _ in range(args.runs)]
+        except subprocess.CalledProcessError as e:
+            print(f"{name:8}  failed: {e.stderr.strip().splitlines()[-1]}")
+            continue
+        median = statistics.median(seconds for seconds, _ in runs)
+        print(f"{name:8}  {median * 1000:8.1f} ms  (arcade imported: {runs[0][1]})")
+
+
+if __name__ == "__main__":
+    main()
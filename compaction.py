@@ -0,0 +1,168 @@
+from __future__ import annotations
+"""
+Compaction of replay logs: a shorter list of actions that leaves the grid in the same state.
+
+What can be dropped depends on the draw style:
+    SET       A square shows the layer of the last paint or undo on it, so only the last step on each
+              square is kept. Specials only flip every square, so they cancel out in pairs and
+              at most one is kept, at the end.
+    SEQUENCE  Whether a square has a layer depends only on the last step with that layer on that square,
+              until a special reads all the layers. So the same is done between specials,
+              per square and layer, and specials stay where they are.
+    ADD       Steps depend on everything before them, so only specials directly after each other,
+              which reverse the layers and back, are removed.
+In every style, actions left without steps are dropped, and actions that keep all of their steps are
+kept as the same object, so undo / redo of them still refers to the same action.
+
+With preserve_frames=n the log is compacted in windows of n actions, so the grid after every n-th
+action of the original log is also shown at some point of the compacted log.
+"""
+
+import argparse
+import os
+
+from action import PaintAction
+from grid import Grid
+from journal import Journal, RESET
+
+Entry = tuple[PaintAction, bool]
+
+
+# Complexity analysis:
+# O(s) in the total number of steps s, with a dictionary of the last step on each square.
+def compact(entries: list[Entry], draw_style: str, preserve_frames: int | None = None) -> list[Entry]:
+    """
+    Returns a list of (action, is_undo) entries which changes a grid of draw_style
+    in the same way as entries.
+    """
+    window = preserve_frames or max(len(entries), 1)
+    compacted = []
+    for start in range(0, len(entries), window):
+        part = entries[start:start + window]
+        if draw_style == Grid.DRAW_STYLE_SET:
+            compacted.extend(_compact_set(part))
+        elif draw_style == Grid.DRAW_STYLE_SEQUENCE:
+            compacted.extend(_compact_sequence(part))
+        else:
+            compacted.extend(_compact_add(part))
+    return compacted
+
+
+def _keep_last(entries: list[Entry], key) -> list[Entry]:
+    """ Keeps, for each key(x, y, layer), only the last step with that key. """
+    last = {}
+    position = 0
+    for action, _ in entries:
+        for x, y, layer in action:
+            last[key(x, y, layer)] = position
+            position += 1
+    kept = []
+    position = 0
+    for action, is_undo in entries:
+        live = PaintAction()
+        for x, y, layer in action:
+            if last[key(x, y, layer)] == position:
+                live.add(x, y, layer)
+            position += 1
+        if len(live) == len(action):
+            live = action
+        if len(live):
+            kept.append((live, is_undo))
+    return kept
+
+
+def _compact_set(entries: list[Entry]) -> list[Entry]:
+    specials = sum(1 for action, _ in entries if action.is_special)
+    kept = _keep_last([entry for entry in entries if not entry[0].is_special], lambda x, y, layer: (x, y))
+    if specials % 2:
+        kept.append((PaintAction(is_special=True), False))
+    return kept
+
+
+def _compact_sequence(entries: list[Entry]) -> list[Entry]:
+    kept = []
+    segment = []
+    for entry in entries:
+        if entry[0].is_special:
+            kept.extend(_keep_last(segment, lambda x, y, layer: (x, y, layer.index)))
+            kept.append(entry)
+            segment = []
+        else:
+            segment.append(entry)
+    kept.extend(_keep_last(segment, lambda x, y, layer: (x, y, layer.index)))
+    return kept
+
+
+def _compact_add(entries: list[Entry]) -> list[Entry]:
+    kept = []
+    for entry in entries:
+        action = entry[0]
+        if action.is_special:
+            if kept and kept[-1][0].is_special:
+                kept.pop()
+                continue
+        elif not len(action):
+            continue
+        kept.append(entry)
+    return kept
+
+
+# Complexity analysis:
+# O(r + s) in the number of records r and steps s of the journal.
+def compact_journal(path: str, output: str | None = None, preserve_frames: int | None = None) -> tuple[int, int]:
+    """
+    Rewrites the last session of a journal, compacted, to output (the journal itself by default).
+    The journal should not be open for writing. Returns the number of actions before and after.
+
+    Every compacted entry is written as a record of its own, holding a copy of its action.
+    A back reference would replay as an undo or redo of the session's undo history,
+    which the compacted log no longer matches.
+    """
+    session = None
+    for record in Journal(path).recover():
+        if record.kind == RESET:
+            session = (record.draw_style, record.width, record.height)
+            entries = []
+        elif session is not None:
+            entries.append((record.action, record.is_undo))
+    if session is None:
+        raise ValueError(f"{path} has no recorded session")
+    compacted = compact(entries, session[0], preserve_frames)
+
+    target = path if output is None else output
+    temporary = target + ".compacting"
+    journal = Journal(temporary)
+    journal.start()
+    journal.reset(*session)
+    for action, is_undo in compacted:
+        journal.record(_copy(action), is_undo)
+    journal.close()
+    os.replace(temporary, target)
+    return len(entries), len(compacted)
+
+
+def _copy(action: PaintAction) -> PaintAction:
+    """ A new action with the same steps, which the journal has not seen before. """
+    copy = PaintAction(is_special=action.is_special)
+    for x, y, layer in action:
+        copy.add(x, y, layer)
+    return copy
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Compacts the last session of a journal.")
+    p.add_argument("journal", help="session journal to compact")
+    p.add_argument("-o", "--output", help="compacted journal (default: rewrite the journal in place)")
+    p.add_argument("--preserve-frames", type=int, help="keep the grid after every n-th action")
+    args = p.parse_args(argv)
+    size = os.path.getsize(args.journal)
+    try:
+        before, after = compact_journal(args.journal, args.output, args.preserve_frames)
+    except ValueError as e:
+        p.error(str(e))
+    print(f"actions: {before} -> {after}")
+    print(f"bytes:   {size} -> {os.path.getsize(args.output or args.journal)}")
+
+
+if __name__ == "__main__":
+    main()
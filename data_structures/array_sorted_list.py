@@ -3,6 +3,8 @@
     Items to store should be of time ListItem.
 """
 
+from operator import attrgetter
+
 from data_structures.referential_array import ArrayR
 from data_structures.sorted_list_adt import *
 
@@ -11,6 +13,7 @@ __docformat__ = 'reStructuredText'
 
 class ArraySortedList(SortedList[T]):
     """ SortedList ADT implemented with arrays. """
+    __slots__ = ('array',)
     MIN_CAPACITY = 1
 
     def __init__(self, max_capacity: int) -> None:
@@ -23,6 +26,20 @@ class ArraySortedList(SortedList[T]):
         size = max(self.MIN_CAPACITY, max_capacity)
         self.array = ArrayR(size)
 
+    @classmethod
+    def from_sorted(cls, items: list[ListItem]) -> "ArraySortedList[T]":
+        """ Builds a list from items already in order of key, with one block copy.
+        :complexity: O(n) for n items
+        :raises ValueError: if the items are not in order of key
+        """
+        for i in range(1, len(items)):
+            if items[i - 1].key > items[i].key:
+                raise ValueError('Items should be in sorted order')
+        sorted_list = cls(len(items))
+        sorted_list.array[:len(items)] = items
+        sorted_list.length = len(items)
+        return sorted_list
+
     def reset(self):
         """ Reset the list. """
         SortedList.__init__(self)
@@ -49,34 +66,38 @@ class ArraySortedList(SortedList[T]):
             # the list isn't empty and the item's position is wrong wrt. its neighbours
             raise IndexError('Element should be inserted in sorted order')
 
+# Time complexity analysis:
+# Worst case: O(log n + d) (index method), for d items with the same key as item
+# Best case: O(log n)
     def __contains__(self, item: ListItem):
         """ Checks if value is in the list. """
-        for i in range(len(self)):
-            if self.array[i] == item:
-                return True
-        return False
+        try:
+            self.index(item)
+            return True
+        except ValueError:
+            return False
 
+# Time complexity analysis:
+# Worst case:O(len(self)-index), as one block copy
+# Best case:O(1) (index == len(self))
     def _shuffle_right(self, index: int) -> None:
         """ Shuffle items to the right up to a given position. """
-        for i in range(len(self), index, -1):
-            self.array[i] = self.array[i - 1]
+        self.array[index + 1:len(self) + 1] = self.array[index:len(self)]
 
 # Time complexity analysis:
-# Worst case:O(len(self)-index)
+# Worst case:O(len(self)-index), as one block copy
 # Best case:O(len(self)-index)
     def _shuffle_left(self, index: int) -> None:
         """ Shuffle items starting at a given position to the left. """
-        for i in range(index, len(self)):
-            self.array[i] = self.array[i + 1]
+        self.array[index:len(self)] = self.array[index + 1:len(self) + 1]
 
-    def _resize(self) -> None:
-        """ Resize the list. """
+    def _resize(self, capacity: int = 0) -> None:
+        """ Resize the list, to at least capacity. """
         # doubling the size of our list
-        new_array = ArrayR(2 * len(self.array))
+        new_array = ArrayR(max(2 * len(self.array), capacity))
 
         # copying the contents
-        for i in range(self.length):
-            new_array[i] = self.array[i]
+        new_array[:self.length] = self.array[:self.length]
 
         # referring to the new array
         self.array = new_array
@@ -94,13 +115,15 @@ class ArraySortedList(SortedList[T]):
         return item
 
 # Time complexity analysis:
-# Worst case: O(n) (_index_to_add method)
-# Best case: O(log n) (_index_to_add method)
+# Worst case: O(log n + d) (_bisect_left, then the d items with the same key as item)
+# Best case: O(log n) (_bisect_left method)
     def index(self, item: ListItem) -> int:
         """ Find the position of a given item in the list. """
-        pos = self._index_to_add(item)
-        if pos < len(self) and self[pos] == item:
-            return pos
+        pos = self._bisect_left(item.key)
+        while pos < len(self) and self[pos].key == item.key:
+            if self[pos] == item:
+                return pos
+            pos += 1
         raise ValueError('item not in list')
 
     def is_full(self):
@@ -129,6 +152,33 @@ class ArraySortedList(SortedList[T]):
         self[position] = item
         self.length += 1
 
+# Time complexity analysis:
+# Let n be the length of the list and m the number of items
+# Timsort finds the list and the new items as sorted runs and merges them,
+# so if the items are sorted this is O(n + m), and O(n + m log m) if they are not.
+    def add_all(self, items) -> None:
+        """ Add many elements to the list at once, merging them in.
+        Items with the same key as an item already in the list go after it.
+        """
+        merged = self.array[:len(self)] + list(items)
+        merged.sort(key=attrgetter('key'))
+        if len(merged) > len(self.array):
+            self._resize(len(merged))
+        self.array[:len(merged)] = merged
+        self.length = len(merged)
+
+    def _bisect_left(self, key) -> int:
+        """ Find the first position whose item has a key of at least key. """
+        low = 0
+        high = len(self)
+        while low < high:
+            mid = (low + high) // 2
+            if self[mid].key < key:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
     def _index_to_add(self, item: ListItem) -> int:
         """ Find the position where the new item should be placed. """
         low = 0
@@ -34,16 +34,70 @@ class BSet(Set[int]):
             raise TypeError('Set elements should be integers')
         return (self.elems >> (item - 1)) & 1
 
+    @classmethod
+    def from_iterable(cls, items) -> BSet:
+        """ Creates a set of the given items, building the integer once rather than one item at a time.
+        :complexity: O(n + m) for n items with the largest one m
+        :raises TypeError: if an item is not integer or if not positive.
+        """
+        items = list(items)
+        for item in items:
+            if not isinstance(item, int) or item <= 0:
+                raise TypeError('Set elements should be integers')
+        res = cls()
+        if items:
+            bits = bytearray((max(items) + 7) // 8)
+            for item in items:
+                bits[(item - 1) >> 3] |= 1 << ((item - 1) & 7)
+            res.elems = int.from_bytes(bits, 'little')
+        return res
+
     def __len__(self) -> int:
         """
-        Size computation. The most expensive operation.
-        Use int.bit_length(your_integer) to calculate the bit length.
+        Size computation, as the number of 1 bits of the integer.
+        :complexity: O(m / 64) for the largest element m, done by int.bit_count
         """
-        res = 0
-        for item in range(1, int.bit_length(self.elems) + 1):
-            if item in self:
-                res += 1
-        return res
+        return self.elems.bit_count()
+
+    def __iter__(self):
+        """ Iterates through the elements in increasing order.
+        The integer is split into 64-bit words, and within each word the iteration jumps
+        from one set bit to the next by isolating the lowest one (word & -word).
+        :complexity: O(n + m / 64) for n elements with the largest one m
+        """
+        data = self.elems.to_bytes((self.elems.bit_length() + 7) // 8, 'little')
+        for base in range(0, 8 * len(data), 64):
+            word = int.from_bytes(data[base // 8:base // 8 + 8], 'little')
+            while word:
+                lowest = word & -word
+                yield base + lowest.bit_length()
+                word ^= lowest
+
+    def rank(self, item: int) -> int:
+        """ Returns the number of elements smaller than item.
+        :complexity: O(m / 64) for the largest element m
+        :raises TypeError: if the item is not integer or if not positive.
+        """
+        if not isinstance(item, int) or item <= 0:
+            raise TypeError('Set elements should be integers')
+        return (self.elems & ((1 << (item - 1)) - 1)).bit_count()
+
+    def select(self, k: int) -> int:
+        """ Returns the element with k elements smaller than it, so select(rank(item)) == item.
+        Found by a binary search on the number of elements below each bit.
+        :complexity: O(log m * m / 64) for the largest element m
+        :raises IndexError: if k is not in between 0 and len(self)
+        """
+        if not 0 <= k < len(self):
+            raise IndexError('Set index out of range')
+        low, high = 1, self.elems.bit_length()
+        while low < high:
+            mid = (low + high) // 2
+            if (self.elems & ((1 << mid) - 1)).bit_count() > k:
+                high = mid
+            else:
+                low = mid + 1
+        return low
 
     def add(self, item: int) -> None:
         """ Adds an element to the set.
@@ -91,17 +145,33 @@ class BSet(Set[int]):
         res.elems = self.elems & ~other.elems
         return res
 
+    def update(self, other: BSet[int]) -> None:
+        """ Adds the elements of other to this set, in place. """
+        self.elems |= other.elems
+
+    def intersection_update(self, other: BSet[int]) -> None:
+        """ Keeps only the elements that are also in other, in place. """
+        self.elems &= other.elems
+
+    def difference_update(self, other: BSet[int]) -> None:
+        """ Removes the elements of other from this set, in place. """
+        self.elems &= ~other.elems
+
+    def __ior__(self, other: BSet[int]) -> BSet[int]:
+        self.update(other)
+        return self
+
+    def __iand__(self, other: BSet[int]) -> BSet[int]:
+        self.intersection_update(other)
+        return self
+
+    def __isub__(self, other: BSet[int]) -> BSet[int]:
+        self.difference_update(other)
+        return self
+
     def __str__(self):
         """ Construct a nice string representation. """
-        bit_elems = self.elems
-        out_elems = []
-        current = 0
-        while bit_elems:
-            if bit_elems & (1 << current):
-                out_elems.append(str(current+1))
-                bit_elems &= ~(1 << current)
-            current += 1
-        return '{' + ', '.join(out_elems) + '}'
+        return '{' + ', '.join(str(item) for item in self) + '}'
 
 if __name__ == '__main__':
     s = BSet(3)
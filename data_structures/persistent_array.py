@@ -0,0 +1,109 @@
+""" Persistent (immutable) array with structural sharing.
+
+The array is a tree of tuples with WIDTH children per node, and the values at
+the leaves. Updating a position copies only the nodes on the path from the root
+to that leaf, and shares every other node with the previous version, so old
+versions stay valid and cost no extra memory for the parts that did not change.
+"""
+from __future__ import annotations
+
+__docformat__ = 'reStructuredText'
+
+from typing import Generic, Iterator
+from data_structures.referential_array import T
+
+
+class PersistentArray(Generic[T]):
+    """ Immutable array where set() returns a new version in O(log n).
+
+    Attributes:
+         length (int): number of positions in the array
+         depth (int): number of levels in the tree
+         root (tuple): root node of the tree
+    """
+    __slots__ = ('length', 'depth', 'root')
+    BITS = 5
+    WIDTH = 1 << BITS
+    MASK = WIDTH - 1
+
+    def __init__(self, length: int, fill: T = None) -> None:
+        """ Creates an array with every position set to fill.
+        :complexity: O(log length), since all the nodes are shared.
+        :pre: length > 0
+        """
+        if length <= 0:
+            raise ValueError("Array length should be larger than 0.")
+        self.length = length
+        node = (fill,) * self.WIDTH
+        self.depth = 1
+        while self.WIDTH ** self.depth < length:
+            node = (node,) * self.WIDTH
+            self.depth += 1
+        self.root = node
+
+    @classmethod
+    def _from_root(cls, length: int, depth: int, root: tuple) -> PersistentArray[T]:
+        array = cls.__new__(cls)
+        array.length = length
+        array.depth = depth
+        array.root = root
+        return array
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self, index: int) -> T:
+        """ Returns the value at position index.
+        :complexity: O(log n)
+        :raises IndexError: if the index is out of range
+        """
+        if not 0 <= index < self.length:
+            raise IndexError("Index out of range.")
+        node = self.root
+        for level in range(self.depth - 1, -1, -1):
+            node = node[(index >> (level * self.BITS)) & self.MASK]
+        return node
+
+    def set(self, index: int, value: T) -> PersistentArray[T]:
+        """ Returns a new version of the array with position index set to value.
+        :complexity: O(log n), copying one node per level.
+        :raises IndexError: if the index is out of range
+        """
+        if not 0 <= index < self.length:
+            raise IndexError("Index out of range.")
+        return self._from_root(self.length, self.depth, self._set(self.root, self.depth - 1, index, value))
+
+    def _set(self, node: tuple, level: int, index: int, value: T) -> tuple:
+        slot = (index >> (level * self.BITS)) & self.MASK
+        if level == 0:
+            child = value
+        else:
+            child = self._set(node[slot], level - 1, index, value)
+        return node[:slot] + (child,) + node[slot + 1:]
+
+    def __iter__(self) -> Iterator[T]:
+        for index in range(self.length):
+            yield self[index]
+
+    def diff(self, other: PersistentArray[T]) -> Iterator[int]:
+        """ Yields the positions whose values are not the same object in both arrays.
+        Subtrees shared by both versions are skipped without being visited.
+        :complexity: O(d log n), where d is the number of differing positions.
+        :pre: both arrays have the same length
+        """
+        if self.length != other.length:
+            raise ValueError("Arrays should have the same length.")
+        yield from self._diff(self.root, other.root, self.depth - 1, 0)
+
+    def _diff(self, mine: tuple, theirs: tuple, level: int, base: int) -> Iterator[int]:
+        if mine is theirs:
+            return
+        for slot in range(self.WIDTH):
+            index = base + (slot << (level * self.BITS))
+            if index >= self.length:
+                return
+            if level == 0:
+                if mine[slot] is not theirs[slot]:
+                    yield index
+            else:
+                yield from self._diff(mine[slot], theirs[slot], level - 1, index)
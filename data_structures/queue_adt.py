@@ -13,6 +13,7 @@ from data_structures.referential_array import ArrayR, T
 
 class Queue(ABC, Generic[T]):
     """ Abstract class for a generic Queue. """
+    __slots__ = ('length',)
 
     def __init__(self) -> None:
         self.length = 0
@@ -52,25 +53,46 @@ class CircularQueue(Queue[T]):
          front (int): index of the element at the front of the queue
          rear (int): index of the first empty space at the back of the queue
          array (ArrayR[T]): array storing the elements of the queue
+         growable (bool): whether the array grows when full, and shrinks when a quarter full
+         min_capacity (int): capacity a growable queue does not shrink below
 
     ArrayR cannot create empty arrays. So MIN_CAPACITY used to avoid this.
+    By default the queue has the fixed capacity it is created with, and is full once it holds that many elements.
     """
+    __slots__ = ('front', 'rear', 'array', 'growable', 'min_capacity')
     MIN_CAPACITY = 1
 
-    def __init__(self,max_capacity:int) -> None:
+    def __init__(self,max_capacity:int, growable: bool = False) -> None:
         Queue.__init__(self)
         self.front = 0
         self.rear = 0
-        self.array = ArrayR(max(self.MIN_CAPACITY,max_capacity))
-
+        self.min_capacity = max(self.MIN_CAPACITY,max_capacity)
+        self.array = ArrayR(self.min_capacity)
+        self.growable = growable
+
+    def _resize(self, capacity: int) -> None:
+        """ Moves the elements, in order, to the front of a new array of the given capacity.
+        :complexity: O(capacity)
+        :pre: capacity >= len(self)
+        """
+        new_array = ArrayR(capacity)
+        first = min(len(self), len(self.array) - self.front)
+        new_array[:first] = self.array[self.front:self.front + first]
+        new_array[first:len(self)] = self.array[:len(self) - first]
+        self.array = new_array
+        self.front = 0
+        self.rear = len(self) % capacity
 
     def append(self, item: T) -> None:
         """ Adds an element to the rear of the queue.
+        :complexity: O(1), amortised O(1) for a growable queue
         :pre: queue is not full
         :raises Exception: if the queue is full
         """
-        if self.is_full():
-            raise Exception("Queue is full")
+        if len(self) == len(self.array):
+            if not self.growable:
+                raise Exception("Queue is full")
+            self._resize(2 * len(self.array))
 
         self.array[self.rear] = item
         self.length += 1
@@ -78,6 +100,7 @@ class CircularQueue(Queue[T]):
 
     def serve(self) -> T:
         """ Deletes and returns the element at the queue's front.
+        :complexity: O(1), amortised O(1) for a growable queue
         :pre: queue is not empty
         :raises Exception: if the queue is empty
         """
@@ -86,12 +109,86 @@ class CircularQueue(Queue[T]):
 
         self.length -= 1
         item = self.array[self.front]
+        # The slot is cleared, so the queue does not keep the element alive.
+        self.array[self.front] = None
         self.front = (self.front+1) % len(self.array)
+        self._shrink()
         return item
 
+    def pop(self) -> T:
+        """ Deletes and returns the element at the queue's rear, the one appended last.
+        :complexity: O(1), amortised O(1) for a growable queue
+        :pre: queue is not empty
+        :raises Exception: if the queue is empty
+        """
+        if self.is_empty():
+            raise Exception("Queue is empty")
+
+        self.length -= 1
+        self.rear = (self.rear - 1) % len(self.array)
+        item = self.array[self.rear]
+        self.array[self.rear] = None
+        self._shrink()
+        return item
+
+    def _shrink(self) -> None:
+        """ Halves the array of a growable queue once it is a quarter full.
+        :complexity: O(1), O(n) when it shrinks
+        """
+        if self.growable and 4 * len(self) <= len(self.array) and len(self.array) > self.min_capacity:
+            self._resize(max(len(self.array) // 2, self.min_capacity))
+
+    def extend(self, items) -> None:
+        """ Appends every element of items, in order.
+        :complexity: O(m) for m items, with at most one resize of a growable queue
+        :raises Exception: if the queue does not have room for them all (nothing is appended then)
+        """
+        items = list(items)
+        needed = len(self) + len(items)
+        if needed > len(self.array):
+            if not self.growable:
+                raise Exception("Queue is full")
+            capacity = len(self.array)
+            while capacity < needed:
+                capacity *= 2
+            self._resize(capacity)
+        for item in items:
+            self.array[self.rear] = item
+            self.rear = (self.rear + 1) % len(self.array)
+        self.length = needed
+
+    def __getitem__(self, index: int) -> T:
+        """ Returns the element index places behind the front, without serving it.
+        :complexity: O(1)
+        :raises IndexError: if index is not in between 0 and len(self)
+        """
+        if not 0 <= index < len(self):
+            raise IndexError("Queue index out of range")
+        return self.array[(self.front + index) % len(self.array)]
+
+    def __iter__(self):
+        """ Iterates through the elements from front to rear, without serving them.
+        :complexity: O(n) for the whole iteration
+        """
+        array = self.array
+        position = self.front
+        for _ in range(len(self)):
+            yield array[position]
+            position = (position + 1) % len(array)
+
+    def reverse(self) -> None:
+        """ Reverses the order of the elements in place, so the rear becomes the front.
+        :complexity: O(n)
+        """
+        capacity = len(self.array)
+        for i in range(len(self) // 2):
+            left = (self.front + i) % capacity
+            right = (self.front + len(self) - 1 - i) % capacity
+            self.array[left], self.array[right] = self.array[right], self.array[left]
+
     def is_full(self) -> bool:
-        """ True if the queue is full and no element can be appended. """
-        return len(self) == len(self.array)
+        """ True if the queue is full and no element can be appended. A growable queue is never full. """
+        return not self.growable and len(self) == len(self.array)
 
     def clear(self) -> None:
         """ Clears all elements from the queue. """
@@ -184,6 +281,31 @@ class TestQueue(unittest.TestCase):
             self.assertEqual(len(queue), 0)
             self.assertTrue(queue.is_empty())
 
+    def test_growable(self):
+        queue = CircularQueue(2, growable=True)
+        for i in range(3):
+            queue.append(i)
+        self.assertEqual(queue.serve(), 0)
+        queue.extend(range(3, 40))
+        self.assertFalse(queue.is_full())
+        self.assertEqual(list(queue), list(range(1, 40)))
+        self.assertEqual((queue[0], queue[38]), (1, 39))
+        queue.reverse()
+        self.assertEqual(list(queue), list(range(39, 0, -1)))
+        for i in range(39, 3, -1):
+            self.assertEqual(queue.serve(), i)
+        self.assertEqual(len(queue.array), 8)
+        queue.extend(range(10))
+        self.assertEqual(queue.pop(), 9)
+        self.assertEqual(queue.serve(), 3)
+        self.assertEqual(list(queue), [2, 1] + list(range(9)))
+        while not queue.is_empty():
+            queue.pop()
+        self.assertEqual(len(queue.array), 2)
+        with self.assertRaises(Exception):
+            self.large_queue.extend(range(self.CAPACITY))
+        self.assertEqual(len(self.large_queue), self.LARGE)
+
 if __name__ == '__main__':
     testtorun = TestQueue()
     suite = unittest.TestLoader().loadTestsFromModule(testtorun)
@@ -14,6 +14,8 @@ __docformat__ = 'reStructuredText'
 
 class ListItem(Generic[T, K]):
     """ Items to be stored in a list, including the value and the key used for sorting. """
+    __slots__ = ('value', 'key')
+
     def __init__(self, value: T, key: K):
         self.value = value
         self.key = key
@@ -27,6 +29,8 @@ class ListItem(Generic[T, K]):
 
 class SortedList(ABC, Generic[T]):
     """ Abstract class for a generic SortedList. """
+    __slots__ = ('length',)
+
     def __init__(self) -> None:
         """ Basic SortedList object initialiser. """
         self.length = 0
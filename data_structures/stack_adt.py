@@ -12,6 +12,8 @@ from typing import TypeVar, Generic
 from data_structures.referential_array import ArrayR, T
 
 class Stack(ABC, Generic[T]):
+    __slots__ = ('length',)
+
     def __init__(self) -> None:
         self.length = 0
 
@@ -54,41 +56,63 @@ class ArrayStack(Stack[T]):
     Attributes:
          length (int): number of elements in the stack (inherited)
          array (ArrayR[T]): array storing the elements of the queue
+         growable (bool): whether the array grows when full, and shrinks when a quarter full
+         min_capacity (int): capacity a growable stack does not shrink below
 
     ArrayR cannot create empty arrays. So MIN_CAPACITY used to avoid this.
+    By default the stack has the fixed capacity it is created with, and is full once it holds that many elements.
     """
+    __slots__ = ('array', 'growable', 'min_capacity')
     MIN_CAPACITY = 1
 
-    def __init__(self, max_capacity: int) -> None:
+    def __init__(self, max_capacity: int, growable: bool = False) -> None:
         """ Initialises the length and the array with the given capacity.
             If max_capacity is 0, the array is created with MIN_CAPACITY.
         """
         Stack.__init__(self)
-        self.array = ArrayR(max(self.MIN_CAPACITY, max_capacity))
+        self.min_capacity = max(self.MIN_CAPACITY, max_capacity)
+        self.array = ArrayR(self.min_capacity)
+        self.growable = growable
+
+    def _resize(self, capacity: int) -> None:
+        """ Moves the elements to a new array of the given capacity.
+        :complexity: O(capacity)
+        :pre: capacity >= len(self)
+        """
+        new_array = ArrayR(capacity)
+        new_array[:len(self)] = self.array[:len(self)]
+        self.array = new_array
 
     def is_full(self) -> bool:
-        """ True if the stack is full and no element can be pushed. """
-        return len(self) == len(self.array)
+        """ True if the stack is full and no element can be pushed. A growable stack is never full. """
+        return not self.growable and len(self) == len(self.array)
 
     def push(self, item: T) -> None:
         """ Pushes an element to the top of the stack.
+        :complexity: O(1), amortised O(1) for a growable stack
         :pre: stack is not full
         :raises Exception: if the stack is full
         """
-        if self.is_full():
-            raise Exception("Stack is full")
+        if len(self) == len(self.array):
+            if not self.growable:
+                raise Exception("Stack is full")
+            self._resize(2 * len(self.array))
         self.array[len(self)] = item
         self.length += 1
 
     def pop(self) -> T:
         """ Pops the element at the top of the stack.
+        :complexity: O(1), amortised O(1) for a growable stack
         :pre: stack is not empty
         :raises Exception: if the stack is empty
         """
         if self.is_empty():
             raise Exception("Stack is empty")
         self.length -= 1
-        return self.array[self.length]
+        item = self.array[self.length]
+        if self.growable and 4 * len(self) <= len(self.array) and len(self.array) > self.min_capacity:
+            self._resize(max(len(self.array) // 2, self.min_capacity))
+        return item
 
     def peek(self) -> T:
         """ Returns the element at the top, without popping it from stack.
@@ -99,6 +123,45 @@ class ArrayStack(Stack[T]):
             raise Exception("Stack is empty")
         return self.array[self.length-1]
 
+    def extend(self, items) -> None:
+        """ Pushes every element of items, in order, so the last one ends up on top.
+        :complexity: O(m) for m items, with at most one resize of a growable stack
+        :raises Exception: if the stack does not have room for them all (nothing is pushed then)
+        """
+        items = list(items)
+        needed = len(self) + len(items)
+        if needed > len(self.array):
+            if not self.growable:
+                raise Exception("Stack is full")
+            capacity = len(self.array)
+            while capacity < needed:
+                capacity *= 2
+            self._resize(capacity)
+        self.array[len(self):needed] = items
+        self.length = needed
+
+    def __getitem__(self, index: int) -> T:
+        """ Returns the element index places below the top (0 is the top), without popping it.
+        :complexity: O(1)
+        :raises IndexError: if index is not in between 0 and len(self)
+        """
+        if not 0 <= index < len(self):
+            raise IndexError("Stack index out of range")
+        return self.array[len(self) - 1 - index]
+
+    def __iter__(self):
+        """ Iterates through the elements from the top down, without popping them.
+        :complexity: O(n) for the whole iteration
+        """
+        for i in range(len(self) - 1, -1, -1):
+            yield self.array[i]
+
+    def reverse(self) -> None:
+        """ Reverses the order of the elements in place, so the bottom becomes the top.
+        :complexity: O(n)
+        """
+        self.array[:len(self)] = self.array[:len(self)][::-1]
+
 class TestStack(unittest.TestCase):
     """ Tests for the above class."""
     EMPTY = 0
@@ -183,6 +246,21 @@ class TestStack(unittest.TestCase):
             self.assertEqual(len(stack), 0)
             self.assertTrue(stack.is_empty())
 
+    def test_growable(self):
+        stack = ArrayStack(2, growable=True)
+        stack.extend(range(40))
+        self.assertFalse(stack.is_full())
+        self.assertEqual((stack[0], stack[39]), (39, 0))
+        self.assertEqual(list(stack), list(range(39, -1, -1)))
+        stack.reverse()
+        self.assertEqual(stack.peek(), 0)
+        for i in range(36):
+            self.assertEqual(stack.pop(), i)
+        self.assertEqual(len(stack.array), 8)
+        with self.assertRaises(Exception):
+            self.large_stack.extend(range(self.CAPACITY))
+        self.assertEqual(len(self.large_stack), self.LARGE)
+
 if __name__ == '__main__':
     testtorun = TestStack()
     suite = unittest.TestLoader().loadTestsFromModule(testtorun)
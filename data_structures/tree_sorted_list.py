@@ -0,0 +1,288 @@
+"""
+    Balanced tree implementation of SortedList ADT.
+    Items to store should be of time ListItem.
+
+    The items are kept in an AVL tree ordered by key, where every node also
+    stores the size of its subtree. That makes it an order-statistic tree:
+    the item at a position (select) and the position of a key (rank) are
+    found in one walk down the tree, so every operation is O(log n).
+"""
+from __future__ import annotations
+
+from operator import attrgetter
+
+from data_structures.sorted_list_adt import *
+
+__docformat__ = 'reStructuredText'
+
+
+class _Node:
+    """ Node of the tree, with the height and size of its subtree. """
+    __slots__ = ('item', 'left', 'right', 'height', 'size')
+
+    def __init__(self, item: ListItem) -> None:
+        self.item = item
+        self.left = None
+        self.right = None
+        self.height = 1
+        self.size = 1
+
+
+def _height(node: _Node | None) -> int:
+    return node.height if node is not None else 0
+
+
+def _size(node: _Node | None) -> int:
+    return node.size if node is not None else 0
+
+
+def _update(node: _Node) -> _Node:
+    node.height = 1 + max(_height(node.left), _height(node.right))
+    node.size = 1 + _size(node.left) + _size(node.right)
+    return node
+
+
+def _rotate_right(node: _Node) -> _Node:
+    top = node.left
+    node.left = top.right
+    top.right = _update(node)
+    return _update(top)
+
+
+def _rotate_left(node: _Node) -> _Node:
+    top = node.right
+    node.right = top.left
+    top.left = _update(node)
+    return _update(top)
+
+
+def _balance(node: _Node) -> _Node:
+    """ Restores the AVL property at node, whose subtrees are balanced. """
+    _update(node)
+    difference = _height(node.left) - _height(node.right)
+    if difference > 1:
+        if _height(node.left.left) < _height(node.left.right):
+            node.left = _rotate_left(node.left)
+        return _rotate_right(node)
+    if difference < -1:
+        if _height(node.right.right) < _height(node.right.left):
+            node.right = _rotate_right(node.right)
+        return _rotate_left(node)
+    return node
+
+
+def _insert_at(node: _Node | None, index: int, item: ListItem) -> _Node:
+    """ Inserts item so that it ends up at position index of the subtree. """
+    if node is None:
+        return _Node(item)
+    left_size = _size(node.left)
+    if index <= left_size:
+        node.left = _insert_at(node.left, index, item)
+    else:
+        node.right = _insert_at(node.right, index - left_size - 1, item)
+    return _balance(node)
+
+
+def _delete_at(node: _Node, index: int) -> tuple[_Node | None, ListItem]:
+    """ Deletes the item at position index of the subtree, and returns the new subtree and the item. """
+    left_size = _size(node.left)
+    if index < left_size:
+        node.left, item = _delete_at(node.left, index)
+    elif index > left_size:
+        node.right, item = _delete_at(node.right, index - left_size - 1)
+    else:
+        item = node.item
+        if node.left is None:
+            return node.right, item
+        if node.right is None:
+            return node.left, item
+        # Replace the item by the next one, taken out of the right subtree.
+        node.right, node.item = _delete_at(node.right, 0)
+    return _balance(node), item
+
+
+def _build(items: list[ListItem], start: int, end: int) -> _Node | None:
+    """ Builds a perfectly balanced tree of items[start:end]. """
+    if start >= end:
+        return None
+    mid = (start + end) // 2
+    node = _Node(items[mid])
+    node.left = _build(items, start, mid)
+    node.right = _build(items, mid + 1, end)
+    return _update(node)
+
+
+class TreeSortedList(SortedList[T]):
+    """ SortedList ADT implemented with an order-statistic AVL tree.
+    Items with equal keys are kept in the order they were added.
+    """
+    __slots__ = ('root',)
+
+    def __init__(self, max_capacity: int = 0) -> None:
+        """ TreeSortedList object initialiser.
+        The tree grows as needed, so max_capacity is only taken for compatibility with ArraySortedList.
+        """
+        SortedList.__init__(self)
+        self.root = None
+
+    @classmethod
+    def from_sorted(cls, items: list[ListItem]) -> "TreeSortedList[T]":
+        """ Builds a list from items already in order of key.
+        :complexity: O(n) for n items
+        :raises ValueError: if the items are not in order of key
+        """
+        for i in range(1, len(items)):
+            if items[i - 1].key > items[i].key:
+                raise ValueError('Items should be in sorted order')
+        sorted_list = cls()
+        sorted_list.root = _build(items, 0, len(items))
+        sorted_list.length = len(items)
+        return sorted_list
+
+    def reset(self) -> None:
+        """ Reset the list. """
+        self.clear()
+
+    def clear(self) -> None:
+        """ Clear the list. """
+        SortedList.clear(self)
+        self.root = None
+
+    def _node_at(self, index: int) -> _Node:
+        if not 0 <= index < len(self):
+            raise IndexError('No such index in the list')
+        node = self.root
+        while True:
+            left_size = _size(node.left)
+            if index < left_size:
+                node = node.left
+            elif index > left_size:
+                index -= left_size + 1
+                node = node.right
+            else:
+                return node
+
+    def __getitem__(self, index: int) -> ListItem:
+        """ Magic method. Return the element at a given position.
+        :complexity: O(log n)
+        :raises IndexError: if there is no such position
+        """
+        return self._node_at(index).item
+
+    def select(self, k: int) -> ListItem:
+        """ Return the item with k items before it, the same as self[k].
+        :complexity: O(log n)
+        :raises IndexError: if there is no such position
+        """
+        return self._node_at(k).item
+
+    def __setitem__(self, index: int, item: ListItem) -> None:
+        """ Magic method. Insert the item at a given position,
+            if possible (!). Shift the following elements to the right.
+        :complexity: O(log n)
+        :raises IndexError: if the item is out of order at that position
+        """
+        if not 0 <= index <= len(self) or \
+                (index > 0 and self[index - 1].key > item.key) or \
+                (index < len(self) and item.key > self[index].key):
+            raise IndexError('Element should be inserted in sorted order')
+        self.root = _insert_at(self.root, index, item)
+        self.length += 1
+
+    def rank(self, key) -> int:
+        """ Return the number of items with a key smaller than key.
+        :complexity: O(log n)
+        """
+        node = self.root
+        rank = 0
+        while node is not None:
+            if node.item.key < key:
+                rank += _size(node.left) + 1
+                node = node.right
+            else:
+                node = node.left
+        return rank
+
+    def _rank_right(self, key) -> int:
+        """ Return the number of items with a key of at most key. """
+        node = self.root
+        rank = 0
+        while node is not None:
+            if node.item.key <= key:
+                rank += _size(node.left) + 1
+                node = node.right
+            else:
+                node = node.left
+        return rank
+
+    def add(self, item: ListItem) -> None:
+        """ Add new element to the list, after the items with the same key.
+        :complexity: O(log n)
+        """
+        self.root = _insert_at(self.root, self._rank_right(item.key), item)
+        self.length += 1
+
+    def add_all(self, items) -> None:
+        """ Add many elements to the list at once.
+        :complexity: O(m log(n + m)) for m items, or O(n + m log m) when that is smaller,
+            by merging the items with the list and rebuilding the tree.
+        """
+        items = list(items)
+        if len(items) * max(1, len(self).bit_length()) <= len(self):
+            for item in items:
+                self.add(item)
+            return
+        merged = list(self) + items
+        merged.sort(key=attrgetter('key'))
+        self.root = _build(merged, 0, len(merged))
+        self.length = len(merged)
+
+    def delete_at_index(self, index: int) -> ListItem:
+        """ Delete item at a given position.
+        :complexity: O(log n)
+        :raises IndexError: if there is no such position
+        """
+        if not 0 <= index < len(self):
+            raise IndexError('No such index in the list')
+        self.root, item = _delete_at(self.root, index)
+        self.length -= 1
+        return item
+
+    def index(self, item: ListItem) -> int:
+        """ Find the position of a given item in the list.
+        :complexity: O(d log n), for d items with the same key as item
+        :raises ValueError: if the item is not in the list
+        """
+        pos = self.rank(item.key)
+        while pos < len(self):
+            current = self[pos]
+            if current.key != item.key:
+                break
+            if current == item:
+                return pos
+            pos += 1
+        raise ValueError('item not in list')
+
+    def __contains__(self, item: ListItem) -> bool:
+        """ Checks if value is in the list.
+        :complexity: O(d log n), as for index
+        """
+        try:
+            self.index(item)
+            return True
+        except ValueError:
+            return False
+
+    def __iter__(self):
+        """ Iterates through the items in order.
+        :complexity: O(n) for the whole iteration
+        """
+        stack = []
+        node = self.root
+        while stack or node is not None:
+            while node is not None:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            yield node.item
+            node = node.right
@@ -0,0 +1,215 @@
+""" Typed arrays of unboxed values, the typed siblings of ArrayR.
+
+ArrayR holds a reference to a Python object in every position, so even small
+ints and colours are boxed. The arrays here store the values themselves, packed
+in an array.array (or in any writable buffer given to from_buffer), and export
+that memory through the buffer protocol: view() returns a memoryview of it
+without copying, so NumPy, files, sockets and shared memory can read and write
+the values directly.
+
+    Int8ArrayR    signed 8-bit ints
+    UInt8ArrayR   unsigned 8-bit ints
+    Int32ArrayR   signed 32-bit ints
+    RGBArrayR     (r, g, b) colours, 3 bytes each
+
+Like ArrayR, the arrays have a fixed length. Bulk fill and slice copy are done
+by memory copies rather than a Python loop per position.
+"""
+from __future__ import annotations
+
+__docformat__ = 'reStructuredText'
+
+from array import array
+
+
+class TypedArrayR:
+    """ Fixed length array of values stored unboxed, as TYPECODE items.
+
+    Attributes:
+         array (array | memoryview): the packed values, WIDTH items per position
+    """
+    __slots__ = ('array',)
+    TYPECODE = 'b'
+    # Number of TYPECODE items in each position.
+    WIDTH = 1
+
+    def __init__(self, length: int, fill=0) -> None:
+        """ Creates an array of the given length with every position set to fill.
+        :complexity: O(length), done as one memory copy
+        :pre: length > 0
+        """
+        if length <= 0:
+            raise ValueError("Array length should be larger than 0.")
+        self.array = self._repeat(fill, length)
+
+    @classmethod
+    def from_buffer(cls, buffer, length: int | None = None) -> TypedArrayR:
+        """ Creates an array that shares the memory of a writable buffer
+        (a bytearray, mmap, shared memory block, NumPy array...), without copying it.
+        :complexity: O(1)
+        :pre: the buffer is C-contiguous and holds at least length positions
+        :raises ValueError: if the buffer is too short or its size is not a whole number of positions
+        """
+        view = memoryview(buffer).cast('B')
+        item_size = array(cls.TYPECODE).itemsize * cls.WIDTH
+        if length is None:
+            if len(view) % item_size:
+                raise ValueError("Buffer size is not a whole number of positions.")
+            length = len(view) // item_size
+        if length <= 0 or length * item_size > len(view):
+            raise ValueError("Buffer does not hold a positive length of positions.")
+        typed = cls.__new__(cls)
+        typed.array = view[:length * item_size].cast(cls.TYPECODE)
+        return typed
+
+    def _repeat(self, value, count: int) -> array:
+        """ An array.array of value repeated count times. """
+        return array(self.TYPECODE, [value]) * count
+
+    def __len__(self) -> int:
+        """ Returns the length of the array
+        :complexity: O(1)
+        """
+        return len(self.array) // self.WIDTH
+
+    def __getitem__(self, index: int) -> int:
+        """ Returns the value in position index.
+        :complexity: O(1)
+        :pre: index in between 0 and length - self.array[] checks it
+        """
+        return self.array[index]
+
+    def __setitem__(self, index: int, value: int) -> None:
+        """ Sets the value in position index
+        :complexity: O(1)
+        :pre: index in between 0 and length - self.array[] checks it
+        :raises OverflowError: if the value does not fit in the type
+        """
+        self.array[index] = value
+
+    def __iter__(self):
+        """ Iterates through the values in position order.
+        :complexity: O(length) for the whole iteration
+        """
+        for index in range(len(self)):
+            yield self[index]
+
+    def _bounds(self, start: int, end: int | None) -> tuple[int, int]:
+        end = len(self) if end is None else end
+        if not 0 <= start <= end <= len(self):
+            raise IndexError(f"Range [{start}, {end}) is out of bounds.")
+        return start, end
+
+    def fill(self, value, start: int = 0, end: int | None = None) -> None:
+        """ Sets every position in [start, end) to value.
+        :complexity: O(end - start), done as one memory copy
+        :raises IndexError: if the range is out of bounds
+        """
+        start, end = self._bounds(start, end)
+        if end > start:
+            self.array[start * self.WIDTH:end * self.WIDTH] = self._repeat(value, end - start)
+
+    def copy_from(self, source: TypedArrayR, start: int = 0, source_start: int = 0, count: int | None = None) -> None:
+        """ Copies count positions of source, from source_start, into this array from start.
+        The two ranges may overlap, in which case the copy behaves as if through a temporary array.
+        :complexity: O(count), done as one memory copy
+        :pre: source is an array of the same type
+        :raises IndexError: if either range is out of bounds
+        """
+        if type(source) is not type(self):
+            raise TypeError(f"Cannot copy a {type(source).__name__} into a {type(self).__name__}.")
+        if count is None:
+            count = min(len(source) - source_start, len(self) - start)
+        source_start, source_end = source._bounds(source_start, source_start + count)
+        start, end = self._bounds(start, start + count)
+        width = self.WIDTH
+        memoryview(self.array)[start * width:end * width] = memoryview(source.array)[source_start * width:source_end * width]
+
+    def view(self) -> memoryview:
+        """ Returns a writable memoryview of the values, sharing their memory.
+        :complexity: O(1)
+        """
+        return memoryview(self.array)
+
+    def __buffer__(self, flags: int) -> memoryview:
+        """ Buffer protocol (Python 3.12+), so memoryview(typed) and NumPy can use the array directly. """
+        return memoryview(self.array)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({list(self)})"
+
+
+class Int8ArrayR(TypedArrayR):
+    """ Array of signed 8-bit ints. """
+    __slots__ = ()
+    TYPECODE = 'b'
+
+
+class UInt8ArrayR(TypedArrayR):
+    """ Array of unsigned 8-bit ints. """
+    __slots__ = ()
+    TYPECODE = 'B'
+
+
+class Int32ArrayR(TypedArrayR):
+    """ Array of signed 32-bit ints. """
+    __slots__ = ()
+    TYPECODE = 'i' if array('i').itemsize == 4 else 'l'
+
+
+class RGBArrayR(TypedArrayR):
+    """ Array of (r, g, b) colours, stored as 3 unsigned bytes each.
+    view() gives a memoryview of shape (length, 3).
+    """
+    __slots__ = ()
+    TYPECODE = 'B'
+    WIDTH = 3
+
+    def __init__(self, length: int, fill: tuple[int, int, int] = (0, 0, 0)) -> None:
+        """ Creates an array of the given length with every position set to the colour fill.
+        :complexity: O(length), done as one memory copy
+        :pre: length > 0
+        """
+        super().__init__(length, fill)
+
+    def _repeat(self, value: tuple[int, int, int], count: int) -> array:
+        return array('B', value) * count
+
+    def __getitem__(self, index: int) -> tuple[int, int, int]:
+        """ Returns the colour in position index.
+        :complexity: O(1)
+        :raises IndexError: if the index is out of range
+        """
+        if not 0 <= index < len(self):
+            raise IndexError(f"Index {index} is out of range.")
+        i = 3 * index
+        values = self.array
+        return (values[i], values[i + 1], values[i + 2])
+
+    def __setitem__(self, index: int, value: tuple[int, int, int]) -> None:
+        """ Sets the colour in position index.
+        :complexity: O(1)
+        :raises IndexError: if the index is out of range
+        """
+        if not 0 <= index < len(self):
+            raise IndexError(f"Index {index} is out of range.")
+        i = 3 * index
+        values = self.array
+        values[i], values[i + 1], values[i + 2] = value
+
+    def get_into(self, index: int, rgb) -> None:
+        """ Writes the colour in position index into the mutable buffer rgb, without allocating.
+        :complexity: O(1)
+        :pre: index in between 0 and length
+        """
+        i = 3 * index
+        values = self.array
+        rgb[0] = values[i]
+        rgb[1] = values[i + 1]
+        rgb[2] = values[i + 2]
+
+    def view(self) -> memoryview:
+        """ Returns a writable memoryview of shape (length, 3), sharing the colours' memory.
+        :complexity: O(1)
+        """
+        return memoryview(self.array).cast('B', (len(self), 3))
@@ -1,6 +1,162 @@
 from __future__ import annotations
+import mmap
+import os
+import struct
+import sys
+from array import array
+from data_structures.persistent_array import PersistentArray
 from data_structures.referential_array import ArrayR
 from layer_store import *
+from layer_util import get_layers
+
+
+class GridSnapshot:
+    """
+    Immutable copy of the contents of a grid, as returned by Grid.snapshot().
+
+    The grid is split in TILE_SIZE x TILE_SIZE tiles, and each tile is a tuple of store states.
+    The tiles are kept in a PersistentArray, so snapshots share every tile that did not change between them.
+    """
+    __slots__ = ('draw_style', 'x', 'y', 'tiles')
+
+    def __init__(self, draw_style: str, x: int, y: int, tiles: PersistentArray[tuple]) -> None:
+        self.draw_style = draw_style
+        self.x = x
+        self.y = y
+        self.tiles = tiles
+
+    def state(self, x: int, y: int) -> tuple:
+        """ The state of the store on square (x, y), see LayerStore.get_state. """
+        tiles_y = (self.y + Grid.TILE_SIZE - 1) >> Grid.TILE_BITS
+        tile = self.tiles[(x >> Grid.TILE_BITS) * tiles_y + (y >> Grid.TILE_BITS)]
+        return tile[((x & Grid.TILE_MASK) << Grid.TILE_BITS) | (y & Grid.TILE_MASK)]
+
+    @classmethod
+    def empty(cls, draw_style: str, x: int, y: int) -> GridSnapshot:
+        """ The snapshot of an empty grid, made without building one. Every tile shares the same tuple. """
+        tiles_y = (y + Grid.TILE_SIZE - 1) >> Grid.TILE_BITS
+        empty_tile = (Grid.LAYER_STORES[draw_style]().get_state(),) * (Grid.TILE_SIZE * Grid.TILE_SIZE)
+        return cls(draw_style, x, y, PersistentArray(((x + Grid.TILE_SIZE - 1) >> Grid.TILE_BITS) * tiles_y, empty_tile))
+
+    def to_grid(self) -> Grid:
+        """ Builds a new grid showing this snapshot. """
+        grid = Grid(self.draw_style, self.x, self.y)
+        grid.restore(self)
+        return grid
+
+
+class _GridFile:
+    """
+    The arrays of a grid file saved by Grid.save, read through a memory map.
+
+    Square (x, y) is cell x * y_size + y. Its layers are the layer indices
+    indices[offsets[cell]:offsets[cell + 1]], and for SET grids bit cell of flags is whether it is inverted.
+    """
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as f:
+            self.stat = os.fstat(f.fileno())
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.views = []
+        try:
+            self._read_header()
+        except ValueError:
+            self.close()
+            raise
+        self.layers = get_layers()
+
+    def _read_header(self) -> None:
+        view = self._view(memoryview(self.map))
+        if len(view) < Grid.FILE_HEADER.size:
+            raise ValueError("Not a grid file.")
+        magic, version, style, index_size, x, y, total = Grid.FILE_HEADER.unpack_from(view)
+        if magic != Grid.FILE_MAGIC or version != Grid.FILE_VERSION or index_size not in (1, 2) \
+                or style >= len(Grid.DRAW_STYLE_OPTIONS):
+            raise ValueError("Not a grid file, or a grid file of another version.")
+        self.draw_style = Grid.DRAW_STYLE_OPTIONS[style]
+        self.x, self.y = x, y
+        cells = x * y
+        flags_size = (cells + 7) >> 3 if self.draw_style == Grid.DRAW_STYLE_SET else 0
+        if len(view) < Grid.FILE_HEADER.size + 4 * (cells + 1) + index_size * total + flags_size:
+            raise ValueError("Grid file is truncated.")
+        start = Grid.FILE_HEADER.size
+        end = start + 4 * (cells + 1)
+        self.offsets = self._array(view[start:end], 'I')
+        start, end = end, end + index_size * total
+        self.indices = self._array(view[start:end], 'B' if index_size == 1 else 'H')
+        self.flags = self._view(view[end:end + flags_size])
+
+    def _view(self, view: memoryview) -> memoryview:
+        """ Keeps a view of the map, to be released before the map is closed. """
+        self.views.append(view)
+        return view
+
+    def close(self) -> None:
+        """ Releases the views of the map and closes it. The squares can not be read after this. """
+        for view in reversed(self.views):
+            view.release()
+        self.views = []
+        self.map.close()
+
+    def _array(self, view: memoryview, typecode: str):
+        """ The view as an array of typecode, without a copy when the byte order allows it. """
+        if sys.byteorder == "little":
+            return self._view(view.cast(typecode))
+        values = array(typecode, view.tobytes())
+        values.byteswap()
+        return values
+
+    def state(self, x: int, y: int) -> tuple:
+        """ The state of the store on square (x, y), see LayerStore.get_state. """
+        cell = x * self.y + y
+        layers = []
+        for index in self.indices[self.offsets[cell]:self.offsets[cell + 1]]:
+            layer = self.layers[index]
+            if layer is None:
+                raise ValueError(f"Grid file uses layer {index}, which is not registered.")
+            layers.append(layer)
+        if self.draw_style == Grid.DRAW_STYLE_SET:
+            return (layers[0] if layers else None, bool(self.flags[cell >> 3] >> (cell & 7) & 1))
+        return tuple(layers)
+
+
+class _MappedRow:
+    """
+    A row of a grid loaded by Grid.load. Squares are only built from the file when first accessed.
+    """
+    __slots__ = ('file', 'x', 'squares', 'dirty', 'tile_row')
+
+    def __init__(self, file: _GridFile, x: int, dirty: set, tiles_y: int) -> None:
+        self.file = file
+        self.x = x
+        self.squares = ArrayR(file.y)
+        # The built squares mark their tile of the grid dirty when changed, see LayerStore.watch.
+        self.dirty = dirty
+        self.tile_row = (x >> Grid.TILE_BITS) * tiles_y
+
+    def __len__(self) -> int:
+        return len(self.squares)
+
+    def __getitem__(self, y: int) -> LayerStore:
+        square = self.squares[y]
+        if square is None:
+            square = Grid.LAYER_STORES[self.file.draw_style]()
+            square.set_state(self.file.state(self.x, y))
+            square.watch(self.dirty, self.tile_row + (y >> Grid.TILE_BITS))
+            self.squares[y] = square
+        return square
+
+    def __setitem__(self, y: int, square: LayerStore) -> None:
+        self.squares[y] = square
+
+    def state(self, y: int) -> tuple:
+        """ The state of square y, read from the file if it has not been built yet. """
+        square = self.squares[y]
+        if square is None:
+            return self.file.state(self.x, y)
+        return square.get_state()
+
+
 class Grid:
     DRAW_STYLE_SET = "SET"
     DRAW_STYLE_ADD = "ADD"
@@ -15,6 +171,22 @@ class Grid:
     MAX_BRUSH = 5
     MIN_BRUSH = 0
 
+    # Snapshots copy the grid a tile of TILE_SIZE x TILE_SIZE squares at a time.
+    TILE_BITS = 4
+    TILE_SIZE = 1 << TILE_BITS
+    TILE_MASK = TILE_SIZE - 1
+
+    LAYER_STORES = {
+        DRAW_STYLE_SET: SetLayerStore,
+        DRAW_STYLE_ADD: AdditiveLayerStore,
+        DRAW_STYLE_SEQUENCE: SequenceLayerStore,
+    }
+
+    # Grid files: magic, version, draw style, bytes per layer index, x, y, total number of layer indices.
+    FILE_MAGIC = b"DRWGRD"
+    FILE_VERSION = 1
+    FILE_HEADER = struct.Struct("<6sBBBxxxIIQ")
+
 
 # Complexity analysis:
 # The if comparison is O(Comp==).
@@ -23,7 +195,7 @@ class Grid:
 # Inside the for loop all assignment is constant.
 # Thus, in worst case, time complexity is O(Comp==)*O(x)*(O(1)+O(y))*O(1) = O(Comp==*x*y)
 #  Best case = worst case
-    def __init__(self, draw_style, x, y) -> None:
+    def __init__(self, draw_style, x, y, file: _GridFile | None = None) -> None:
         """
         Initialise the grid object.
         - draw_style:
@@ -31,6 +203,7 @@ class Grid:
             Should be one of DRAW_STYLE_OPTIONS
             This draw style determines the LayerStore used on each grid square.
         - x, y: The dimensions of the grid.
+        - file: For Grid.load, the grid file whose squares the grid shows.
 
         Should also intialise the brush size to the DEFAULT provided as a class variable.
         """
@@ -38,17 +211,28 @@ class Grid:
 # Initialise the self.brush_size with the value self.DEFAULT_BRUSH_SIZE
 # Initialise the self.grid with class ArrayR(x)
         self.brush_size = self.DEFAULT_BRUSH_SIZE
+        self.draw_style = draw_style
         self.grid = ArrayR(x)
+        self.file = file
+        self._init_tiles(x, y)
+
+# Explanation coding concept:
+# If the grid shows a file, each row is a _MappedRow, which only builds the LayerStore of a square
+# from the file when it is first accessed.
+        if file is not None:
+            for row in range(x):
+                self.grid[row] = _MappedRow(file, row, self.dirty_tiles, self.tiles_y)
 
 # Explanation coding concept:
 # If the draw_style is "SET", applying the class SetLayerStore() on each grid square.
 # The first for loop is to apply ArrayR with the dimension y to all the rows of grid.
 # The second for loop is to apply SetLayerStore() to every grid square.
-        if draw_style == self.DRAW_STYLE_SET:
+        elif draw_style == self.DRAW_STYLE_SET:
             for row in range(x):
                 self.grid[row]=ArrayR(y)
                 for column in range(y):
                     self.grid[row][column] = SetLayerStore()
+                    self.grid[row][column].watch(self.dirty_tiles, self._tile_of(row, column))
 
 # Explanation coding concept:
 # If the draw_style is "ADD", applying the class AdditiveLayerStore() on each grid square.
@@ -59,6 +243,7 @@ class Grid:
                 self.grid[row]=ArrayR(y)
                 for column in range(y):
                     self.grid[row][column] = AdditiveLayerStore()
+                    self.grid[row][column].watch(self.dirty_tiles, self._tile_of(row, column))
 
 # Explanation coding concept:
 # If the draw_style is "SEQUENCE", applying the class SequenceLayerStore() on each grid square.
@@ -69,10 +254,217 @@ class Grid:
                 self.grid[row]=ArrayR(y)
                 for column in range(y):
                     self.grid[row][column] = SequenceLayerStore()
+                    self.grid[row][column].watch(self.dirty_tiles, self._tile_of(row, column))
+
+        # The tiles for snapshots start all dirty when the grid shows a file, since it is not empty.
+        self.all_dirty = file is not None
+
+# Explanation coding concept:
+# Every tile of the first snapshot holds the state of an empty store,
+# so they can all share the same tuple (see GridSnapshot.empty).
+    def _init_tiles(self, x: int, y: int) -> None:
+        self.tiles_y = (y + self.TILE_SIZE - 1) >> self.TILE_BITS
+        self.tiles = GridSnapshot.empty(self.draw_style, x, y).tiles
+        self.dirty_tiles = set()
+        self.all_dirty = False
+        self.last_snapshot = None
 
     def __getitem__(self, index):
         return self.grid[index]
 
+    def _tile_of(self, x: int, y: int) -> int:
+        return (x >> self.TILE_BITS) * self.tiles_y + (y >> self.TILE_BITS)
+
+# Explanation coding concept:
+# Marks the tile of square (x, y) as changed since the last snapshot.
+# Every square watches the grid's set of dirty tiles (see LayerStore.watch) and marks its own tile
+# whenever it changes, so this is only needed when a square is replaced rather than changed.
+
+# Complexity analysis:
+# Best case = Worst case = O(1)
+    def touch(self, x: int, y: int) -> None:
+        """
+        Record that square (x, y) was changed, so that the next snapshot includes it.
+        """
+        self.dirty_tiles.add(self._tile_of(x, y))
+
+# Explanation coding concept:
+# Only the tiles changed since the last snapshot are read again from the squares.
+# Each of them is written into the persistent array of tiles, which copies one path of the tree
+# and shares everything else with the previous snapshot.
+# If nothing changed, the previous snapshot is returned as is.
+
+# Complexity analysis:
+# Let t be the number of tiles changed since the last snapshot, and T the total number of tiles.
+# Worst case: O(t * (TILE_SIZE^2 * Comp(get_state) + log T))
+# Best case: O(1), when nothing changed.
+    def snapshot(self) -> GridSnapshot:
+        """
+        Returns an immutable copy of the contents of the grid.
+        Only the tiles touched since the previous snapshot are copied.
+        """
+        if self.all_dirty:
+            dirty = range(len(self.tiles))
+        else:
+            dirty = self.dirty_tiles
+        if dirty or self.last_snapshot is None:
+            tiles = self.tiles
+            for tile in dirty:
+                tiles = tiles.set(tile, self._read_tile(tile))
+            self.tiles = tiles
+            # Cleared rather than replaced, since every square holds on to this set.
+            self.dirty_tiles.clear()
+            self.all_dirty = False
+            self.last_snapshot = GridSnapshot(self.draw_style, len(self.grid), len(self.grid[0]), tiles)
+        return self.last_snapshot
+
+# Explanation coding concept:
+# First bring the tiles of the grid up to date with a snapshot.
+# Then only the tiles which are not shared with the snapshot to restore are written back,
+# and in those only the squares whose state differs.
+
+# Complexity analysis:
+# Let d be the number of tiles that differ between the grid and the snapshot.
+# Worst case: O(d * TILE_SIZE^2 * Comp(set_state)) (plus the cost of the snapshot)
+# Best case: O(1), when the grid already shows the snapshot.
+    def restore(self, snapshot: GridSnapshot) -> None:
+        """
+        Makes the grid show a snapshot taken from this grid, or a grid of the same size and draw style.
+        """
+        if (snapshot.draw_style, snapshot.x, snapshot.y) != (self.draw_style, len(self.grid), len(self.grid[0])):
+            raise ValueError("Snapshot does not match the size and draw style of the grid.")
+        current = self.snapshot()
+        if current is snapshot:
+            return
+        for tile in self.tiles.diff(snapshot.tiles):
+            self._write_tile(tile, self.tiles[tile], snapshot.tiles[tile])
+        # The squares written mark their tiles dirty, but those tiles now match the snapshot.
+        self.dirty_tiles.clear()
+        self.tiles = snapshot.tiles
+        self.last_snapshot = snapshot
+
+    def _tile_squares(self, tile: int):
+        """ Yields (position in tile, x, y) for every square of the grid inside a tile. """
+        tile_x, tile_y = divmod(tile, self.tiles_y)
+        x0, y0 = tile_x << self.TILE_BITS, tile_y << self.TILE_BITS
+        for x in range(x0, min(x0 + self.TILE_SIZE, len(self.grid))):
+            for y in range(y0, min(y0 + self.TILE_SIZE, len(self.grid[0]))):
+                yield ((x - x0) << self.TILE_BITS) | (y - y0), x, y
+
+    def _read_tile(self, tile: int) -> tuple:
+        states = list(self.tiles[tile])
+        for position, x, y in self._tile_squares(tile):
+            states[position] = self.grid[x][y].get_state()
+        return tuple(states)
+
+    def _write_tile(self, tile: int, old: tuple, new: tuple) -> None:
+        for position, x, y in self._tile_squares(tile):
+            if old[position] != new[position]:
+                self.grid[x][y].set_state(new[position])
+
+# Explanation coding concept:
+# The file is columnar: a header, then the offsets of every square's layers (x*y + 1 uint32),
+# then the layer indices of all squares one after the other (uint8, or uint16 if an index needs it),
+# then for SET grids one bit per square for whether it is inverted.
+# Squares of a loaded grid that were never accessed are copied from its file without being built.
+
+# Complexity analysis:
+# Let n be the number of squares and L the total number of layers on them.
+# Best case = Worst case = O(n + L) (plus the cost of get_state on the squares that were built)
+    def save(self, path: str) -> None:
+        """
+        Saves the contents of the grid to a file, which Grid.load reads back.
+        """
+        x, y = len(self.grid), len(self.grid[0])
+        offsets = array('I', [0])
+        indices = array('H')
+        flags = bytearray((x * y + 7) >> 3 if self.draw_style == self.DRAW_STYLE_SET else 0)
+        cell = 0
+        for i in range(x):
+            row = self.grid[i]
+            for j in range(y):
+                state = row.state(j) if isinstance(row, _MappedRow) else row[j].get_state()
+                if self.draw_style == self.DRAW_STYLE_SET:
+                    layer, inverted = state
+                    if layer is not None:
+                        indices.append(layer.index)
+                    if inverted:
+                        flags[cell >> 3] |= 1 << (cell & 7)
+                else:
+                    for layer in state:
+                        indices.append(layer.index)
+                offsets.append(len(indices))
+                cell += 1
+        if not indices or max(indices) <= 0xFF:
+            indices = array('B', indices)
+        if sys.byteorder != "little":
+            offsets.byteswap()
+            indices.byteswap()
+        header = self.FILE_HEADER.pack(self.FILE_MAGIC, self.FILE_VERSION,
+                                       self.DRAW_STYLE_OPTIONS.index(self.draw_style),
+                                       indices.itemsize, x, y, len(indices))
+        # The file is written under another name and then renamed, so a grid file is never seen half written.
+        partial = f"{path}.{os.getpid()}.partial"
+        try:
+            with open(partial, "wb") as f:
+                f.write(header)
+                f.write(offsets)
+                f.write(indices)
+                f.write(flags)
+            if self.file is not None and os.path.exists(path) and os.path.samestat(self.file.stat, os.stat(path)):
+                # Saving over the file this grid shows: the squares not built yet read it,
+                # so it is closed while it is replaced, and they read the new file from then on,
+                # which holds the same states.
+                self.file.close()
+                try:
+                    os.replace(partial, path)
+                finally:
+                    self._map(_GridFile(path))
+            else:
+                os.replace(partial, path)
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+
+    def _map(self, file: _GridFile) -> None:
+        self.file = file
+        for row in range(len(self.grid)):
+            self.grid[row].file = file
+
+# Explanation coding concept:
+# Every square not built yet is built from the file, so the file is no longer needed and can be closed.
+
+# Complexity analysis:
+# Let n be the number of squares not built yet. Best case = Worst case = O(n * Comp(set_state))
+    def close(self) -> None:
+        """
+        Closes the file of a grid loaded by Grid.load, after building every square from it.
+        The file can then be changed or deleted. Does nothing for other grids.
+        """
+        if self.file is None:
+            return
+        for row in range(len(self.grid)):
+            for column in range(len(self.grid[row])):
+                self.grid[row][column]
+        self.file.close()
+        self.file = None
+
+# Explanation coding concept:
+# The file is memory mapped, and the grid is made to show it, see __init__.
+
+# Complexity analysis:
+# Best case = Worst case = O(x), to make the rows, whatever the number of layers in the file.
+    @classmethod
+    def load(cls, path: str) -> Grid:
+        """
+        Loads a grid saved by Grid.save.
+        Only Grid.save should change the file while the grid is in use, until Grid.close.
+
+        :raises ValueError: if the file is not a grid file, or is truncated
+        """
+        file = _GridFile(path)
+        return cls(file.draw_style, file.x, file.y, file)
+
 # Explanation coding concept:
 # First, checking the brush size is at maximum size or not.
 # If the brush size is smaller than maximum brush size, brush size added by 1, otherwise do nothing.
@@ -117,15 +509,14 @@ class Grid:
 # Let the size of self.grid be n
 # Let the size of self.grid[0] be m
 # Let the size of myQueue be a
-# Let the size of myStack be b
 # Let the size of mySortedlist be c
 # Let the size of lexicographic_list be d
 # If draw_style == "SET",
 # Worst case: O(n)*O(m)*O(1) = O(n*m)
 # Best case: O(n)*O(m)*O(1) = O(n*m)
 # If draw_style == "ADD"",
-# Worst case: O(n)*O(m)*O(a+b) = O(n*m*(a+b))
-# Best case: O(n)*O(m)*O(a+b) = O(n*m*(a+b))
+# Worst case: O(n)*O(m)*O(a) = O(n*m*a)
+# Best case: O(n)*O(m)*O(a) = O(n*m*a)
 # If draw_style == "SEQUENCE",
 # Worst case: O(n)*O(m)*O(c^2+d^2) = O(n*m*(c^2+d^2))
 # Best case: O(n)*O(m)*O(1) = O(n*m)
@@ -136,5 +527,6 @@ class Grid:
         for i in range(len(self.grid)):
             for j in range(len(self.grid[0])):
                 self.grid[i][j].special()   #Call layerstore special
+        self.all_dirty = True
 
 
@@ -0,0 +1,534 @@
+from __future__ import annotations
+"""
+Append-only binary journal of a drawing session, so that it can be recovered after a crash.
+
+The file starts with MAGIC, followed by records. Each record is
+
+    varint payload length | payload | crc32 of the payload (4 bytes, little endian)
+
+and each payload starts with a kind byte:
+
+    PAINT    varint number of steps, varint number of layers, the layer indices,
+             one layer id per step when there is more than one layer, then each cell
+             as zigzag varint deltas of x and y from the previous cell.
+    SPECIAL  nothing more.
+    UNDO     varint distance back to the record that holds the undone action.
+    REDO     varint distance back to the record that holds the redone action.
+    RESET    a new canvas: varint length and ASCII draw style, varint width, varint height.
+    FORGET   varint distance back to a record whose action will not be referred to again,
+             so readers can drop it. It is not yielded by recover or follow.
+
+A session starting a new canvas can start a new journal file for it (see Journal.reset), which
+replaces the old one, so the journal only holds the current canvas.
+
+Records are numbered from 0 in file order. A PAINT or SPECIAL kind with the INVERSE bit set
+holds an undo of an action that is not in the journal.
+A record that is cut short or fails its checksum ends the journal: it and anything after it is dropped.
+A record with a valid checksum is never dropped. If it cannot be read, for example because it uses
+a layer index that is not registered (a layer plugin the session used was not registered), reading
+raises ValueError and the journal cannot be started until it is read without error.
+"""
+
+import os
+import threading
+import time
+import zlib
+from array import array
+from dataclasses import dataclass
+from typing import Iterator
+from action import PaintAction
+from layer_util import get_layers
+
+MAGIC = b"DRWJ\x01"
+
+PAINT = 0
+SPECIAL = 1
+UNDO = 2
+REDO = 3
+RESET = 4
+FORGET = 5
+INVERSE = 0x80
+
+# Longest payload accepted when reading. Anything longer can only be a corrupt length.
+MAX_PAYLOAD = 1 << 26
+READ_SIZE = 1 << 20
+
+
+@dataclass(slots=True)
+class JournalRecord:
+    """ One record read back from a journal. """
+
+    seq: int
+    kind: int
+    action: PaintAction | None = None
+    is_undo: bool = False
+    draw_style: str | None = None
+    width: int = 0
+    height: int = 0
+
+
+def _put_varint(out: bytearray, n: int) -> None:
+    while n >= 0x80:
+        out.append(n & 0x7F | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _get_varint(buf, pos: int) -> tuple[int, int]:
+    """ Returns the varint at pos and the position after it.
+    :raises IndexError: if the buffer ends inside the varint
+    """
+    result = shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _put_signed(out: bytearray, n: int) -> None:
+    """ Zigzag encoding, so that small negative deltas stay one byte. """
+    _put_varint(out, n << 1 if n >= 0 else (-n << 1) - 1)
+
+
+def _get_signed(buf, pos: int) -> tuple[int, int]:
+    n, pos = _get_varint(buf, pos)
+    return (n >> 1) if not n & 1 else -((n + 1) >> 1), pos
+
+
+def _replaced(f, path: str) -> bool:
+    """ Whether path now names another file than the open file f. """
+    try:
+        return not os.path.samestat(os.fstat(f.fileno()), os.stat(path))
+    except FileNotFoundError:
+        return False
+
+
+class Journal:
+    """
+    Journal of the actions of a session, written to `path`.
+
+    Usage:  journal = Journal(path)
+            for record in journal.recover():   # optional, to pick up an existing journal
+                ...
+            journal.start()
+            journal.record(action, is_undo)    # for every action, like ReplayTracker.add_action
+            journal.close()
+
+    record() only encodes the action and queues the bytes. A background thread writes the
+    queued records every `flush_interval` seconds, and fsyncs the file at most every
+    `fsync_interval` seconds (None: only on sync and close), so the UI never waits on the disk.
+    """
+
+    DEFAULT_FLUSH_INTERVAL = 0.05
+    DEFAULT_FSYNC_INTERVAL = 1.0
+
+    def __init__(self, path: str, flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+                 fsync_interval: float | None = DEFAULT_FSYNC_INTERVAL) -> None:
+        self.path = path
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.seq = 0
+        # Where the last valid record ends, so a damaged tail can be cut off before appending.
+        self.valid_end = 0
+        # Why the last read stopped at a record with a valid checksum, which start() must not cut off.
+        self.unreadable = None
+        # id(action) -> (record number, action). The action is kept so its id is not reused.
+        self.known = {}
+        self.pending = []
+        self.closing = False
+        self.file = None
+        # Whether follow() stopped reading a file because the writer replaced it.
+        self.replaced = False
+        self.thread = None
+        self.condition = threading.Condition()
+        self.io_lock = threading.Lock()
+        self.last_fsync = time.monotonic()
+        # Whether records were written since the last fsync.
+        self.unsynced = False
+
+# Explanation coding concept:
+# Stream the file in large reads, and cut each record out of the buffer once all of its bytes are there.
+# Actions read back are remembered by record number, so later UNDO / REDO records can point back to them,
+# and so can the records written after the journal is started again, until a FORGET record drops them.
+
+# Complexity analysis:
+# O(n) in the size of the file, holding one read buffer and the recovered actions in memory.
+    def recover(self) -> Iterator[JournalRecord]:
+        """
+        Yields the records of the existing journal at `path`, in order.
+        Stops at the first damaged record. Yields nothing if there is no journal.
+
+        :raises ValueError: if a record with a valid checksum cannot be read, see the module docstring
+        """
+        self.seq = 0
+        self.valid_end = 0
+        self.unreadable = None
+        self.known = {}
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return
+        with f:
+            if f.read(len(MAGIC)) != MAGIC:
+                return
+            self.valid_end = len(MAGIC)
+            yield from self._records(f)
+
+# Explanation coding concept:
+# Like recover, but the end of the file is not the end of the journal: None is yielded instead,
+# and the next read carries on from there, picking up the records written since.
+# A record cut short stays in the read buffer until the rest of it is written.
+# When the writer replaces the file with a new one (see reset), the rest of the old file is read,
+# then the new file is opened and read from its start.
+
+# Complexity analysis:
+# O(n) in the size of the file read so far, holding the recovered actions in memory.
+    def follow(self) -> Iterator[JournalRecord | None]:
+        """
+        Yields the records of the journal at `path` as they are written, to watch a running session.
+        Yields None whenever it has caught up with the writer, or there is no journal yet,
+        so the caller can wait before asking for more. Stops at the first damaged record.
+        A new journal file started by the writer is followed too, from its first record (a RESET).
+        """
+        while True:
+            self.seq = 0
+            self.valid_end = 0
+            self.unreadable = None
+            self.known = {}
+            self.replaced = False
+            while True:
+                try:
+                    f = open(self.path, "rb")
+                    break
+                except FileNotFoundError:
+                    yield None
+            with f:
+                head = b""
+                while len(head) < len(MAGIC):
+                    chunk = f.read(len(MAGIC) - len(head))
+                    if not chunk:
+                        yield None
+                    head += chunk
+                if head != MAGIC:
+                    return
+                self.valid_end = len(MAGIC)
+                yield from self._records(f, follow=True)
+            if not self.replaced:
+                return
+
+    def _records(self, f, follow: bool = False) -> Iterator[JournalRecord | None]:
+        layers = get_layers()
+        by_seq = {}
+        valid_end = self.valid_end
+        for payload in self._payloads(f, follow):
+            if payload is None:
+                yield None
+                continue
+            try:
+                record = self._decode(payload, layers, by_seq)
+            except (IndexError, ValueError) as e:
+                # The checksum is valid, so the record is not damaged: this program does not match the one
+                # which wrote the journal. Nothing may be cut off, so start() refuses to run after this.
+                self.valid_end = valid_end
+                self.unreadable = f"Journal {self.path} does not match this program: {e}"
+                raise ValueError(self.unreadable) from e
+            valid_end = self.valid_end
+            self.seq += 1
+            if record.kind == FORGET:
+                continue
+            if record.kind == RESET:
+                self.known = {}
+                by_seq = {}
+            elif record.kind in (PAINT, SPECIAL) and not record.is_undo:
+                self.known[id(record.action)] = (record.seq, record.action)
+                by_seq[record.seq] = record.action
+            yield record
+
+    def _payloads(self, f, follow: bool = False) -> Iterator[bytes | None]:
+        """ Cuts the checksummed payloads out of the file. When following, yields None at the end of the file. """
+        buf = b""
+        pos = 0
+        base = self.valid_end
+        while True:
+            try:
+                length, start = _get_varint(buf, pos)
+            except IndexError:
+                length, start = None, pos
+            if length is not None and length > MAX_PAYLOAD:
+                return
+            if length is not None and start + length + 4 <= len(buf):
+                end = start + length
+                payload = buf[start:end]
+                if zlib.crc32(payload) != int.from_bytes(buf[end:end + 4], "little"):
+                    return
+                pos = end + 4
+                self.valid_end = base + pos
+                yield payload
+                continue
+            chunk = f.read(READ_SIZE)
+            if not chunk and follow and _replaced(f, self.path):
+                # The writer started a new file. What it wrote to this one before that is read first.
+                chunk = f.read(READ_SIZE)
+                if not chunk:
+                    self.replaced = True
+                    return
+            if not chunk:
+                if not follow:
+                    return
+                yield None
+                continue
+            buf = buf[pos:] + chunk
+            base += pos
+            pos = 0
+
+    def _decode(self, payload: bytes, layers, by_seq: dict[int, PaintAction]) -> JournalRecord:
+        kind = payload[0]
+        record = JournalRecord(self.seq, kind & ~INVERSE, is_undo=bool(kind & INVERSE))
+        kind = record.kind
+        if kind == PAINT:
+            n, pos = _get_varint(payload, 1)
+            count, pos = _get_varint(payload, pos)
+            palette = []
+            for _ in range(count):
+                index, pos = _get_varint(payload, pos)
+                if index >= len(layers) or layers[index] is None:
+                    raise ValueError(f"record {self.seq} uses layer index {index}, which is not registered "
+                                     f"(register the layer plugins the session used before reading it)")
+                palette.append(layers[index])
+            layer_ids = None
+            if count > 1:
+                layer_ids = array('B' if count <= 0x100 else 'H')
+                for _ in range(n):
+                    layer_id, pos = _get_varint(payload, pos)
+                    layer_ids.append(layer_id)
+            cells = array('I')
+            x = y = 0
+            bits = PaintAction.CELL_BITS
+            for _ in range(n):
+                dx, pos = _get_signed(payload, pos)
+                dy, pos = _get_signed(payload, pos)
+                x += dx
+                y += dy
+                cells.append(x << bits | y)
+            action = PaintAction()
+            action.cells = cells
+            action.layers = palette
+            action.layer_ids = layer_ids
+            record.action = action
+        elif kind == SPECIAL:
+            record.action = PaintAction(is_special=True)
+        elif kind in (UNDO, REDO, FORGET):
+            distance, _ = _get_varint(payload, 1)
+            record.action = by_seq.get(self.seq - distance)
+            if record.action is None:
+                raise ValueError(f"record {self.seq} refers to an unknown record")
+            record.is_undo = kind == UNDO
+            if kind == FORGET:
+                del by_seq[self.seq - distance]
+                self.known.pop(id(record.action), None)
+        elif kind == RESET:
+            length, pos = _get_varint(payload, 1)
+            record.draw_style = payload[pos:pos + length].decode("ascii")
+            record.width, pos = _get_varint(payload, pos + length)
+            record.height, pos = _get_varint(payload, pos)
+        else:
+            raise ValueError(f"record {self.seq} has the unknown kind {kind}")
+        return record
+
+# Explanation coding concept:
+# Cut off anything after the last valid record, then open the file for appending.
+# A new file gets the MAGIC header first.
+
+# Complexity analysis:
+# O(1)
+    def start(self) -> None:
+        """
+        Opens the journal for writing and starts the writer thread.
+        Records after those read by recover() are dropped, so without recover() the journal starts empty.
+
+        :raises ValueError: if recover() stopped at a record it could not read, which would be dropped
+        """
+        if self.unreadable is not None:
+            raise ValueError(f"{self.unreadable}; not starting, as that would drop it and every later record")
+        if self.valid_end == 0:
+            self.file = open(self.path, "wb")
+            self.file.write(MAGIC)
+        else:
+            self.file = open(self.path, "r+b")
+            self.file.truncate(self.valid_end)
+            self.file.seek(self.valid_end)
+        self.closing = False
+        self.thread = threading.Thread(target=self._run, name="journal-writer", daemon=True)
+        self.thread.start()
+
+# Explanation coding concept:
+# An action seen before is written as a back reference (UNDO or REDO) to the record that holds it,
+# otherwise it is written in full and remembered, until it is forgotten.
+
+# Complexity analysis:
+# O(s) to encode an action of s steps, O(1) for a back reference.
+    def record(self, action: PaintAction, is_undo: bool = False) -> None:
+        """ Adds an action to the journal, with the same arguments as ReplayTracker.add_action. """
+        payload = bytearray()
+        known = self.known.get(id(action))
+        if known is not None and known[1] is action:
+            payload.append(UNDO if is_undo else REDO)
+            _put_varint(payload, self.seq - known[0])
+        else:
+            self._encode_action(payload, action, is_undo)
+            if not is_undo:
+                self.known[id(action)] = (self.seq, action)
+        self._queue(payload)
+
+# Explanation coding concept:
+# The action is dropped from the remembered ones, and a FORGET record tells readers to drop it too,
+# so that neither side holds on to every action of the session.
+
+# Complexity analysis:
+# O(1)
+    def forget(self, action: PaintAction) -> None:
+        """
+        Tells the journal that the action will not be undone or redone again,
+        for example because the undo tracker evicted it, so it does not need to be remembered.
+        """
+        known = self.known.pop(id(action), None)
+        if known is None:
+            return
+        payload = bytearray((FORGET,))
+        _put_varint(payload, self.seq - known[0])
+        self._queue(payload)
+
+    def reset(self, draw_style: str, width: int, height: int, fresh: bool = False) -> None:
+        """
+        Records the start of a new canvas. Later records cannot refer to actions before it.
+        With fresh, once the journal is started, the journal starts again from the new canvas:
+        a new file holding only this record replaces the old one, so the journal does not keep
+        every canvas ever drawn, and recovering it only replays the current one.
+        """
+        payload = bytearray((RESET,))
+        style = draw_style.encode("ascii")
+        _put_varint(payload, len(style))
+        payload += style
+        _put_varint(payload, width)
+        _put_varint(payload, height)
+        self.known = {}
+        if fresh and self.file is not None:
+            self._replace_file(self._frame(payload))
+        else:
+            self._queue(payload)
+
+# Explanation coding concept:
+# The new file is written and fsynced next to the journal, then renamed over it, so a crash leaves
+# either the old journal or the new one. Records of the old canvas not written yet are dropped.
+# The writer thread holds io_lock while writing, so it never writes to the old file after the rename.
+
+# Complexity analysis:
+# O(1), plus an fsync.
+    def _replace_file(self, frame: bytes) -> None:
+        partial = f"{self.path}.{os.getpid()}.partial"
+        with self.io_lock:
+            with self.condition:
+                self.pending = []
+            with open(partial, "wb") as f:
+                f.write(MAGIC + frame)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(partial, self.path)
+            self.file.close()
+            self.file = open(self.path, "ab")
+            self.last_fsync = time.monotonic()
+            self.unsynced = False
+        self.seq = 1
+
+    def _encode_action(self, payload: bytearray, action: PaintAction, is_undo: bool) -> None:
+        flag = INVERSE if is_undo else 0
+        if action.is_special:
+            payload.append(SPECIAL | flag)
+            return
+        payload.append(PAINT | flag)
+        _put_varint(payload, len(action.cells))
+        _put_varint(payload, len(action.layers))
+        for layer in action.layers:
+            _put_varint(payload, layer.index)
+        if len(action.layers) > 1:
+            for layer_id in action.layer_ids:
+                _put_varint(payload, layer_id)
+        bits, mask = PaintAction.CELL_BITS, PaintAction.CELL_MASK
+        x = y = 0
+        for cell in action.cells:
+            cx, cy = cell >> bits, cell & mask
+            _put_signed(payload, cx - x)
+            _put_signed(payload, cy - y)
+            x, y = cx, cy
+
+    def _frame(self, payload: bytearray) -> bytes:
+        """ The record holding payload, as written to the file. """
+        frame = bytearray()
+        _put_varint(frame, len(payload))
+        frame += payload
+        frame += zlib.crc32(payload).to_bytes(4, "little")
+        return bytes(frame)
+
+    def _queue(self, payload: bytearray) -> None:
+        frame = self._frame(payload)
+        self.seq += 1
+        with self.condition:
+            self.pending.append(frame)
+            if len(self.pending) == 1:
+                self.condition.notify()
+
+# Explanation coding concept:
+# The writer thread sleeps until a record is queued or an fsync of the records written is due.
+# Once a record is queued it waits up to flush_interval for more, so that they are written together,
+# and fsyncs whenever fsync_interval has passed since the last fsync, even if nothing more was queued.
+
+    def _run(self) -> None:
+        while True:
+            with self.condition:
+                if not self.pending and not self.closing:
+                    self.condition.wait(self._until_fsync())
+                if self.closing:
+                    return
+                if self.pending:
+                    until_fsync = self._until_fsync()
+                    self.condition.wait(self.flush_interval if until_fsync is None
+                                        else min(self.flush_interval, until_fsync))
+            self._write(self._until_fsync() == 0)
+
+    def _until_fsync(self) -> float | None:
+        """ Seconds until the records written should be fsynced, None if there is nothing to fsync. """
+        if self.fsync_interval is None or not self.unsynced:
+            return None
+        return max(0.0, self.last_fsync + self.fsync_interval - time.monotonic())
+
+    def _write(self, fsync: bool) -> None:
+        with self.io_lock:
+            with self.condition:
+                batch, self.pending = self.pending, []
+            if batch:
+                self.file.write(b"".join(batch))
+                self.file.flush()
+                self.unsynced = True
+            if fsync:
+                os.fsync(self.file.fileno())
+                self.last_fsync = time.monotonic()
+                self.unsynced = False
+
+    def sync(self) -> None:
+        """ Writes every queued record and fsyncs the file, before returning. """
+        self._write(True)
+
+    def close(self) -> None:
+        """ Stops the writer thread, then writes and fsyncs what is left and closes the file. """
+        if self.file is None:
+            return
+        with self.condition:
+            self.closing = True
+            self.condition.notify()
+        self.thread.join()
+        self.sync()
+        self.file.close()
+        self.file = None
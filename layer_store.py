@@ -4,15 +4,30 @@ from abc import ABC, abstractmethod
 from data_structures.array_sorted_list import ArraySortedList
 from data_structures.queue_adt import CircularQueue
 from data_structures.sorted_list_adt import ListItem
-from data_structures.stack_adt import ArrayStack
 from layer_util import Layer
 from layers import invert
 
 
 class LayerStore(ABC):
+    # dirty: the set of changed tiles of the grid showing this store (None outside a grid),
+    # and tile: the tile of that grid this store is in.
+    __slots__ = ('dirty', 'tile')
 
     def __init__(self) -> None:
-        pass
+        self.dirty = None
+        self.tile = 0
+
+    def watch(self, dirty: set, tile: int) -> None:
+        """
+        Adds tile to dirty whenever the contents of this store change, through any of its methods.
+        Grid uses this to know which tiles its next snapshot should read again.
+        """
+        self.dirty = dirty
+        self.tile = tile
+
+    def _changed(self) -> None:
+        if self.dirty is not None:
+            self.dirty.add(self.tile)
 
     @abstractmethod
     def add(self, layer: Layer) -> bool:
@@ -29,6 +44,13 @@ class LayerStore(ABC):
         """
         pass
 
+    def get_color_into(self, rgb, timestamp, x, y) -> None:
+        """
+        Writes the colour this square should show into `rgb`, which holds the start colour.
+        Same result as get_color, but without building a new colour per layer.
+        """
+        rgb[0], rgb[1], rgb[2] = self.get_color(tuple(rgb), timestamp, x, y)
+
     @abstractmethod
     def erase(self, layer: Layer) -> bool:
         """
@@ -44,6 +66,21 @@ class LayerStore(ABC):
         """
         pass
 
+    @abstractmethod
+    def get_state(self) -> tuple:
+        """
+        Returns an immutable copy of the contents of this store.
+        Two stores showing the same layers in the same way have equal states.
+        """
+        pass
+
+    @abstractmethod
+    def set_state(self, state: tuple) -> None:
+        """
+        Replaces the contents of this store with a state returned by get_state.
+        """
+        pass
+
 
 class SetLayerStore(LayerStore):
     """
@@ -52,6 +89,8 @@ class SetLayerStore(LayerStore):
     - erase: Remove the single layer. Ignore what is currently selected.
     - special: Invert the colour output.
     """
+    __slots__ = ('layer', 's')
+
 # Explanation coding concept:
 # Initialise the self.layer is equal to None
 # Initialise the self.s for judging the switch of special to False
@@ -60,6 +99,7 @@ class SetLayerStore(LayerStore):
 # O(1)(Assignment)+O(1)(Assignment) = O(1) (Linear time)
 # Best case = Worst case
     def __init__(self):
+        super().__init__()
         self.layer = None
         self.s = False
 
@@ -73,6 +113,7 @@ class SetLayerStore(LayerStore):
     def add(self, layer: Layer) -> bool:
         if self.layer != layer:
             self.layer = layer
+            self._changed()
             return True
         else:
             return False
@@ -88,6 +129,7 @@ class SetLayerStore(LayerStore):
     def erase(self, layer: Layer) -> bool:
         if self.layer is not None:
             self.layer = None
+            self._changed()
             return True
         else:
             return False
@@ -103,6 +145,7 @@ class SetLayerStore(LayerStore):
 # Best case = Worst case
     def special(self):
         self.s = not self.s
+        self._changed()
 
 # Explanation coding concept:
 # This function is to reflect the colour this square should show, given the current layers.
@@ -125,6 +168,29 @@ class SetLayerStore(LayerStore):
             result = invert.apply(result, timestamp, x, y)
         return result
 
+# Explanation coding concept:
+# Same as get_color, but every layer writes into the rgb buffer instead of returning a new tuple.
+
+# Time complexity analysis:
+# Best case = Worst case = O(Comp(apply_into))
+    def get_color_into(self, rgb, timestamp, x, y) -> None:
+        if self.layer is not None:
+            self.layer.apply_into(rgb, timestamp, x, y)
+        if self.s:
+            invert.apply_into(rgb, timestamp, x, y)
+
+# Explanation coding concept:
+# The state is the pair of the current layer and the special switch.
+
+# Time complexity analysis:
+# Best case = Worst case = O(1)
+    def get_state(self) -> tuple:
+        return (self.layer, self.s)
+
+    def set_state(self, state: tuple) -> None:
+        self.layer, self.s = state
+        self._changed()
+
 
 class AdditiveLayerStore(LayerStore):
     """
@@ -133,37 +199,41 @@ class AdditiveLayerStore(LayerStore):
     - erase: Remove the first layer that was added. Ignore what is currently selected.
     - special: Reverse the order of current layers (first becomes last, etc.)
     """
+    __slots__ = ('myQueue',)
+    # Most squares only ever hold a few layers, so the queue starts small and grows as needed, up to MAX_LAYERS.
+    INITIAL_CAPACITY = 4
+    MAX_LAYERS = 10000
 
 # Explanation coding concept:
-# Initialise the self.myQueue by using the CircularQueue ADT
-# Initialise the self.myStack by using the ArrayStack ADT
+# Initialise the self.myQueue by using the CircularQueue ADT, growable so that it starts small.
 
 # Time complexity analysis:
-# It depends on CircularQueue and ArrayStack which are O(max_capacity) since the parameter is a constant.
-# Thus the time complexity is linear time O(1).
-# O(1)(Assignment)+O(1)(Assignment) = O(1) (Linear time)
+# O(INITIAL_CAPACITY) for the array of the queue, a constant.
+# Thus the time complexity is O(1).
 # Best case = Worst case
     def __init__(self):
-        self.myQueue = CircularQueue(10000)
-        self.myStack = ArrayStack(10000)
+        super().__init__()
+        self.myQueue = CircularQueue(self.INITIAL_CAPACITY, growable=True)
 
 # Explanation coding concept:
 # This add function is to add the layer into the queue (self.myQueue)
 # Before adding the layer into the queue,
-# I have to check the queue has space to add or not by using is_full() abstract method.
+# I have to check the queue has space to add or not, by comparing its length with MAX_LAYERS.
 # If myQueue is full, then return False and do nothing, otherwise,
 # Return True and add the layer into myQueue by using append method.
 
 # Time complexity analysis:
 # All return statements, assignments and integer comparisons in append method are always constant, hence O(1).
-# Worst case: O(1)(if statement) + O(1)(append)+O(1)(Return statement) = O(1) (Linear time)
+# The queue doubles when its array is full, which is amortised O(1) per append.
+# Worst case: O(1)(if statement) + O(1)(append)+O(1)(Return statement) = O(1) (Amortised)
 # Best case: If myQueue is full and just return False without append method.
 # O(1)(if statement) + O(1)(Return statement) = O(1) (Linear time)
     def add(self, layer: Layer) -> bool:
-        if self.myQueue.is_full():
+        if len(self.myQueue) >= self.MAX_LAYERS:
             return False
         else:
             self.myQueue.append(layer)
+            self._changed()
             return True
 
 # Explanation coding concept:
@@ -174,61 +244,77 @@ class AdditiveLayerStore(LayerStore):
 
 # Time complexity analysis:
 # All return statements, assignments and integer comparisons in serve method are always constant, hence O(1).
-# Worst case: O(1)(if statement) + O(1)(append)+O(1)(Return statement) = O(1) (Linear time)
-# Best case: If myQueue is full and just return False without serve method.
+# The queue halves when a quarter full, which is amortised O(1) per serve.
+# Worst case: O(1)(if statement) + O(1)(serve)+O(1)(Return statement) = O(1) (Amortised)
+# Best case: If myQueue is empty and just return False without serve method.
 # O(1)(id statement) + O(1)(Return statement) = O(1) (Linear time)
     def erase(self, layer: Layer) -> bool:
         if self.myQueue.is_empty():
             return False
         else:
             self.myQueue.serve()
+            self._changed()
             return True
 
 # Explanation coding concept:
 # This special function is to reverse the order of all the layer in myQueue.
-# The first for loop is to move all the elements in myQueue to myStack by using serve and push method.
-# So now, we have the original order of layer in myStack.
-# The second for loop is to reverse the order of layer in myStack by using pop method
-# Due to Stack item is first in last out, loop through all the layer by popping the last layer and appending back to myQueue.
-# After dealing all the reversing, return myQueue
+# The queue reverses itself in place with the reverse method,
+# by swapping the layers from both ends towards the middle, so no stack is needed.
+# After reversing, return myQueue
 
 # Time complexity analysis:
-# Worst case: O(len(self.myQueue))(1st for loop)*O(1)(serve,assignment and push)
-# + O(len(self.myStack))(2nd for loop)*O(1)O(1)(pop,assignment and append) + O(1)(return statement)
-# Let size of self.myQueue = n and size of self.myStack = m
-# In Big-O notation, the time complexity is O(n+m)
+# Let size of self.myQueue = n
+# reverse swaps n/2 pairs of layers, so the time complexity is O(n)
 # Best case = Worst case
     def special(self):
-        for i in range(len(self.myQueue)):
-            color = self.myQueue.serve()
-            self.myStack.push(color)
-        for j in range(len(self.myStack)):
-            stack = self.myStack.pop()
-            self.myQueue.append(stack)
+        self.myQueue.reverse()
+        self._changed()
         return self.myQueue
 
 # Explanation coding concept:
 # If the length of myQueue is not empty, I apply a for loop to obtain the tuple of color of each layer in the queue.
-# In the for loop, variable queue is the layer after serving in myQueue.
+# The for loop reads the layers from front to rear by iterating through the queue, without serving them.
 # Then obtain the color by using apply function.
-# After using, append the layer back to the queue.
 # At last return the tuple of all color
 
 # Time complexity analysis:
 # Comp(apply) is defined as the time complexity of the apply function.
-# Worst case: The len(self.myQueue) is not 0, O(1)(if statement) + O(len(self.myQueue)* (O(Comp(apply)(apply function) + O(1))(All assignments, serve and append are constant)
+# Worst case: The len(self.myQueue) is not 0, O(len(self.myQueue))* (O(Comp(apply)(apply function) + O(1))
 # + O(1) (return statement)
 # Let the length of self.myQueue be n, thus the worst case time complexity is O(n*Comp(apply)).
 # Best case is length of self.myQueue is 0, then return start.
 # Therefore, the time complexity of best case is O(1).
     def get_color(self, start, timestamp, x, y) -> tuple[int, int, int]:
-        if len(self.myQueue) != 0:
-            for i in range(len(self.myQueue)):
-                queue = self.myQueue.serve()
-                start = queue.apply(start, timestamp, x, y)
-                self.myQueue.append(queue)
+        for layer in self.myQueue:
+            start = layer.apply(start, timestamp, x, y)
         return start
 
+# Explanation coding concept:
+# Same as get_color, but every layer writes into the rgb buffer instead of returning a new tuple.
+# The queue is read from front to rear by iterating through it, rather than being served and appended back.
+
+# Time complexity analysis:
+# Let the length of self.myQueue be n
+# Best case = Worst case = O(n*Comp(apply_into))
+    def get_color_into(self, rgb, timestamp, x, y) -> None:
+        for layer in self.myQueue:
+            layer.apply_into(rgb, timestamp, x, y)
+
+# Explanation coding concept:
+# The state is the tuple of the layers in the queue, from front to rear.
+# Setting the state clears the queue and appends the layers back in that order, at once with extend.
+
+# Time complexity analysis:
+# Let the length of self.myQueue be n
+# Best case = Worst case = O(n)
+    def get_state(self) -> tuple:
+        return tuple(self.myQueue)
+
+    def set_state(self, state: tuple) -> None:
+        self.myQueue.clear()
+        self.myQueue.extend(state)
+        self._changed()
+
 
 class SequenceLayerStore(LayerStore):
     """
@@ -239,6 +325,7 @@ class SequenceLayerStore(LayerStore):
         Of all currently applied layers, remove the one with median `name`.
         In the event of two layers being the median names, pick the lexicographically smaller one.
     """
+    __slots__ = ('mySortedlist', 'lexicographic_list')
 
 # Explanation coding concept:
 # Initialise the self.mySortedlist by using the ArraySortedList ADT
@@ -250,97 +337,91 @@ class SequenceLayerStore(LayerStore):
 # O(1)(Assignment)+O(1)(Assignment) = O(1) (Linear time)
 # Best case = Worst case
     def __init__(self):
+        super().__init__()
         self.mySortedlist = ArraySortedList(10000)
         self.lexicographic_list = ArraySortedList(10000)
 
+# Explanation coding concept:
+# The layers are kept sorted by index, and every layer has its own index,
+# so a layer can be found with a binary search on its index rather than by scanning the whole list.
+# _find returns the position of the layer in mySortedlist, or -1 if it is not applied.
+
+# Time complexity analysis:
+# Let n be the length of mySortedlist
+# Best case = Worst case = O(log n * Comp==)
+    def _find(self, layer: Layer) -> int:
+        try:
+            return self.mySortedlist.index(ListItem(layer, layer.index))
+        except ValueError:
+            return -1
+
 # Explanation coding concept:
 # Before adding the layer into mySortedlist, I have to check the layer is applied in mySortedlist before or not.
 # Due to mySortedlist is add by the form of list, so if I have to deal with the layer in mySortedlist,
 # I must utilise LIstItem form to add in.
-# If the list item with two parameters(layer and its index) is not in mySortedlist,
+# If the layer is not found in mySortedlist,
 # I will add the LIstItem with the layer and its index into mySortedlist by using add abstract method.
 # If added, return True, otherwise, return False.
 
 # Time complexity analysis:
-# In add function, worst case is self.mySortedlist is full and needed to resize and the item to be found the position is at first.
-# The worst case time complexity of resize is O(len(self.mySortedlist))
-# If item is first, we get O(log len(self.mySortedlist)) + O(len(self.mySortedlist)), which gives O(len(self.mySortedlist))
-# Worst case: O(1)(if statement)*O(O(len(self.mySortedlist))) + O(len(self.mySortedlist))(index_to_add method) + O(1)(Assignment) + O(1)(Numerical operation)
 # Let n be the length of mySortedlist
-# Thus, the time complexity in worst case is O(n+n) = O(n)
-# For best case the self.mySortedlist is not full and the item position is at the last.
-# For self._index_to_add, if item is last, we get O(log len(self.mySortedlist)) + O(1) which gives O(log len(self.mySortedlist)).
-# Best case: O(1)(if statement)
-
-# From above add method in array_sorted_list data structure, the time complexity in worst case is O(n),in best case is O(log n).
-# Worst case for whole function: O(n*Comp==)*(O(n)+O(1)) = O(n^2*Comp==)
-# Best case: O(1)(Return statement) (layer is added in the list before.)
+# Finding the layer is O(log n), and the add method of array_sorted_list is O(n) in worst case, O(log n) in best case.
+# Worst case: O(log n)(_find) + O(n)(add) = O(n), when the layer goes at the front of the list.
+# Best case: O(log n)(_find), when the layer is applied already.
     def add(self, layer: Layer) -> bool:
-        if ListItem(layer,layer.index) not in self.mySortedlist:
+        if self._find(layer) < 0:
             self.mySortedlist.add(ListItem(layer, layer.index))
+            self._changed()
             return True
         return False
 
 # Explanation coding concept:
-# Before removing the layer out mySortedlist, I have to check the layer is contained in mySortedlist or not.
-# If list item of layer is contained in mySortedlist,
-# I can remove the it by using remove abstract method in sorted_list_adt.
-# If removed, return True, otherwise, return False.
+# Find the position of the layer in mySortedlist with _find.
+# If the layer is applied, remove it with the delete_at_index method at that position, and return True.
+# Otherwise, return False.
 
 # Time complexity analysis:
-    # For delete_at_index function,
-    # Worst case: O(n-index)
-    # Best case: O(1) (index >=len(self))
-
-    # For index function,
-    # Worst case: O(n) (_index_to_add method)
-    # Best case: O(log n) (_index_to_add method)
-
-    #Thus, for remove function,
-    # Worst case: O(n)
-    # Best case: O(log n)
-# Let the size of self.mySortedlist be n
-# Worst case: O(n*Comp==)*(O(n)+O(1)) = O(n^2*Comp==)
-# Best case: O(1) (Return statement) (layer is not in the list)
+# Let n be the length of mySortedlist
+# Worst case: O(log n)(_find) + O(n)(delete_at_index) = O(n), when the layer is at the front of the list.
+# Best case: O(log n)(_find), when the layer is not applied.
     def erase(self, layer: Layer) -> bool:
-        if self.mySortedlist.__contains__(ListItem(layer, layer.index)):
-            self.mySortedlist.remove(ListItem(layer,layer.index))
+        position = self._find(layer)
+        if position >= 0:
+            self.mySortedlist.delete_at_index(position)
+            self._changed()
             return True
         return False
 
 # Time complexity analysis:
 # Let n be the length of mySortedlist
-# Let m be the length of lexicographic_list
-# Worst case: O(1)(if statement)+O(n)(1st for loop) *O(n)(add function) +O(1)(clear) +O(1)(assignment and numerical operations)
-# +O(n-index_of_median)(delete_at_index) +O(m)(2nd for loop) *O(m)(add function) +O(1)(clear) + O(1)(return statement)
-# Thus, the worst case of time complexity is O(n^2+m^2)
+# Worst case: O(n)(list comprehension) + O(n log n)(add_all, sorting by name) + O(log n)(_find)
+# + O(n)(delete_at_index) + O(1)(clear) = O(n log n)
 # Best case: O(1) (self.mySortedList is empty and return None)
     def special(self):
 # Explanation coding concept:
 # If the mySortedlist is empty, then return None, otherwise applied the special effect.
-# The first for loop is to copy the elements in mySortedlist to lexicographic_list with the order of the value name.
-# Thus, the value of the list item is self.mySortedlist[i].value and the key is the value name.
-# After moving all the list item to lexicographic_list, I clear all the list item in mySortedlist by using clear method.
+# All the layers in mySortedlist are added to lexicographic_list at once with add_all,
+# with the value of each list item being the layer and the key being the layer name,
+# so that lexicographic_list is in order of name.
         if self.mySortedlist.is_empty():
             return None
 
-        for i in range(len(self.mySortedlist)):
-            self.lexicographic_list.add(ListItem(self.mySortedlist[i].value, self.mySortedlist[i].value.name))
-        self.mySortedlist.clear()
+        self.lexicographic_list.add_all(
+            [ListItem(self.mySortedlist[i].value, self.mySortedlist[i].value.name) for i in range(len(self.mySortedlist))]
+        )
 
 # Explanation coding concept:
 # First, I set the index_of_median is the index of half length of lexicographic_list (the index of centre elements)
-# Based on the index_of_median, removing the list item by using delete_at_index abstract method.
-# The last for loop is to add the list item in lexicographic_list back to the mySortedlist with the order by their index.
-# Thus, the value of ListItem is self.lexicographic_list[j].value and the key is self.lexicographic_list[j].value.index.
+# The layer at index_of_median is the one with the median name.
+# Rather than adding every other layer back to mySortedlist, only that layer is removed from it,
+# at the position found by _find.
 # After using, clear the item in lexicographic_list by using clear method.
 # Returning mySortedlist at last.
         index_of_median = (len(self.lexicographic_list)-1)// 2
-        self.lexicographic_list.delete_at_index(index_of_median)
-
-        for j in range(len(self.lexicographic_list)):
-            self.mySortedlist.add(ListItem(self.lexicographic_list[j].value, self.lexicographic_list[j].value.index))
+        median = self.lexicographic_list[index_of_median].value
+        self.mySortedlist.delete_at_index(self._find(median))
         self.lexicographic_list.clear()
+        self._changed()
         return self.mySortedlist
 
 # Explanation coding concept:
@@ -360,3 +441,28 @@ class SequenceLayerStore(LayerStore):
                 color = self.mySortedlist[i].value
                 start = color.apply(start, timestamp, x, y)
         return start
+
+# Explanation coding concept:
+# Same as get_color, but every layer writes into the rgb buffer instead of returning a new tuple.
+
+# Time complexity analysis:
+# Best case = Worst case = O(n*Comp(apply_into))
+    def get_color_into(self, rgb, timestamp, x, y) -> None:
+        for i in range(len(self.mySortedlist)):
+            self.mySortedlist[i].value.apply_into(rgb, timestamp, x, y)
+
+# Explanation coding concept:
+# The state is the tuple of the applied layers, in order of index.
+# Setting the state clears mySortedlist and adds the layers back at once with add_all.
+
+# Time complexity analysis:
+# Let the length of self.mySortedlist be n
+# get_state: Best case = Worst case = O(n)
+# set_state: Worst case O(n log n) (add_all), best case O(n) when the layers are in order, as in a state.
+    def get_state(self) -> tuple:
+        return tuple(self.mySortedlist[i].value for i in range(len(self.mySortedlist)))
+
+    def set_state(self, state: tuple) -> None:
+        self.mySortedlist.clear()
+        self.mySortedlist.add_all([ListItem(layer, layer.index) for layer in state])
+        self._changed()
@@ -5,24 +5,79 @@ No need to edit unless adding new features.
 """
 
 from __future__ import annotations
+import importlib
 from dataclasses import dataclass, field
 from data_structures.referential_array import ArrayR
 
+# Registered layers by index. The array doubles in size when it is full,
+# so slots past cur_layer_index are None.
 LAYERS: ArrayR[Layer] = ArrayR(20)
 cur_layer_index = 0
+# Registered layers by name.
+LAYERS_BY_NAME: dict[str, Layer] = {}
+# Modules of extra layers, imported the next time the layers are asked for.
+PLUGINS: list[str] = []
+_loaded = False
+# Tuple of the registered layers, rebuilt after a registration.
+_layer_list: tuple[Layer, ...] | None = None
 
-@dataclass
+@dataclass(slots=True)
 class Layer:
 
     index: int
     apply: function
     name: str = field(init=False)
     bg: tuple[int, int, int] | None = None
+    apply_into: function = field(default=None, repr=False, compare=False)
+    uniform: bool = field(init=False, default=False, repr=False, compare=False)
 
     def __post_init__(self):
         if hasattr(self.apply, "__bg__"):
             self.bg = self.apply.__bg__
+        self.uniform = getattr(self.apply, "__uniform__", False)
         self.name = self.apply.__name__
+        if self.apply_into is None:
+            self.apply_into = self._apply_via_tuple
+
+    def _apply_via_tuple(self, rgb, timestamp, x, y) -> None:
+        """
+        Fallback for layers without an in-place variant: run `apply` and copy the result back.
+        The result is converted to int and clamped to 0-255, as the buffer only holds bytes.
+        """
+        r, g, b = self.apply(rgb, timestamp, x, y)
+        rgb[0], rgb[1], rgb[2] = _channel(r), _channel(g), _channel(b)
+
+    def __hash__(self):
+        """Hash by index, so that store states (tuples of layers) can key dictionaries."""
+        return hash(self.index)
+
+    def __reduce_ex__(self, protocol):
+        """
+        Pickle registered layers by index, so unpickling gives back the registered layer itself.
+        Other layers, such as ones made outside the registry, are pickled normally.
+        """
+        try:
+            registered = get_layer(self.index)
+        except IndexError:
+            registered = None
+        if registered is self:
+            return (get_layer, (self.index,))
+        return object.__reduce_ex__(self, protocol)
+
+    def in_place(self, func):
+        """
+        Decorator registering an in-place variant of this layer.
+        The variant writes the new colour into the mutable `rgb` buffer it is given,
+        instead of returning a new tuple, so that rendering does not allocate.
+
+        Usage:  @my_special_layer.in_place
+                def my_special_layer_into(rgb, timestamp, x, y):
+        """
+        self.apply_into = func
+        return func
+
+def _channel(value) -> int:
+    return min(255, max(0, int(value)))
 
 class background(object):
     """Simple decorator to add a __bg__ property to a layer
@@ -43,6 +98,22 @@ class background(object):
         func.__bg__ = self.val
         return layer
 
+def uniform(layer: function|Layer):
+    """Decorator marking a layer whose colour only depends on the colour it is given,
+    not on the timestamp or the square. Renderers compute such layers once for all the
+    squares with the same layers.
+
+    Usage:  @register
+            @uniform
+            def my_special_layer(...):
+    """
+    if isinstance(layer, Layer):
+        layer.apply.__uniform__ = True
+        layer.uniform = True
+    else:
+        layer.__uniform__ = True
+    return layer
+
 def register(func):
     """
     Layer register function.
@@ -52,12 +123,71 @@ def register(func):
 
     In order to actually confirm this registration,
     you'll need to import the file containing the layer definition
+    (or name it with register_plugin).
+
+    :raises ValueError: if a layer with the same name is already registered.
+    :complexity: O(1) amortised, O(n) when the registry grows, for n registered layers.
     """
-    global cur_layer_index
-    LAYERS[cur_layer_index] = Layer(cur_layer_index, func)
+    global LAYERS, cur_layer_index, _layer_list
+    if func.__name__ in LAYERS_BY_NAME:
+        raise ValueError(f"A layer named {func.__name__} is already registered")
+    if cur_layer_index == len(LAYERS):
+        grown = ArrayR(2 * len(LAYERS))
+        for i in range(cur_layer_index):
+            grown[i] = LAYERS[i]
+        LAYERS = grown
+    layer = Layer(cur_layer_index, func)
+    LAYERS[cur_layer_index] = layer
+    LAYERS_BY_NAME[layer.name] = layer
     cur_layer_index += 1
-    return LAYERS[cur_layer_index-1]
+    _layer_list = None
+    return layer
 
-def get_layers():
-    import layers # Force all registrations to occur.
+def register_plugin(module_name: str) -> None:
+    """
+    Queues a module of extra layers, imported the next time the layers are asked for.
+    Importing it registers its layers after the built-in ones.
+
+    Usage:  register_plugin("palette")
+    """
+    if module_name not in PLUGINS:
+        PLUGINS.append(module_name)
+
+def _load() -> None:
+    """Imports the built-in layers once, then any plugins queued since the last call."""
+    global _loaded
+    if not _loaded:
+        import layers # Force all registrations to occur.
+        _loaded = True
+    while PLUGINS:
+        importlib.import_module(PLUGINS.pop(0))
+
+def get_layers() -> ArrayR[Layer]:
+    """Returns the registry array, indexed by layer index. Slots past the last layer are None."""
+    if not _loaded or PLUGINS:
+        _load()
     return LAYERS
+
+def get_layer(index: int) -> Layer:
+    """Returns the registered layer with this index."""
+    return get_layers()[index]
+
+def get_layer_by_name(name: str) -> Layer:
+    """
+    Returns the registered layer with this name.
+
+    :raises KeyError: if no layer has that name.
+    """
+    get_layers()
+    return LAYERS_BY_NAME[name]
+
+def layer_list() -> tuple[Layer, ...]:
+    """
+    Returns the registered layers in index order, without the empty slots.
+    The tuple is cached until the next registration, so it is cheap to call every frame.
+    """
+    global _layer_list
+    get_layers()
+    if _layer_list is None:
+        _layer_list = tuple(LAYERS[i] for i in range(cur_layer_index))
+    return _layer_list
@@ -1,9 +1,14 @@
 """
 All layers are defined here.
+
+Each layer also has an in-place variant, which writes into the `rgb` buffer it is
+given rather than returning a new tuple. These are what the renderer uses.
+Layers marked @uniform ignore the timestamp and the square, so the renderer
+computes them once for all the squares with the same layers.
 """
 
 import colorsys
-from layer_util import background, register
+from layer_util import background, register, uniform
 
 @register
 @background(200, 0, 120)
@@ -13,12 +18,25 @@ def rainbow(color, timestamp, x, y):
         for x in colorsys.hls_to_rgb((timestamp/20 + x/20 + y/20)%1, 0.6, 0.6)
     )
 
+@rainbow.in_place
+def rainbow_into(rgb, timestamp, x, y):
+    r, g, b = colorsys.hls_to_rgb((timestamp/20 + x/20 + y/20)%1, 0.6, 0.6)
+    rgb[0] = int(255*r)
+    rgb[1] = int(255*g)
+    rgb[2] = int(255*b)
+
 @register
+@uniform
 @background(170, 170, 170)
 def black(color, timestamp, x, y):
     return (0, 0, 0)
 
+@black.in_place
+def black_into(rgb, timestamp, x, y):
+    rgb[0] = rgb[1] = rgb[2] = 0
+
 @register
+@uniform
 @background(240, 240, 240)
 def lighten(color, timestamp, x, y):
     return tuple(
@@ -26,7 +44,14 @@ def lighten(color, timestamp, x, y):
         for x in color
     )
 
+@lighten.in_place
+def lighten_into(rgb, timestamp, x, y):
+    rgb[0] = min(255, rgb[0] + 40)
+    rgb[1] = min(255, rgb[1] + 40)
+    rgb[2] = min(255, rgb[2] + 40)
+
 @register
+@uniform
 @background(0, 255, 255)
 def invert(color, timestamp, x, y):
     return tuple(
@@ -34,24 +59,47 @@ def invert(color, timestamp, x, y):
         for c in color
     )
 
+@invert.in_place
+def invert_into(rgb, timestamp, x, y):
+    rgb[0] = 255 - rgb[0]
+    rgb[1] = 255 - rgb[1]
+    rgb[2] = 255 - rgb[2]
+
 @register
+@uniform
 @background(255, 0, 0)
 def red(color, timestamp, x, y):
     return (255, 0, 0)
 
+@red.in_place
+def red_into(rgb, timestamp, x, y):
+    rgb[0] = 255
+    rgb[1] = rgb[2] = 0
+
 @register
+@uniform
 @background(0, 255, 0)
 def green(color, timestamp, x, y):
     return (0, 255, 0)
 
+@green.in_place
+def green_into(rgb, timestamp, x, y):
+    rgb[1] = 255
+    rgb[0] = rgb[2] = 0
+
 @register
+@uniform
 @background(0, 0, 255)
 def blue(color, timestamp, x, y):
     return (0, 0, 255)
 
-@register
-@background(100, 170, 255)
-def sparkle(color, timestamp, x, y):
+@blue.in_place
+def blue_into(rgb, timestamp, x, y):
+    rgb[2] = 255
+    rgb[0] = rgb[1] = 0
+
+def _sparkles(timestamp, x, y) -> bool:
+    """Whether the sparkle layer lightens (rather than darkens) this square at this time."""
     ts = int((timestamp + x/3 + y/5) * 3)
     other = x
     for _ in range(10 + (ts * 31 % 17)):
@@ -61,14 +109,33 @@ def sparkle(color, timestamp, x, y):
         other = (1103515245 * other + 12345) % (1 << 31)
     ts = int((timestamp + x/10 + y/20) * 3)
     other = (other & ((1 << 31)-1)) >> 16
-    if other/(1 << 15) < 0.1:
+    return other/(1 << 15) < 0.1
+
+@register
+@background(100, 170, 255)
+def sparkle(color, timestamp, x, y):
+    if _sparkles(timestamp, x, y):
         return lighten.apply(color, timestamp, x, y)
     return darken.apply(color, timestamp, x, y)
 
+@sparkle.in_place
+def sparkle_into(rgb, timestamp, x, y):
+    if _sparkles(timestamp, x, y):
+        lighten.apply_into(rgb, timestamp, x, y)
+    else:
+        darken.apply_into(rgb, timestamp, x, y)
+
 @register
+@uniform
 @background(30, 30, 30)
 def darken(color, timestamp, x, y):
     return tuple(
         max(0, x - 40)
         for x in color
     )
+
+@darken.in_place
+def darken_into(rgb, timestamp, x, y):
+    rgb[0] = max(0, rgb[0] - 40)
+    rgb[1] = max(0, rgb[1] - 40)
+    rgb[2] = max(0, rgb[2] - 40)
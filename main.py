@@ -1,17 +1,15 @@
 import arcade
 import arcade.key as keys
-import math
 
-from action import PaintAction, PaintStep
 from grid import Grid
-from layer_util import get_layers, Layer
+from layer_util import layer_list
 from layers import lighten
-from replay import ReplayTracker
-from undo import UndoTracker
+from render import GroupedRenderer
+from session import DrawingSession, cells_on_segment
 
 
-class MyWindow(arcade.Window):
-    """ Painter Window """
+class MyWindow(arcade.Window, DrawingSession):
+    """ Painter Window, drawing a DrawingSession and passing the input on to it. """
 
     SCREEN_WIDTH = 800
     SCREEN_HEIGHT = 700
@@ -20,9 +18,17 @@ class MyWindow(arcade.Window):
     SCREEN_TITLE = "Paint"
 
     REPLAY_TIMER_DELTA = 0.05
+    # Replay speed multipliers, changed with the arrow keys during a replay.
+    REPLAY_SPEEDS = (1, 2, 4, 8, 16, 32, 64)
+    # Time per frame spent replaying in "as fast as possible" mode, toggled with B.
+    REPLAY_FRAME_BUDGET = 0.01
 
-    GRID_SIZE_X = 32
-    GRID_SIZE_Y = 32
+    SCRUB_HEIGHT = 20
+
+    # Every action is journaled here and recovered on the next start. None turns this off.
+    # The journal only holds the current canvas: a reset (or a change of draw mode) starts it again,
+    # so it stays as large as the actions of one canvas and a start only replays that canvas.
+    JOURNAL_PATH = "session.journal"
 
     BG = [255, 255, 255]
 
@@ -33,32 +39,46 @@ class MyWindow(arcade.Window):
         """Initialise visual and logic variables."""
         super().__init__(self.SCREEN_WIDTH, self.SCREEN_HEIGHT, self.SCREEN_TITLE)
         arcade.set_background_color(self.BG)
-        self.grid: Grid = None
-        self.draw_style = Grid.DRAW_STYLE_SET
         self.z_pressed = False
         self.y_pressed = False
         self.z_timer = 0
         self.y_timer = 0
         self.enable_ui = True
         self.replay_timer = 0
-        self.on_init()
+        self.replay_speed = 0
+        self.replay_budgeted = False
+        DrawingSession.__init__(self, Grid.DRAW_STYLE_SET)
 
     def reset(self) -> None:
         """Reset the screen."""
-        self.grid = Grid(self.draw_style, self.GRID_SIZE_X, self.GRID_SIZE_Y)
+        DrawingSession.reset(self)
         self.timestamp = 0
 
         self.selected_layer_index = -1
         self.dragging = None
         self.prev_drawn = None
         self.prev_pos = None
+        self.pending_motion = []
         self.draw_size = 2
+        # Renders the grid shown, by groups of squares with the same layers. Made again when that grid changes.
+        self.renderer = None
+        # Number of actions shown while scrubbing through the history, None when showing the live canvas.
+        self.scrub_position = None
+        self.dragging_scrub = False
 
         # Visual calculations
         self.DRAW_PANEL = self.SCREEN_WIDTH - self.SIDEBAR_WIDTH
         self.GRID_SQ_WIDTH = self.DRAW_PANEL / self.GRID_SIZE_X
         self.GRID_SQ_HEIGHT = self.SCREEN_HEIGHT / self.GRID_SIZE_Y
         self.LAYER_BUTTON_SIZE = self.SIDEBAR_WIDTH / 2
+        # Registered layers, cached so that drawing a frame does not go through the registry.
+        self.layers = layer_list()
+        # The layer buttons that fit above the scrub bar are shown, two per row. When there are more
+        # layers than that (with plugins), the mouse wheel or Page Up / Page Down over the sidebar
+        # scrolls through them, and layer_offset is the layer shown on the first button.
+        rows = int((self.SCREEN_HEIGHT - 3 * self.LAYER_BUTTON_SIZE - self.SCRUB_HEIGHT) // self.LAYER_BUTTON_SIZE)
+        self.layer_buttons = 2 * rows
+        self.layer_offset = 0
         # Action button sprites
         self.action_buttons = arcade.SpriteList()
         self.draw_mode_button = arcade.Sprite(
@@ -99,22 +119,22 @@ class MyWindow(arcade.Window):
         self.special_button.center_y = 5 * self.LAYER_BUTTON_SIZE / 2
         self.action_buttons.append(self.special_button)
 
-        self.on_reset()
-
-    def setup(self) -> None:
-        """Set up the game and initialize the variables."""
-        self.reset()
+    def on_close(self) -> None:
+        """Called when the window is closed."""
+        self.close_journal()
+        super().on_close()
 
     def on_draw(self) -> None:
         """Draw everything"""
         self.clear()
         # UI - Layers
-        for i, layer in enumerate(get_layers()):
-            if layer is None: break
-            xstart = (i % 2) * self.LAYER_BUTTON_SIZE + self.DRAW_PANEL
-            xend = ((i % 2)+1) * self.LAYER_BUTTON_SIZE + self.DRAW_PANEL
-            ystart = self.SCREEN_HEIGHT - (i//2) * self.LAYER_BUTTON_SIZE
-            yend = self.SCREEN_HEIGHT - (i//2+1) * self.LAYER_BUTTON_SIZE
+        for button in range(min(self.layer_buttons, len(self.layers) - self.layer_offset)):
+            i = self.layer_offset + button
+            layer = self.layers[i]
+            xstart = (button % 2) * self.LAYER_BUTTON_SIZE + self.DRAW_PANEL
+            xend = ((button % 2)+1) * self.LAYER_BUTTON_SIZE + self.DRAW_PANEL
+            ystart = self.SCREEN_HEIGHT - (button//2) * self.LAYER_BUTTON_SIZE
+            yend = self.SCREEN_HEIGHT - (button//2+1) * self.LAYER_BUTTON_SIZE
             bg = lighten.apply(layer.bg or self.BG[:], 0, 0, 0) if self.selected_layer_index == i else (layer.bg or self.BG[:])
             if not self.enable_ui:
                 bg = lighten.apply(bg, 0, 0, 0)
@@ -125,15 +145,41 @@ class MyWindow(arcade.Window):
             arcade.draw_text(str(i), xstart, (ystart+yend)/2, (0, 0, 0), 18, width=xend-xstart, align="center", bold=True, anchor_y="center")
         # UI - Draw Modes / Action buttons
         self.action_buttons.draw()
+        # UI - History scrub bar
+        ystart = 3 * self.LAYER_BUTTON_SIZE + self.SCRUB_HEIGHT
+        yend = 3 * self.LAYER_BUTTON_SIZE
+        # The bar covers the actions the timeline still holds, from timeline.start.
+        shown = len(self.timeline) if self.scrub_position is None else self.scrub_position
+        held = len(self.timeline) - self.timeline.start
+        fraction = (shown - self.timeline.start) / held if held else 1
+        arcade.draw_lrtb_rectangle_filled(self.DRAW_PANEL, self.SCREEN_WIDTH, ystart, yend, lighten.apply(self.BG, 0, 0, 0))
+        arcade.draw_lrtb_rectangle_filled(
+            self.DRAW_PANEL, self.DRAW_PANEL + fraction * self.SIDEBAR_WIDTH, ystart, yend, (100, 170, 255),
+        )
+        arcade.draw_lrtb_rectangle_outline(self.DRAW_PANEL, self.SCREEN_WIDTH, ystart, yend, (0, 0, 0), border_width=1)
+        if not self.enable_ui:
+            speed = "max" if self.replay_budgeted else f"{self.REPLAY_SPEEDS[self.replay_speed]}x"
+            arcade.draw_text(speed, self.DRAW_PANEL, (ystart+yend)/2, (0, 0, 0), 12, width=self.SIDEBAR_WIDTH, align="center", anchor_y="center")
         # Grid
-        for x in range(self.GRID_SIZE_X):
-            for y in range(self.GRID_SIZE_Y):
+        grid = self.grid if self.scrub_position is None else self.timeline.grid
+        if self.renderer is None or self.renderer.grid is not grid:
+            self.renderer = GroupedRenderer(grid, self.BG)
+        renderer = self.renderer
+        renderer.render(self.timestamp)
+        # Squares are drawn a group of equal layers at a time. The background is already
+        # cleared, so groups of the background colour are skipped.
+        background = bytes(self.BG)
+        for state, squares in renderer.groups.items():
+            colour = renderer.colour(state)
+            if colour == background:
+                continue
+            for x, y in squares:
                 arcade.draw_lrtb_rectangle_filled(
                     self.GRID_SQ_WIDTH * x,
                     self.GRID_SQ_WIDTH * (x+1),
                     self.GRID_SQ_HEIGHT * (y+1),
                     self.GRID_SQ_HEIGHT * y,
-                    self.grid[x][y].get_color(self.BG[:], self.timestamp, x, y),
+                    tuple(colour or renderer.pixel(x, y)),
                 )
 
     def on_mouse_press(self, x: int, y: int, button: int, modifiers: int) -> None:
@@ -141,15 +187,19 @@ class MyWindow(arcade.Window):
         if x > self.DRAW_PANEL:
             if not self.enable_ui:
                 return
+            # History scrub bar
+            if 3 * self.LAYER_BUTTON_SIZE <= y < 3 * self.LAYER_BUTTON_SIZE + self.SCRUB_HEIGHT:
+                self.dragging_scrub = True
+                self.scrub_to(x)
+                return
             # Buttons
-            for i, layer in enumerate(get_layers()):
-                if layer is None: break
-                xstart = (i % 2) * self.LAYER_BUTTON_SIZE + self.DRAW_PANEL
-                xend = ((i % 2)+1) * self.LAYER_BUTTON_SIZE + self.DRAW_PANEL
-                ystart = self.SCREEN_HEIGHT - (i//2) * self.LAYER_BUTTON_SIZE
-                yend = self.SCREEN_HEIGHT - (i//2+1) * self.LAYER_BUTTON_SIZE
+            for button in range(min(self.layer_buttons, len(self.layers) - self.layer_offset)):
+                xstart = (button % 2) * self.LAYER_BUTTON_SIZE + self.DRAW_PANEL
+                xend = ((button % 2)+1) * self.LAYER_BUTTON_SIZE + self.DRAW_PANEL
+                ystart = self.SCREEN_HEIGHT - (button//2) * self.LAYER_BUTTON_SIZE
+                yend = self.SCREEN_HEIGHT - (button//2+1) * self.LAYER_BUTTON_SIZE
                 if xstart <= x < xend and yend <= y < ystart:
-                    self.selected_layer_index = i
+                    self.selected_layer_index = self.layer_offset + button
                     break
             # Actions
             xstart = self.DRAW_PANEL
@@ -182,30 +232,54 @@ class MyWindow(arcade.Window):
             yend = 2 * self.LAYER_BUTTON_SIZE
             if xstart <= x < xend and yend <= y < ystart:
                 self.on_special()
+        elif self.scrub_position is not None:
+            # Clicking the canvas leaves the history view, rather than painting on it.
+            self.leave_history()
         else:
+            self.flush_motion()
             self.dragging = True
             self.try_draw(x, y)
 
     def on_mouse_release(self, x: int, y: int, button: int, modifiers: int):
         """Called when the mouse buttons are released."""
+        self.flush_motion()
         self.dragging = False
+        self.dragging_scrub = False
         self.prev_drawn = None
         self.prev_pos = None
 
+    def on_mouse_scroll(self, x: int, y: int, scroll_x: int, scroll_y: int) -> None:
+        """Called when the mouse wheel turns. Over the sidebar, scrolls the layer buttons a row at a time."""
+        if x > self.DRAW_PANEL and self.enable_ui:
+            self.scroll_layers(-int(scroll_y))
+
+    def scroll_layers(self, rows: int) -> None:
+        """Moves the layer buttons by a number of rows, down for positive, without scrolling past the layers."""
+        last = max(0, len(self.layers) - self.layer_buttons + 1) // 2 * 2
+        self.layer_offset = min(max(self.layer_offset + 2 * rows, 0), last)
+
     def on_mouse_motion(self, x, y, dx, dy) -> None:
         """Called when the mouse moves."""
+        if self.dragging_scrub:
+            self.scrub_to(x)
+            return
         if not self.dragging:
             return
-        if not(0 <= self.selected_layer_index < len(get_layers())):
+        if not(0 <= self.selected_layer_index < len(self.layers)):
             return
         if x > self.DRAW_PANEL:
             return
-        self.try_draw(x, y)
+        # Motion events are coalesced and drawn as a polyline once per update.
+        self.pending_motion.append((x, y))
 
     def on_key_press(self, symbol: int, modifiers: int) -> None:
         """Called when a keyboard key is pressed."""
         if not self.enable_ui:
+            self.on_replay_key(symbol)
             return
+        if symbol in (keys.PAGEUP, keys.PAGEDOWN):
+            page = self.layer_buttons // 2
+            self.scroll_layers(page if symbol == keys.PAGEDOWN else -page)
         self.z_pressed = keys.Z == symbol and (modifiers & keys.MOD_CTRL)
         self.y_pressed = keys.Y == symbol and (modifiers & keys.MOD_CTRL)
         if self.z_pressed:
@@ -215,6 +289,19 @@ class MyWindow(arcade.Window):
             self.on_redo()
             self.y_timer = 0.5
 
+    def on_replay_key(self, symbol: int) -> None:
+        """Replay controls: arrows change the speed, B replays as fast as possible, End jumps to the end."""
+        if symbol in (keys.RIGHT, keys.UP):
+            self.replay_speed = min(self.replay_speed + 1, len(self.REPLAY_SPEEDS) - 1)
+        elif symbol in (keys.LEFT, keys.DOWN):
+            self.replay_speed = max(self.replay_speed - 1, 0)
+        elif symbol == keys.B:
+            self.replay_budgeted = not self.replay_budgeted
+        elif symbol == keys.END:
+            # Apply the whole remaining log at once; the grid is only redrawn afterwards.
+            self.replaytracker.play_to_end(self.grid)
+            self.enable_ui = True
+
     def on_key_release(self, symbol: int, modifiers: int) -> None:
         """Called when a keyboard key is released."""
         self.z_pressed = False
@@ -224,19 +311,12 @@ class MyWindow(arcade.Window):
         """Attempt to draw at a position, but safely fail if an invalid square."""
         if self.selected_layer_index == -1:
             return
-        layer = get_layers()[self.selected_layer_index]
+        layer = self.layers[self.selected_layer_index]
         if self.prev_pos is not None:
-            # Try draw in increments of 0.5 to avoid skipping squares.
-            mhat_dist = abs(x - self.prev_pos[0]) + abs(y - self.prev_pos[1])
-            increment = 0.5
-            points_to_draw = []
-            for d in range(1, math.ceil(mhat_dist/increment)+1):
-                distance = min(d * increment / mhat_dist, 1)
-                nx = distance * (x - self.prev_pos[0]) + self.prev_pos[0]
-                ny = distance * (y - self.prev_pos[1]) + self.prev_pos[1]
-                nx_pos = int(nx // self.GRID_SQ_WIDTH)
-                ny_pos = int(ny // self.GRID_SQ_HEIGHT)
-                points_to_draw.append((nx_pos, ny_pos))
+            # Walk every square crossed since the last position, so none are skipped.
+            points_to_draw = cells_on_segment(
+                self.prev_pos[0], self.prev_pos[1], x, y, self.GRID_SQ_WIDTH, self.GRID_SQ_HEIGHT,
+            )
         else:
             x_pos = int(x // self.GRID_SQ_WIDTH)
             y_pos = int(y // self.GRID_SQ_HEIGHT)
@@ -250,8 +330,35 @@ class MyWindow(arcade.Window):
                     self.prev_drawn = (px, py)
         self.prev_pos = (x, y)
 
+    def flush_motion(self) -> None:
+        """Draw the polyline through all mouse positions buffered since the last update."""
+        if not self.pending_motion:
+            return
+        pending = self.pending_motion
+        self.pending_motion = []
+        if not self.dragging:
+            return
+        for x, y in pending:
+            self.try_draw(x, y)
+
+    def scrub_to(self, x) -> None:
+        """Show the canvas at the point of the history under x on the scrub bar."""
+        fraction = min(max((x - self.DRAW_PANEL) / self.SIDEBAR_WIDTH, 0), 1)
+        k = self.timeline.start + round(fraction * (len(self.timeline) - self.timeline.start))
+        if k == len(self.timeline):
+            self.leave_history()
+        else:
+            self.timeline.seek(k)
+            self.scrub_position = k
+
+    def leave_history(self) -> None:
+        """Show the live canvas again, and let the timeline drop the grid it showed the history on."""
+        self.scrub_position = None
+        self.timeline.release()
+
     def start_replay(self) -> None:
         """Begin the replay mode."""
+        self.leave_history()
         self.enable_ui = False
         self.grid = Grid(self.draw_style, self.GRID_SIZE_X, self.GRID_SIZE_Y)
         self.replay_timer = self.REPLAY_TIMER_DELTA
@@ -260,6 +367,7 @@ class MyWindow(arcade.Window):
     def on_update(self, delta_time) -> None:
         """Movement and game logic."""
         self.timestamp += delta_time
+        self.flush_motion()
         if self.z_pressed:
             self.z_timer -= delta_time
             if self.z_timer <= 0:
@@ -271,201 +379,20 @@ class MyWindow(arcade.Window):
                 self.on_redo()
                 self.y_timer += 0.05
         if not self.enable_ui:
-            self.replay_timer -= delta_time
-            if self.replay_timer <= 0:
-                self.replay_timer += self.REPLAY_TIMER_DELTA
-                finished = self.on_replay_next_step()
-                if finished:
-                    self.enable_ui = True
-
-    def change_draw_mode(self) -> None:
-        """Changes the draw mode of the application, and resets the window."""
-        if self.draw_style == Grid.DRAW_STYLE_SET:
-            self.draw_style = Grid.DRAW_STYLE_ADD
-        elif self.draw_style == Grid.DRAW_STYLE_ADD:
-            self.draw_style = Grid.DRAW_STYLE_SEQUENCE
-        elif self.draw_style == Grid.DRAW_STYLE_SEQUENCE:
-            self.draw_style = Grid.DRAW_STYLE_SET
-        self.reset()
-
-    # STUDENT PART
-
-# Explanation coding concept:
-# Initialise self.undotracker instance with the class UndoTracker() for undo and redo used.
-# Initialise self.replaytracker instance with the class ReplayTracker() for replay used.
-
-# Time complexity analysis:
-# Time complexity: O(1)(Assignment) (Linear time)
-# Best case = Worst case
-    def on_init(self):
-        """Initialisation that occurs after the system initialisation."""
-        self.undotracker = UndoTracker()
-        self.replaytracker = ReplayTracker()
-
-
-# Explanation coding concept:
-# Reset all the instance in self.on_init()
-
-# Time complexity analysis:
-# Time complexity: O(1)(on_init) (Linear time)
-# Best case = Worst case
-    def on_reset(self):
-        """Called when a window reset is requested."""
-        self.on_init()
-
-
-# Time complexity analysis:
-# Let the size of self.grid be n
-# Let the size of self.grid[0] be m
-# Worst case:3(O(1)) + O(n) * O(m) * O(1) + O(Comp==) * 4(O(1)) + O(1) * 2(O(1)) = O(n*m+Comp==)
-# Best case: 3(O(1))(First three assignment) + O(n)(1st for loop) * O(m)(2nd for loop) * O(1)(distance assignment) = O(n*m)
-    def on_paint(self, layer: Layer, px, py):
-        """
-        Called when a grid square is clicked on, which should trigger painting in the vicinity.
-        Vicinity squares outside of the range [0, GRID_SIZE_X) or [0, GRID_SIZE_Y) can be safely ignored.
-
-        layer: The layer being applied.
-        px: x position of the brush.
-        py: y position of the brush.
-        """
-# Explanation coding concept:
-# Initialise the steps with empty list for storing all the step actions.
-# Initialise the paintaction instance with class PaintAction with two parameters steps and is_special boolean.
-# Initialise the change with boolean False.
-        steps = []
-        paintaction = PaintAction(steps, False)
-        change = False
-
-# Explanation coding concept:
-# The two for loop is to loop through the whole grid squares.
-# The distance variable is to calculate the distance between every grid squares and the coordinate of brush on paint.
-# If the distance is smaller than the grid_brush_size, it means that the area where should be painted.
-# Thus, calling the add function to paint the layer to the grid square (self.grid.grid[i][j])
-# After painting, I append the PaintStep action into the steps list with two parameters affected_grid_square and affected_layer
-# After adding the paintstep to steps list, using the add_step function to add the step to paintaction instance.
-# After done these things, change turn to True.
-        for i in range(len(self.grid.grid)):
-            for j in range(len(self.grid.grid[0])):
-                distance=abs(i-px)+abs(j-py)
-                if distance <= self.grid.brush_size:
-                    if self.grid.grid[i][j].add(layer):
-                        steps.append(PaintStep((i,j),layer))
-                        paintaction.add_step(PaintStep((i,j),layer))
-                        change = True
-
-# Explanation coding concept:
-# If change is True, add the paintaction instance to undotracker by using add_action function.
-# Adding the paintaction and False (is_undo boolean) to replaytracker by using add_action function.
-        if change:
-            self.undotracker.add_action(paintaction)
-            self.replaytracker.add_action(paintaction,False)
-
-
-# Explanation coding concept:
-# Calling the undo function by self.undotracker instance and assign it to action variable
-# If the action is not None, adding the action to replaytracker by using add_action function with two parameters
-# The parameter boolean is is_undo, thus the boolean is True.
-
-# Time complexity analysis:
-# Worst case: O(1)(undo function) + O(1)(if statement)*O(1)(add_action) = O(1) (Linear time)
-# Best case: O(1)(undo function) (action is None)
-    def on_undo(self):
-        """Called when an undo is requested."""
-        action = self.undotracker.undo(self.grid)
-        if action != None:
-            self.replaytracker.add_action(action,True)
-
-
-# Explanation coding concept:
-# Calling the redo function by self.undotracker instance and assign it to action variable
-# If the action is not None, adding the action to replaytracker by using add_action function with two parameters
-# The parameter boolean is is_undo, thus the boolean is False.
-
-# Time complexity analysis:
-# Worst case: O(1)(redo function) + O(1)(if statement)*O(1)(add_action) = O(1) (Linear time)
-# Best case: O(1)(redo function) (action is None)
-    def on_redo(self):
-        """Called when a redo is requested."""
-        action = self.undotracker.redo(self.grid)
-        if action != None:
-            self.replaytracker.add_action(action,False)
-
-
-# Explanation coding concept:
-# Create a instance is PaintAction class with two parameters action and is_special.
-# Due to the special does not have list item so put a empty list with it and the boolean is True.
-# Calling the special function of Grid class.
-# Adding the paintaction and the is_undo boolean = False into replaytracker by using add_action function.
-
-# Time complexity analysis:
-# Let the size of self.grid be n
-# Let the size of self.grid[0] be m
-# Let the size of myQueue be a
-# Let the size of myStack be b
-# Let the size of mySortedlist be c
-# Let the size of lexicographic_list be d
-# If draw_style == "SET",
-# Worst case: O(1)(assignment) + O(n*m)(special function) + O(1)(add_function) = O(n*m)
-# Best case: O(1)(assignment) + O(n*m)(special function) + O(1)(add_function) = O(n*m)
-# If draw_style == "ADD"",
-# Worst case: O(1)(assignment) + O(n*m*(a+b))(special function) + O(1)(add_function) = O(n*m*(a+b))
-# Best case: O(1)(assignment) + O(n*m*(a+b))(special function) + O(1)(add_function) = O(n*m*(a+b))
-# If draw_style == "SEQUENCE",
-# Worst case: O(1)(assignment) + O(n*m*(c^2+d^2))(special function) + O(1)(add_function) = O(n*m*(c^2+d^2))
-# Best case: O(1)(assignment) + O(n*m)(special function) + O(1)(add_function) = O(n*m)
-    def on_special(self):
-        """Called when the special action is requested."""
-        paintaction = PaintAction([],True)
-        self.grid.special()                 #Call Grid.special
-        self.replaytracker.add_action(paintaction, False)
-
-
-# Explanation coding concept:
-# Calling the start_replay function by self.replaytracker instance.
-
-# Time complexity analysis:
-# Time complexity: O(1)(start_replay) (Linear time)
-# Best case = Worst case
-    def on_replay_start(self):
-        """Called when the replay starting is requested."""
-        self.replaytracker.start_replay()
-
-
-# Explanation coding concept:
-# Calling the play_next_action function by self.replaytracker instance with parameter self.grid
-
-# Time complexity analysis:
-# Time complexity: O(1)(play_next_action) (Linear time)
-# Best case = Worst case
-    def on_replay_next_step(self) -> bool:
-        """
-        Called when the next step of the replay is requested.
-        Returns whether the replay is finished.
-        """
-        return self.replaytracker.play_next_action(self.grid)
-
-
-
-# Explanation coding concept:
-# Calling the increase_brush_size function with self.grid
-
-# Time complexity analysis:
-# Time complexity: O(1)(increase_brush_size function) (Linear time)
-# Best case = Worst case
-    def on_increase_brush_size(self):
-        """Called when an increase to the brush size is requested."""
-        self.grid.increase_brush_size()
-
-
-# Explanation coding concept:
-# Calling the decrease_brush_size function with self.grid
-
-# Time complexity analysis:
-# Time complexity: O(1)(decrease_brush_size function) (Linear time)
-# Best case = Worst case
-    def on_decrease_brush_size(self):
-        """Called when a decrease to the brush size is requested."""
-        self.grid.decrease_brush_size()
+            # The steps of one update are all applied before the grid is redrawn.
+            if self.replay_budgeted:
+                # As many steps as fit in the frame budget.
+                finished = self.replaytracker.play_for(self.grid, self.REPLAY_FRAME_BUDGET)
+            else:
+                # Every step that is due at the current speed, even if several are due in one update.
+                self.replay_timer -= delta_time * self.REPLAY_SPEEDS[self.replay_speed]
+                due = 0
+                while self.replay_timer <= 0:
+                    self.replay_timer += self.REPLAY_TIMER_DELTA
+                    due += 1
+                finished = self.replaytracker.play_actions(self.grid, due)
+            if finished:
+                self.enable_ui = True
 
 def main():
     """ Main function """
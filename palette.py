@@ -0,0 +1,36 @@
+"""
+Plugin of flat colour layers: the 216 web-safe colours, named flat_rrggbb.
+
+Not loaded by default. To add these layers after the built-in ones:
+
+    from layer_util import register_plugin
+    register_plugin("palette")
+
+Since journals and saved grids refer to layers by index, the same plugins should be
+registered, in the same order, before reading them back.
+"""
+
+from layer_util import Layer, background, register, uniform
+
+STEPS = (0x00, 0x33, 0x66, 0x99, 0xCC, 0xFF)
+
+
+def flat(r: int, g: int, b: int) -> Layer:
+    """Registers a layer which paints the colour (r, g, b)."""
+    colour = (r, g, b)
+
+    def apply(color, timestamp, x, y):
+        return colour
+
+    def apply_into(rgb, timestamp, x, y):
+        rgb[0] = r
+        rgb[1] = g
+        rgb[2] = b
+
+    apply.__name__ = f"flat_{r:02x}{g:02x}{b:02x}"
+    layer = register(uniform(background(r, g, b)(apply)))
+    layer.in_place(apply_into)
+    return layer
+
+
+FLAT_LAYERS = tuple(flat(r, g, b) for r in STEPS for g in STEPS for b in STEPS)
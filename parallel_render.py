@@ -0,0 +1,180 @@
+"""
+Rendering a grid in several processes, into a shared-memory RGB frame buffer.
+
+The image is split into horizontal bands, each a whole number of snapshot tiles high.
+Every band has its own single-worker process pool, so that the same process renders it every frame
+and can keep the layers of its squares between frames. Each frame, only the tiles that changed since
+the previous frame (found by diffing grid snapshots) are sent to the workers, as layer indices.
+The workers then evaluate every square of their band, since layers may change with the timestamp,
+and write the colours straight into the shared frame buffer.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory, util
+
+from grid import Grid
+from layer_util import get_layers, register_plugin
+
+BG = (255, 255, 255)
+
+# State of the band rendered by this worker process, set up by _init_band.
+_band = None
+
+
+class _Band:
+    """ The squares of one band, as the worker process sees them. """
+
+    def __init__(self, buffer_name: str, draw_style: str, x_size: int, y_size: int,
+                 y0: int, y1: int, background: tuple) -> None:
+        self.buffer = shared_memory.SharedMemory(name=buffer_name)
+        self.draw_style = draw_style
+        self.x_size, self.y_size = x_size, y_size
+        self.y0, self.y1 = y0, y1
+        self.background = background
+        self.layers = get_layers()
+        self.invert = next(layer for layer in self.layers if layer is not None and layer.name == "invert")
+        # For each square, x major, the in-place functions of its layers in the order they apply.
+        self.squares = [()] * (x_size * (y1 - y0))
+        self.functions = {}
+
+    def update(self, changes: list[tuple[int, int, tuple, bool]]) -> None:
+        """ Applies (x, y, layer indices, inverted) changes to the squares. """
+        height = self.y1 - self.y0
+        for x, y, indices, inverted in changes:
+            key = (indices, inverted)
+            functions = self.functions.get(key)
+            if functions is None:
+                functions = tuple(self.layers[index].apply_into for index in indices)
+                if inverted:
+                    functions += (self.invert.apply_into,)
+                self.functions[key] = functions
+            self.squares[x * height + y - self.y0] = functions
+
+    def render(self, timestamp: float) -> None:
+        """ Writes the colours of the band into the frame buffer. """
+        buf = self.buffer.buf
+        x_size, height = self.x_size, self.y1 - self.y0
+        bg_r, bg_g, bg_b = self.background
+        rgb = bytearray(3)
+        line = bytearray(3 * x_size)
+        squares = self.squares
+        for y in range(self.y0, self.y1):
+            offset = y - self.y0
+            for x in range(x_size):
+                rgb[0] = bg_r
+                rgb[1] = bg_g
+                rgb[2] = bg_b
+                for function in squares[x * height + offset]:
+                    function(rgb, timestamp, x, y)
+                line[3 * x:3 * x + 3] = rgb
+            row = self.y_size - 1 - y
+            buf[3 * x_size * row:3 * x_size * (row + 1)] = line
+
+
+def _init_band(plugins: list[str], *args) -> None:
+    global _band
+    # Snapshots refer to layers by index, so the workers register the same plugins, whether they
+    # were forked from this process or started afresh.
+    for plugin in plugins:
+        register_plugin(plugin)
+    _band = _Band(*args)
+    # Worker processes leave through os._exit, which skips atexit, but multiprocessing runs the
+    # finalizers with an exit priority first. So the worker's view of the frame buffer is closed.
+    util.Finalize(_band, _band.buffer.close, exitpriority=0)
+
+
+def _render_band(changes: list, timestamp: float) -> None:
+    _band.update(changes)
+    _band.render(timestamp)
+
+
+class ParallelRenderer:
+    """
+    Renders a grid into `frame`, a shared-memory buffer of packed RGB rows from the top of the image,
+    laid out like render.render_rgb with scale 1.
+
+    Usage:  with ParallelRenderer(grid, plugins=["palette"]) as renderer:
+                frame = renderer.render(timestamp)
+
+    plugins are the layer plugin modules registered in this process, in the order they were registered.
+
+    The grid can be changed in any way between frames: its squares mark their tiles as changed,
+    so its snapshots show what changed.
+    """
+
+    def __init__(self, grid: Grid, workers: int | None = None, background: tuple = BG,
+                 plugins: list[str] = ()) -> None:
+        self.grid = grid
+        self.x_size, self.y_size = len(grid.grid), len(grid.grid[0])
+        tiles = (self.y_size + Grid.TILE_SIZE - 1) >> Grid.TILE_BITS
+        workers = max(1, min(workers or os.cpu_count() or 1, tiles))
+        self.buffer = shared_memory.SharedMemory(create=True, size=3 * self.x_size * self.y_size)
+        self.frame = self.buffer.buf
+        # Band i covers tiles [starts[i], starts[i + 1]) in y.
+        self.starts = [tiles * i // workers for i in range(workers + 1)]
+        self.pools = []
+        for i in range(workers):
+            y0 = min(self.starts[i] << Grid.TILE_BITS, self.y_size)
+            y1 = min(self.starts[i + 1] << Grid.TILE_BITS, self.y_size)
+            self.pools.append(ProcessPoolExecutor(
+                1, initializer=_init_band,
+                initargs=(list(plugins), self.buffer.name, grid.draw_style, self.x_size, self.y_size, y0, y1, background),
+            ))
+        self.snapshot = None
+
+    def _changes(self) -> list[list]:
+        """ The changed squares of each band since the previous frame, as layer indices. """
+        snapshot = self.grid.snapshot()
+        # The workers start with every square empty, so on the first frame empty squares are left out.
+        first = self.snapshot is None
+        if first:
+            tiles = range(len(snapshot.tiles))
+        else:
+            tiles = self.snapshot.tiles.diff(snapshot.tiles)
+        self.snapshot = snapshot
+        changes = [[] for _ in self.pools]
+        band = 0
+        set_style = self.grid.draw_style == Grid.DRAW_STYLE_SET
+        tiles_y = self.grid.tiles_y
+        for tile in sorted(tiles, key=lambda tile: tile % tiles_y):
+            tile_y = tile % tiles_y
+            while tile_y >= self.starts[band + 1]:
+                band += 1
+            states = snapshot.tiles[tile]
+            band_changes = changes[band]
+            for position, x, y in self.grid._tile_squares(tile):
+                state = states[position]
+                if set_style:
+                    layer, inverted = state
+                    change = (x, y, () if layer is None else (layer.index,), inverted)
+                else:
+                    change = (x, y, tuple(layer.index for layer in state), False)
+                if not first or change[2] or change[3]:
+                    band_changes.append(change)
+        return changes
+
+    def render(self, timestamp: float = 0) -> memoryview:
+        """ Renders the grid at timestamp into the frame buffer, and returns it. """
+        futures = [pool.submit(_render_band, changes, timestamp)
+                   for pool, changes in zip(self.pools, self._changes())]
+        for future in futures:
+            future.result()
+        return self.frame
+
+    def close(self) -> None:
+        """ Stops the workers and frees the frame buffer. """
+        for pool in self.pools:
+            pool.shutdown()
+        self.frame = None
+        try:
+            self.buffer.close()
+        finally:
+            # Freed even if a view of the frame is still held, which close refuses.
+            self.buffer.unlink()
+
+    def __enter__(self) -> "ParallelRenderer":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,208 @@
+"""
+Rendering a grid without a window, to an RGB buffer and image files.
+
+GroupedRenderer renders frame after frame of the same grid. It groups the squares by
+their store state, so each distinct stack of layers is evaluated once rather than once
+per square: a stack of @uniform layers gives one colour for its whole group, and only
+the squares under a layer that depends on the timestamp or the square are evaluated
+every frame.
+"""
+
+import struct
+import zlib
+
+from grid import Grid
+from layer_util import get_layer_by_name
+
+BG = (255, 255, 255)
+
+
+def render_rgb(grid: Grid, scale: int = 1, timestamp: float = 0, background: tuple = BG) -> tuple[bytearray, int, int]:
+    """
+    Renders the grid as the window draws it, `scale` pixels per square.
+    Returns the pixels as packed RGB rows from the top of the image, and the width and height.
+    Like the window, y grows upwards, so the last row of squares is at the top.
+    """
+    x_size, y_size = len(grid.grid), len(grid.grid[0])
+    rgb = bytearray(3)
+    out = bytearray()
+    for y in range(y_size - 1, -1, -1):
+        line = bytearray()
+        for x in range(x_size):
+            rgb[0], rgb[1], rgb[2] = background
+            grid[x][y].get_color_into(rgb, timestamp, x, y)
+            line += rgb * scale
+        out += line * scale
+    return out, x_size * scale, y_size * scale
+
+
+class GroupedRenderer:
+    """
+    Renders a grid into `frame`, packed RGB rows from the top of the image, laid out like
+    render_rgb with scale 1.
+
+    Usage:  renderer = GroupedRenderer(grid)
+            frame = renderer.render(timestamp)
+
+    The squares are kept in `groups`, by store state. Each state is compiled once into a plan:
+    the colour of its leading uniform layers, and the in-place functions of the layers from the
+    first animated one on. A state with no animated layer has one colour for its whole group,
+    written into the frame only when a square joins the group. The squares of the other groups
+    are evaluated every frame, in one loop per group.
+
+    The grid can be changed in any way between frames: its squares mark their tiles as changed,
+    so its snapshots show what changed.
+    """
+
+    def __init__(self, grid: Grid, background: tuple = BG) -> None:
+        self.grid = grid
+        self.background = tuple(background)
+        self.x_size, self.y_size = len(grid.grid), len(grid.grid[0])
+        self.frame = bytearray(self.background) * (self.x_size * self.y_size)
+        # Squares (x, y) by state, and the states with animated layers among them.
+        self.groups: dict[tuple, set[tuple[int, int]]] = {}
+        self.animated: set[tuple] = set()
+        self.plans: dict[tuple, tuple[bytes, tuple]] = {}
+        self.set_style = grid.draw_style == Grid.DRAW_STYLE_SET
+        self.invert = get_layer_by_name("invert")
+        self.snapshot = None
+
+    def plan(self, state: tuple) -> tuple[bytes, tuple]:
+        """
+        The colour of the leading uniform layers of a state, over the background,
+        and the in-place functions of the layers after them.
+        """
+        plan = self.plans.get(state)
+        if plan is None:
+            if self.set_style:
+                layer, inverted = state
+                layers = (() if layer is None else (layer,)) + ((self.invert,) if inverted else ())
+            else:
+                layers = state
+            rgb = bytearray(self.background)
+            i = 0
+            while i < len(layers) and layers[i].uniform:
+                layers[i].apply_into(rgb, 0, 0, 0)
+                i += 1
+            plan = self.plans[state] = (bytes(rgb), tuple(layer.apply_into for layer in layers[i:]))
+        return plan
+
+    def colour(self, state: tuple) -> bytes | None:
+        """ The colour of every square with this state, or None if it depends on the timestamp or the square. """
+        colour, functions = self.plan(state)
+        return None if functions else colour
+
+    def _offset(self, x: int, y: int) -> int:
+        return 3 * ((self.y_size - 1 - y) * self.x_size + x)
+
+    def _update(self) -> None:
+        """ Moves the squares changed since the previous frame to their new groups. """
+        snapshot = self.grid.snapshot()
+        if snapshot is self.snapshot:
+            return
+        previous = self.snapshot
+        if previous is None:
+            tiles = range(len(snapshot.tiles))
+        else:
+            tiles = previous.tiles.diff(snapshot.tiles)
+        self.snapshot = snapshot
+        groups, animated, frame = self.groups, self.animated, self.frame
+        for tile in tiles:
+            states = snapshot.tiles[tile]
+            old_states = None if previous is None else previous.tiles[tile]
+            for position, x, y in self.grid._tile_squares(tile):
+                state = states[position]
+                if old_states is not None:
+                    old = old_states[position]
+                    if old == state:
+                        continue
+                    group = groups[old]
+                    group.discard((x, y))
+                    if not group:
+                        del groups[old]
+                        animated.discard(old)
+                group = groups.get(state)
+                if group is None:
+                    group = groups[state] = set()
+                    if self.colour(state) is None:
+                        animated.add(state)
+                group.add((x, y))
+                if state not in animated:
+                    offset = self._offset(x, y)
+                    frame[offset:offset + 3] = self.plans[state][0]
+
+    def render(self, timestamp: float = 0) -> bytearray:
+        """ Renders the grid at timestamp into the frame, and returns it. """
+        self._update()
+        frame, x_size, top = self.frame, self.x_size, self.y_size - 1
+        rgb = bytearray(3)
+        for state in self.animated:
+            colour, functions = self.plans[state]
+            r, g, b = colour
+            for x, y in self.groups[state]:
+                rgb[0] = r
+                rgb[1] = g
+                rgb[2] = b
+                for function in functions:
+                    function(rgb, timestamp, x, y)
+                offset = 3 * ((top - y) * x_size + x)
+                frame[offset:offset + 3] = rgb
+        return frame
+
+    def pixel(self, x: int, y: int) -> bytearray:
+        """ The colour of square (x, y) in the last frame rendered. """
+        offset = self._offset(x, y)
+        return self.frame[offset:offset + 3]
+
+
+def write_image(path: str, pixels: bytes, width: int, height: int, text: dict[str, str] | None = None) -> None:
+    """
+    Writes packed RGB pixels to an image file: a PNG if the path ends with .png, a binary PPM otherwise.
+    A PNG also gets a tEXt chunk for each key and value of text, which read_png_text reads back.
+    """
+    if path.lower().endswith(".png"):
+        data = _png(pixels, width, height, text or {})
+    else:
+        data = b"P6\n%d %d\n255\n" % (width, height) + bytes(pixels)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def read_png_text(path: str) -> dict[str, str]:
+    """
+    The tEXt chunks of a PNG before its image data, as written by write_image.
+
+    :raises ValueError: if the file is not a PNG
+    :raises OSError: if the file can not be read
+    """
+    text = {}
+    with open(path, "rb") as f:
+        if f.read(8) != b"\x89PNG\r\n\x1a\n":
+            raise ValueError(f"{path} is not a PNG")
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                return text
+            length, tag = struct.unpack(">I4s", header)
+            if tag in (b"IDAT", b"IEND"):
+                return text
+            data = f.read(length + 4)[:length]
+            if tag == b"tEXt":
+                key, _, value = data.partition(b"\x00")
+                text[key.decode("latin-1")] = value.decode("latin-1")
+
+
+def _png(pixels: bytes, width: int, height: int, text: dict[str, str]) -> bytes:
+    stride = width * 3
+    # Every row starts with filter type 0 (none).
+    raw = b"".join(b"\x00" + pixels[row * stride:(row + 1) * stride] for row in range(height))
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+
+    return (b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+            + b"".join(chunk(b"tEXt", key.encode("latin-1") + b"\x00" + value.encode("latin-1"))
+                       for key, value in text.items())
+            + chunk(b"IDAT", zlib.compress(raw, 6))
+            + chunk(b"IEND", b""))
@@ -1,36 +1,126 @@
 from __future__ import annotations
+import threading
+import time
 from action import PaintAction
-from data_structures.queue_adt import CircularQueue
+from action_log import ActionLog
+from compaction import compact
 from grid import Grid
+from journal import Journal
 
 
 class ReplayTracker:
 
+    DEFAULT_COMPACT_THRESHOLD = 4096
+
+# Explanation coding concept:
+# Initialise self.log with an ActionLog, which keeps every action added and has no fixed capacity.
+# Initialise self.cursor with a cursor at the start of the log, which marks the next action to play.
+# Playing only moves the cursor, so the log can be replayed again, or read by other cursors at the same time.
+# If a journal is given, every action added is also written to it, so the session survives a crash.
+
+# Complexity analysis:
+# The log starts empty, so the time complexity is O(1).
+    def __init__(self, log: ActionLog | None = None, journal: Journal | None = None):
+        self.log = ActionLog() if log is None else log
+        self.cursor = self.log.cursor()
+        self.journal = journal
+        self.compaction = None
+        self.compactor = None
+        self.compacted = None
+        self.compacted_length = 0
+
 # Explanation coding concept:
-# Initialise self.replay_action to create a CircularQueue.
+# Once compaction is enabled, whenever threshold actions were added since the last compaction,
+# a background thread compacts a copy of the log up to that point.
+# The result is swapped in by add_action, on the thread adding actions, with the actions added meanwhile
+# appended after it. The swap waits while a replay is part way through the compacted actions,
+# since there is no matching position for the cursor in the compacted log.
 
 # Complexity analysis:
-# It depends on CircularQueue which is O(max_capacity) since the parameter is a constant.
-# Thus the time complexity is linear time O(1).
-    def __init__(self):
-        self.replay_action = CircularQueue(10000)
+# Best case = Worst case = O(1)
+    def enable_compaction(self, draw_style: str, threshold: int = DEFAULT_COMPACT_THRESHOLD,
+                          preserve_frames: int | None = None) -> None:
+        """
+        Compacts the log in the background every `threshold` actions, see compaction.compact.
+        """
+        self.compaction = (draw_style, threshold, preserve_frames)
+
+    def _compact(self, log: ActionLog, length: int) -> None:
+        draw_style, _, preserve_frames = self.compaction
+        cursor = log.cursor()
+        entries = [cursor.next() for _ in range(length)]
+        self.compacted = (log, length, compact(entries, draw_style, preserve_frames))
+
+# Complexity analysis:
+# O(1) to start a compaction. A swap is O(c + a), for c compacted actions and a actions added meanwhile.
+    def _compact_in_background(self) -> None:
+        if self.compacted is not None:
+            self._swap_compacted()
+        elif self.compactor is None or not self.compactor.is_alive():
+            if len(self.log) - self.compacted_length >= self.compaction[1]:
+                self.compactor = threading.Thread(target=self._compact, args=(self.log, len(self.log)),
+                                                  name="log-compactor", daemon=True)
+                self.compactor.start()
+
+    def _swap_compacted(self) -> None:
+        log, length, entries = self.compacted
+        position = self.cursor.position
+        if log is not self.log:
+            # The log was replaced since the compaction started.
+            self.compacted = None
+            return
+        if 0 < position < length:
+            return
+        new_log = log.empty_copy()
+        for action, is_undo in entries:
+            new_log.append(action, is_undo)
+        cursor = log.cursor(length)
+        while cursor.has_next():
+            new_log.append(*cursor.next())
+        self.log = new_log
+        self.cursor = new_log.cursor(0 if position == 0 else position - length + len(entries))
+        self.compacted = None
+        self.compacted_length = len(new_log)
+
+    def compact_now(self) -> None:
+        """
+        Waits for a running compaction, or compacts the whole log, and swaps the result in if the replay allows it.
+        :pre: compaction is enabled
+        """
+        if self.compactor is not None:
+            self.compactor.join()
+        if self.compacted is None:
+            self._compact(self.log, len(self.log))
+        self._swap_compacted()
 
     def start_replay(self) -> None:
         """
         Called whenever we should stop taking actions, and start playing them back.
 
         Useful if you have any setup to do before `play_next_action` should be called.
+        The replay carries on from the first action that has not been played yet.
         """
         pass
 
 # Explanation coding concept:
-# This add_action is to add the action and is_undo boolean into replay_action.
-# To add this to parameters into the circularqueue, I use append method to add the tuple of two items into it.
+# Move the cursor back to the start of the log, so the next replay plays every action again.
 
 # Complexity analysis:
-# This operation takes a constant amount of time,
-# The algorithm performs the constant time of running the whole function in best and worst case.
-# Therefore, the best case and worst case of time complexity of add_function is O(1).
+# Best case = Worst case = O(1)
+    def restart_replay(self) -> None:
+        """
+        Rewinds the replay, so that playing starts again from the first action.
+        """
+        self.cursor.reset()
+
+# Explanation coding concept:
+# This add_action is to add the action and is_undo boolean at the end of the log, and to the journal if there is one.
+# If compaction is enabled, it also starts a compaction or swaps in a finished one.
+
+# Complexity analysis:
+# Appending to the log is O(1), and only a whole chunk is written when the log spills to disk.
+# Journaling encodes the action, O(s) for s steps, and leaves the writing to the journal's thread.
+# Therefore, the best case and worst case of time complexity of add_function is O(1) amortised without a journal, O(s) with one.
     def add_action(self, action: PaintAction, is_undo: bool = False) -> None:
         """
         Adds an action to the replay.
@@ -38,13 +128,17 @@ class ReplayTracker:
         `is_undo` specifies whether the action was an undo action or not.
         Special, Redo, and Draw all have this is False.
         """
-        self.replay_action.append((action, is_undo))
+        self.log.append(action, is_undo)
+        if self.journal is not None:
+            self.journal.record(action, is_undo)
+        if self.compaction is not None:
+            self._compact_in_background()
 
 
 # Explanation coding concept:
-# Checking the replay_action is empty or not.
-# If the replay_action is empty, means there is no action to replay, thus return False.
-# Otherwise, serve the first item in replay_action and assign it to action variable.
+# Checking the cursor has reached the end of the log or not.
+# If it has, means there is no action to replay, thus return True.
+# Otherwise, read the entry at the cursor, move the cursor past it, and assign it to action variable.
 # If the second element (boolean of is_undo) in action is True, the first element of action applied undo_apply function.
 # Otherwise, the first element of action applied redo_apply function with parameter grid.
 # If there have actions to play, return True.
@@ -52,10 +146,10 @@ class ReplayTracker:
 
 # Complexity analysis:
 # In worst case,
-# the first if statement performs O(1) (True or False). The serve action of the time complexity is O(1).
+# the first if statement performs O(1) (True or False). Reading the next entry is O(1) amortised.
 # The time complexity of the second comparison is O(1)*O(1) (redo_apply and undo_apply). And the return statement is O(1).
 # Thus, the worst case of time complexity is O(1)*O(1)+O(1)*O(1)+O(1) =O(1) (Linear time)
-# Due to the time complexity of worst case is O(1). Therefore, in best case (replay_action is empty) is definitely O(1).
+# Due to the time complexity of worst case is O(1). Therefore, in best case (no actions left) is definitely O(1).
     def play_next_action(self, grid: Grid) -> bool:
         """
         Plays the next replay action on the grid.
@@ -63,8 +157,8 @@ class ReplayTracker:
             - If there were no more actions to play, and so nothing happened, return True.
             - Otherwise, return False.
         """
-        if not self.replay_action.is_empty():
-            action = self.replay_action.serve()
+        if self.cursor.has_next():
+            action = self.cursor.next()
             if not action[1]:
                 action[0].redo_apply(grid)
             else:
@@ -72,6 +166,51 @@ class ReplayTracker:
             return False
         return True
 
+# Explanation coding concept:
+# Play the next actions one by one, until count actions are played or there are none left.
+
+# Complexity analysis:
+# Best case = Worst case = O(count*Comp(apply))
+    def play_actions(self, grid: Grid, count: int) -> bool:
+        """
+        Plays up to `count` replay actions on the grid.
+        Returns whether the replay is finished, with the same meaning as play_next_action.
+        """
+        for _ in range(count):
+            if self.play_next_action(grid):
+                return True
+        return not self.cursor.has_next()
+
+# Explanation coding concept:
+# Play the next actions one by one, until the time budget is used up or there are none left.
+# At least one action is always played, so a replay always makes progress.
+
+# Complexity analysis:
+# Depends on the budget: O(k*Comp(apply)) where k is the number of actions that fit in it.
+    def play_for(self, grid: Grid, seconds: float) -> bool:
+        """
+        Plays as many replay actions as fit within `seconds` of wall time.
+        Returns whether the replay is finished.
+        """
+        deadline = time.perf_counter() + seconds
+        while not self.play_next_action(grid):
+            if time.perf_counter() >= deadline:
+                return not self.cursor.has_next()
+        return True
+
+# Explanation coding concept:
+# Play every remaining action without returning to the caller in between,
+# so the window only redraws the grid once, at the end.
+
+# Complexity analysis:
+# Let n be the number of remaining actions. Best case = Worst case = O(n*Comp(apply))
+    def play_to_end(self, grid: Grid) -> None:
+        """
+        Plays every remaining replay action on the grid.
+        """
+        while not self.play_next_action(grid):
+            pass
+
 
 if __name__ == "__main__":
     action1 = PaintAction([], is_special=True)
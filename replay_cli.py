@@ -0,0 +1,108 @@
+"""
+Headless replay of a recorded session.
+
+Plays a session journal (see journal.py) onto a grid with no window, writes the
+final render, and prints the replay throughput and the peak memory of the process.
+The draw style and size recorded in the journal can be overridden, to compare
+the same session across draw styles or on a larger canvas.
+
+    python replay_cli.py session.journal [-o final.png] [--style ADD] [--size 64x64] [--scale 8]
+"""
+
+import argparse
+import sys
+import time
+
+from grid import Grid
+from journal import Journal, RESET
+from render import render_rgb, write_image
+from replay import ReplayTracker
+
+
+def parse_size(text: str) -> tuple[int, int]:
+    try:
+        width, height = (int(part) for part in text.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"size should look like 64x64, not {text!r}")
+    if width <= 0 or height <= 0:
+        raise argparse.ArgumentTypeError("size should be positive")
+    return width, height
+
+
+def load_session(path: str) -> tuple[ReplayTracker, str, int, int, int]:
+    """
+    Reads the last session in the journal into a ReplayTracker.
+    Returns the tracker, the recorded draw style and size, and the number of paint steps.
+    """
+    tracker = None
+    draw_style, width, height, steps = None, 0, 0, 0
+    for record in Journal(path).recover():
+        if record.kind == RESET:
+            tracker = ReplayTracker()
+            draw_style, width, height, steps = record.draw_style, record.width, record.height, 0
+        elif tracker is not None:
+            tracker.add_action(record.action, record.is_undo)
+            steps += len(record.action)
+    if tracker is None:
+        raise ValueError(f"{path} has no recorded session")
+    return tracker, draw_style, width, height, steps
+
+
+def peak_rss(children: bool = False) -> int | None:
+    """
+    Peak resident memory of this process in bytes, or None where it cannot be read.
+    With children, that of the largest child process which has finished instead.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    p.add_argument("journal", help="session journal to replay")
+    p.add_argument("-o", "--output", default="replay.png", help="final render, .png or .ppm (default: %(default)s)")
+    p.add_argument("--style", choices=Grid.DRAW_STYLE_OPTIONS, help="draw style (default: as recorded)")
+    p.add_argument("--size", type=parse_size, help="grid size WxH, at least the recorded size (default: as recorded)")
+    p.add_argument("--scale", type=int, default=8, help="pixels per square in the render (default: %(default)s)")
+    p.add_argument("--timestamp", type=float, default=0, help="timestamp to render at (default: %(default)s)")
+    args = p.parse_args(argv)
+
+    start = time.perf_counter()
+    try:
+        tracker, draw_style, width, height, steps = load_session(args.journal)
+    except ValueError as e:
+        p.error(str(e))
+    loaded = time.perf_counter() - start
+    draw_style = args.style or draw_style
+    if args.size is not None:
+        if args.size[0] < width or args.size[1] < height:
+            p.error(f"size should be at least the recorded {width}x{height}")
+        width, height = args.size
+
+    grid = Grid(draw_style, width, height)
+    actions = len(tracker.log)
+    tracker.start_replay()
+    start = time.perf_counter()
+    tracker.play_to_end(grid)
+    played = time.perf_counter() - start
+
+    pixels, image_width, image_height = render_rgb(grid, args.scale, args.timestamp)
+    write_image(args.output, pixels, image_width, image_height)
+
+    rss = peak_rss()
+    print(f"session:  {draw_style} {width}x{height}, {actions} actions, {steps} steps")
+    print(f"load:     {loaded:8.3f} s")
+    print(f"replay:   {played:8.3f} s")
+    print(f"actions/s {actions / played if played else float('inf'):12.0f}")
+    print(f"steps/s   {steps / played if played else float('inf'):12.0f}")
+    print(f"peak RSS  {'n/a' if rss is None else f'{rss / 2**20:10.1f} MiB'}")
+    print(f"render:   {args.output} ({image_width}x{image_height})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,359 @@
+"""
+The drawing engine: a grid with its undo, replay, history and journal, without any GUI.
+
+MyWindow (in main.py) is a DrawingSession that draws it with arcade and turns mouse and
+keyboard input into calls to it. Headless code (tests, batch jobs, replays) can use
+DrawingSession on its own, and so never imports arcade or sets up OpenGL.
+
+Usage:  session = DrawingSession(Grid.DRAW_STYLE_SET, 32, 32)
+        session.setup()
+        session.on_paint(red, 3, 4)
+        session.on_undo()
+"""
+
+import math
+
+from action import PaintAction
+from grid import Grid
+from journal import Journal, PAINT, RESET, SPECIAL, UNDO
+from layer_util import Layer
+from replay import ReplayTracker
+from timeline import HistoryTimeline
+from undo import UndoTracker
+
+
+def cells_on_segment(x0: float, y0: float, x1: float, y1: float, cell_width: float, cell_height: float):
+    """
+    Yield every grid cell crossed by the segment (x0, y0) -> (x1, y1), in order.
+    The cell containing the start point is not yielded, and every other cell is yielded exactly once.
+
+    This is the Amanatides-Woo grid traversal: at every step we move to whichever
+    neighbouring cell boundary the segment reaches first, so no cell can be skipped.
+    When both boundaries are reached at once (the segment passes through a corner)
+    the vertical move is made first, which keeps the path 4-connected.
+    """
+    cx, cy = int(x0 // cell_width), int(y0 // cell_height)
+    ex, ey = int(x1 // cell_width), int(y1 // cell_height)
+    dx, dy = x1 - x0, y1 - y0
+    step_x = 1 if dx > 0 else -1
+    step_y = 1 if dy > 0 else -1
+    if dx != 0:
+        t_max_x = ((cx + (step_x > 0)) * cell_width - x0) / dx
+        t_delta_x = cell_width / abs(dx)
+    else:
+        t_max_x = t_delta_x = math.inf
+    if dy != 0:
+        t_max_y = ((cy + (step_y > 0)) * cell_height - y0) / dy
+        t_delta_y = cell_height / abs(dy)
+    else:
+        t_max_y = t_delta_y = math.inf
+    for _ in range(abs(ex - cx) + abs(ey - cy)):
+        # Guard against floating point drift walking past the end cell on one axis.
+        if cy == ey or (cx != ex and t_max_x < t_max_y):
+            cx += step_x
+            t_max_x += t_delta_x
+        else:
+            cy += step_y
+            t_max_y += t_delta_y
+        yield cx, cy
+
+
+class DrawingSession:
+    """ Drawing engine """
+
+    GRID_SIZE_X = 32
+    GRID_SIZE_Y = 32
+
+    # Every action is journaled here and recovered by setup. None turns this off.
+    JOURNAL_PATH = None
+    # The replay log is compacted in the background every this many actions. None turns this off.
+    # Off by default: a compacted log replays an equivalent but rewritten history, where overwritten
+    # strokes are dropped and specials may move, which is not what the Replay button should show.
+    COMPACT_THRESHOLD = None
+    # Compact in windows of this many actions, keeping the frame at the end of each window. None: one window.
+    COMPACT_PRESERVE_FRAMES = None
+
+    # SCAFFOLD PART
+    # Unless you're adding new features, you shouldn't need to touch this.
+
+    def __init__(self, draw_style: str = Grid.DRAW_STYLE_SET, width: int | None = None, height: int | None = None) -> None:
+        """Initialise the logic variables. The grid is only created by reset or setup."""
+        self.grid: Grid = None
+        self.draw_style = draw_style
+        if width is not None:
+            self.GRID_SIZE_X = width
+        if height is not None:
+            self.GRID_SIZE_Y = height
+        self.journal: Journal = None
+        self.on_init()
+
+    def reset(self) -> None:
+        """Start again on a new, empty grid."""
+        self.grid = Grid(self.draw_style, self.GRID_SIZE_X, self.GRID_SIZE_Y)
+        self.on_reset()
+        if self.COMPACT_THRESHOLD is not None:
+            self.replaytracker.enable_compaction(self.draw_style, self.COMPACT_THRESHOLD, self.COMPACT_PRESERVE_FRAMES)
+        if self.journal is not None:
+            # The journal starts again from the new canvas, so it never holds more than the current one,
+            # and carries on through the new replay tracker.
+            self.journal.reset(self.draw_style, self.GRID_SIZE_X, self.GRID_SIZE_Y, fresh=True)
+            self.replaytracker.journal = self.journal
+            self.undotracker.on_evict = self.journal.forget
+
+    def setup(self) -> None:
+        """Set up the session, recovering the journaled one if there is a journal."""
+        self.reset()
+        if self.JOURNAL_PATH is not None:
+            self.recover_journal(Journal(self.JOURNAL_PATH))
+
+    def recover_journal(self, journal: Journal) -> None:
+        """Replays the session left in the journal, then keeps journaling to it."""
+        recovered = False
+        for record in journal.recover():
+            if record.kind == RESET:
+                self.draw_style = record.draw_style
+                self.GRID_SIZE_X, self.GRID_SIZE_Y = record.width, record.height
+                self.reset()
+                recovered = True
+            else:
+                self.on_recover(record)
+        journal.start()
+        self.journal = journal
+        self.replaytracker.journal = journal
+        # Actions evicted while recovering were already forgotten by the journal, as the FORGET records read.
+        self.undotracker.on_evict = journal.forget
+        if not recovered:
+            journal.reset(self.draw_style, self.GRID_SIZE_X, self.GRID_SIZE_Y)
+
+    def close_journal(self) -> None:
+        """Writes out and closes the journal, if there is one."""
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+
+    def change_draw_mode(self) -> None:
+        """Changes the draw mode of the session, and resets it."""
+        if self.draw_style == Grid.DRAW_STYLE_SET:
+            self.draw_style = Grid.DRAW_STYLE_ADD
+        elif self.draw_style == Grid.DRAW_STYLE_ADD:
+            self.draw_style = Grid.DRAW_STYLE_SEQUENCE
+        elif self.draw_style == Grid.DRAW_STYLE_SEQUENCE:
+            self.draw_style = Grid.DRAW_STYLE_SET
+        self.reset()
+
+    # STUDENT PART
+
+# Explanation coding concept:
+# Initialise self.undotracker instance with the class UndoTracker() for undo and redo used.
+# Initialise self.replaytracker instance with the class ReplayTracker() for replay used.
+# Initialise self.timeline instance with the class HistoryTimeline() for scrubbing through the history.
+# The timeline needs the size of the grid, so it is only created once there is one.
+
+# Time complexity analysis:
+# Time complexity: O(1)(Assignment) (Linear time)
+# Best case = Worst case
+    def on_init(self):
+        """Initialisation that occurs after the system initialisation."""
+        self.undotracker = UndoTracker()
+        self.replaytracker = ReplayTracker()
+        self.timeline = None
+        if self.grid is not None:
+            self.timeline = HistoryTimeline(self.grid.draw_style, len(self.grid.grid), len(self.grid.grid[0]))
+
+
+# Explanation coding concept:
+# Reset all the instance in self.on_init()
+
+# Time complexity analysis:
+# Time complexity: O(1)(on_init) (Linear time)
+# Best case = Worst case
+    def on_reset(self):
+        """Called when a window reset is requested."""
+        self.on_init()
+
+
+# Explanation coding concept:
+# Redo the recorded action in the same way as when it was first made, so the undo tracker,
+# replay and timeline all end up as they were.
+# A paint is applied and added to the undotracker, a special is only applied.
+# Undo and redo go through on_undo and on_redo, which take the same action from the undotracker.
+# A paint recorded as an undo was undone outside the undotracker, so it is only applied.
+
+# Time complexity analysis:
+# The same as on_paint, on_special, on_undo or on_redo for the recorded action.
+    def on_recover(self, record):
+        """Called for each action read back from the journal when recovering a session."""
+        action = record.action
+        if record.kind == UNDO:
+            self.on_undo()
+        elif record.kind in (PAINT, SPECIAL) and record.is_undo:
+            action.undo_apply(self.grid)
+            self.replaytracker.add_action(action, True)
+            self.timeline.add_action(action, True)
+        elif record.kind in (PAINT, SPECIAL):
+            action.redo_apply(self.grid)
+            if record.kind == PAINT:
+                self.undotracker.add_action(action)
+            self.replaytracker.add_action(action, False)
+            self.timeline.add_action(action, False)
+        else:
+            self.on_redo()
+
+
+# Time complexity analysis:
+# Let the size of self.grid be n
+# Let the size of self.grid[0] be m
+# Worst case:3(O(1)) + O(n) * O(m) * O(1) + O(Comp==) * 4(O(1)) + O(1) * 2(O(1)) = O(n*m+Comp==)
+# Best case: 3(O(1))(First three assignment) + O(n)(1st for loop) * O(m)(2nd for loop) * O(1)(distance assignment) = O(n*m)
+    def on_paint(self, layer: Layer, px, py):
+        """
+        Called when a grid square is clicked on, which should trigger painting in the vicinity.
+        Vicinity squares outside of the range [0, GRID_SIZE_X) or [0, GRID_SIZE_Y) can be safely ignored.
+
+        layer: The layer being applied.
+        px: x position of the brush.
+        py: y position of the brush.
+        """
+# Explanation coding concept:
+# Initialise the paintaction instance with class PaintAction, which stores its steps packed.
+# Initialise the change with boolean False.
+        paintaction = PaintAction([], False)
+        change = False
+
+# Explanation coding concept:
+# The two for loop is to loop through the whole grid squares.
+# The distance variable is to calculate the distance between every grid squares and the coordinate of brush on paint.
+# If the distance is smaller than the grid_brush_size, it means that the area where should be painted.
+# Thus, calling the add function to paint the layer to the grid square (self.grid.grid[i][j])
+# After painting, I add the step to the paintaction instance with the affected grid square and layer.
+# After done these things, change turn to True.
+        for i in range(len(self.grid.grid)):
+            for j in range(len(self.grid.grid[0])):
+                distance=abs(i-px)+abs(j-py)
+                if distance <= self.grid.brush_size:
+                    if self.grid.grid[i][j].add(layer):
+                        paintaction.add(i, j, layer)
+                        change = True
+
+# Explanation coding concept:
+# If change is True, add the paintaction instance to undotracker by using add_action function.
+# Adding the paintaction and False (is_undo boolean) to replaytracker and timeline by using add_action function.
+        if change:
+            self.undotracker.add_action(paintaction)
+            self.replaytracker.add_action(paintaction,False)
+            self.timeline.add_action(paintaction,False)
+
+
+# Explanation coding concept:
+# Calling the undo function by self.undotracker instance and assign it to action variable
+# If the action is not None, adding the action to replaytracker and timeline by using add_action function with two parameters
+# The parameter boolean is is_undo, thus the boolean is True.
+
+# Time complexity analysis:
+# Worst case: O(1)(undo function) + O(1)(if statement)*O(1)(add_action) = O(1) (Linear time)
+# Best case: O(1)(undo function) (action is None)
+    def on_undo(self):
+        """Called when an undo is requested."""
+        action = self.undotracker.undo(self.grid)
+        if action != None:
+            self.replaytracker.add_action(action,True)
+            self.timeline.add_action(action,True)
+
+
+# Explanation coding concept:
+# Calling the redo function by self.undotracker instance and assign it to action variable
+# If the action is not None, adding the action to replaytracker and timeline by using add_action function with two parameters
+# The parameter boolean is is_undo, thus the boolean is False.
+
+# Time complexity analysis:
+# Worst case: O(1)(redo function) + O(1)(if statement)*O(1)(add_action) = O(1) (Linear time)
+# Best case: O(1)(redo function) (action is None)
+    def on_redo(self):
+        """Called when a redo is requested."""
+        action = self.undotracker.redo(self.grid)
+        if action != None:
+            self.replaytracker.add_action(action,False)
+            self.timeline.add_action(action,False)
+
+
+# Explanation coding concept:
+# Create a instance is PaintAction class with two parameters action and is_special.
+# Due to the special does not have list item so put a empty list with it and the boolean is True.
+# Calling the special function of Grid class.
+# Adding the paintaction and the is_undo boolean = False into replaytracker and timeline by using add_action function.
+# The journal is told to forget it, since only the actions in the undotracker can be undone or redone again.
+
+# Time complexity analysis:
+# Let the size of self.grid be n
+# Let the size of self.grid[0] be m
+# Let the size of myQueue be a
+# Let the size of mySortedlist be c
+# Let the size of lexicographic_list be d
+# If draw_style == "SET",
+# Worst case: O(1)(assignment) + O(n*m)(special function) + O(1)(add_function) = O(n*m)
+# Best case: O(1)(assignment) + O(n*m)(special function) + O(1)(add_function) = O(n*m)
+# If draw_style == "ADD"",
+# Worst case: O(1)(assignment) + O(n*m*a)(special function) + O(1)(add_function) = O(n*m*a)
+# Best case: O(1)(assignment) + O(n*m*a)(special function) + O(1)(add_function) = O(n*m*a)
+# If draw_style == "SEQUENCE",
+# Worst case: O(1)(assignment) + O(n*m*(c^2+d^2))(special function) + O(1)(add_function) = O(n*m*(c^2+d^2))
+# Best case: O(1)(assignment) + O(n*m)(special function) + O(1)(add_function) = O(n*m)
+    def on_special(self):
+        """Called when the special action is requested."""
+        paintaction = PaintAction([],True)
+        self.grid.special()                 #Call Grid.special
+        self.replaytracker.add_action(paintaction, False)
+        self.timeline.add_action(paintaction, False)
+        if self.journal is not None:
+            # The special is not in the undotracker, so it is never undone and the journal can forget it.
+            self.journal.forget(paintaction)
+
+
+# Explanation coding concept:
+# The replay is drawn on a new blank grid, so the replay is rewound to play every action from the first one.
+# Calling the restart_replay and start_replay functions by self.replaytracker instance.
+
+# Time complexity analysis:
+# Time complexity: O(1)(restart_replay and start_replay) (Linear time)
+# Best case = Worst case
+    def on_replay_start(self):
+        """Called when the replay starting is requested."""
+        self.replaytracker.restart_replay()
+        self.replaytracker.start_replay()
+
+
+# Explanation coding concept:
+# Calling the play_next_action function by self.replaytracker instance with parameter self.grid
+
+# Time complexity analysis:
+# Time complexity: O(1)(play_next_action) (Linear time)
+# Best case = Worst case
+    def on_replay_next_step(self) -> bool:
+        """
+        Called when the next step of the replay is requested.
+        Returns whether the replay is finished.
+        """
+        return self.replaytracker.play_next_action(self.grid)
+
+
+
+# Explanation coding concept:
+# Calling the increase_brush_size function with self.grid
+
+# Time complexity analysis:
+# Time complexity: O(1)(increase_brush_size function) (Linear time)
+# Best case = Worst case
+    def on_increase_brush_size(self):
+        """Called when an increase to the brush size is requested."""
+        self.grid.increase_brush_size()
+
+
+# Explanation coding concept:
+# Calling the decrease_brush_size function with self.grid
+
+# Time complexity analysis:
+# Time complexity: O(1)(decrease_brush_size function) (Linear time)
+# Best case = Worst case
+    def on_decrease_brush_size(self):
+        """Called when a decrease to the brush size is requested."""
+        self.grid.decrease_brush_size()
@@ -0,0 +1,214 @@
+"""
+Viewing a grid in a terminal, for canvases on machines where no window can be opened.
+
+Each character shows two squares of the grid, one above the other, as an upper half
+block coloured with 24-bit ANSI colours: the top square in the foreground and the bottom
+one in the background. After the first frame, only the characters whose colours changed
+are written, each after a cursor move to it, so a still canvas costs nothing to show and
+an animated one only its animated squares. The colours come from render.GroupedRenderer.
+
+Shows a session journal (see journal.py) or a saved grid (see Grid.save):
+
+    python terminal_view.py session.journal [--follow] [--replay] [--speed 4] [--fps 20] [--animate]
+
+--follow keeps reading the journal as the session writes to it, and shows each action as
+it arrives. --replay plays the session from an empty canvas, --speed actions per frame.
+--animate keeps redrawing animated layers once everything is shown. Ctrl-C stops.
+"""
+
+import argparse
+import shutil
+import sys
+import time
+
+from grid import Grid
+from journal import Journal, RESET
+from layer_util import register_plugin
+from render import BG, GroupedRenderer
+from replay import ReplayTracker
+from thumbnails import session_kind
+
+ESC = "\x1b["
+HALF_BLOCK = "▀"
+
+
+class TerminalView:
+    """
+    Draws a grid as half-block characters, the top row of squares at the top of the screen.
+
+    Usage:  view = TerminalView(grid)
+            out.write(view.draw(timestamp))   # every frame
+            out.write(view.close())
+
+    Only the first columns x rows characters of the grid are shown, from the top left.
+    The grid can be changed between frames, through actions or its squares directly.
+    """
+
+    def __init__(self, grid: Grid, columns: int | None = None, rows: int | None = None,
+                 background: tuple = BG) -> None:
+        self.grid = grid
+        self.renderer = GroupedRenderer(grid, background)
+        self.background = bytes(background)
+        self.x_size, self.y_size = len(grid.grid), len(grid.grid[0])
+        self.columns = min(self.x_size, columns or self.x_size)
+        self.rows = min((self.y_size + 1) // 2, rows or self.y_size)
+        # The frame last drawn, None before the first one.
+        self.shown = None
+
+    def draw(self, timestamp: float = 0) -> str:
+        """
+        Renders the grid at timestamp, and returns the escape sequences which bring
+        the screen from the previous frame to this one. The first frame clears the screen.
+        """
+        frame = bytes(self.renderer.render(timestamp))
+        shown = self.shown
+        stride = 3 * self.x_size
+        blank = self.background * self.x_size
+        out = []
+        if shown is None:
+            out.append(f"{ESC}?25l{ESC}2J")
+        cursor = None
+        fg = bg = None
+        for row in range(self.rows):
+            top_start = 2 * row * stride
+            top = frame[top_start:top_start + stride]
+            # With an odd number of squares, the bottom half of the last row shows the background.
+            bottom = frame[top_start + stride:top_start + 2 * stride] or blank
+            if shown is not None:
+                old_top = shown[top_start:top_start + stride]
+                old_bottom = shown[top_start + stride:top_start + 2 * stride] or blank
+                if top == old_top and bottom == old_bottom:
+                    continue
+            for column in range(self.columns):
+                i = 3 * column
+                upper, lower = top[i:i + 3], bottom[i:i + 3]
+                if shown is not None and upper == old_top[i:i + 3] and lower == old_bottom[i:i + 3]:
+                    continue
+                if cursor != (row, column):
+                    out.append(f"{ESC}{row + 1};{column + 1}H")
+                if lower != bg:
+                    out.append(f"{ESC}48;2;{lower[0]};{lower[1]};{lower[2]}m")
+                    bg = lower
+                if upper == lower:
+                    out.append(" ")
+                else:
+                    if upper != fg:
+                        out.append(f"{ESC}38;2;{upper[0]};{upper[1]};{upper[2]}m")
+                        fg = upper
+                    out.append(HALF_BLOCK)
+                cursor = (row, column + 1)
+        if fg is not None or bg is not None:
+            out.append(f"{ESC}0m")
+        self.shown = frame
+        return "".join(out)
+
+    def status(self, text: str) -> str:
+        """ Escape sequences writing a line of text under the grid. """
+        return f"{ESC}{self.rows + 1};1H{ESC}0m{ESC}K{text}"
+
+    def close(self) -> str:
+        """ Escape sequences leaving the terminal as it was, with the cursor under the grid. """
+        return f"{ESC}0m{ESC}{self.rows + 2};1H{ESC}?25h"
+
+
+class _Session:
+    """ The grid being shown, and the replay of the actions read for it. """
+
+    def __init__(self, draw_style: str, width: int, height: int, columns: int, rows: int) -> None:
+        self.grid = Grid(draw_style, width, height)
+        self.tracker = ReplayTracker()
+        self.tracker.start_replay()
+        self.view = TerminalView(self.grid, columns, rows)
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    p.add_argument("session", help="session journal or saved grid")
+    p.add_argument("--follow", action="store_true", help="keep showing the actions written to the journal")
+    p.add_argument("--replay", action="store_true", help="play the session from an empty canvas")
+    p.add_argument("--speed", type=int, default=1, help="actions played per frame with --replay (default: %(default)s)")
+    p.add_argument("--fps", type=float, default=20, help="frames per second (default: %(default)s)")
+    p.add_argument("--animate", action="store_true", help="keep redrawing animated layers")
+    p.add_argument("--frames", type=int, help="stop after this many frames")
+    p.add_argument("--plugin", action="append", default=[], help="layer plugin module to register, in order")
+    args = p.parse_args(argv)
+    if args.speed <= 0 or args.fps <= 0:
+        p.error("speed and fps should be positive")
+    for plugin in args.plugin:
+        register_plugin(plugin)
+
+    size = shutil.get_terminal_size()
+    # Two lines are left under the grid, for the status and the prompt after closing.
+    columns, rows = size.columns, max(1, size.lines - 2)
+    kind = session_kind(args.session)
+    if kind is None and not args.follow:
+        p.error(f"{args.session} is not a session journal or saved grid")
+    if kind == "grid":
+        grid = Grid.load(args.session)
+        session = None
+        view = TerminalView(grid, columns, rows)
+        records = iter(())
+    else:
+        session = view = None
+        records = Journal(args.session).follow() if args.follow else Journal(args.session).recover()
+
+    out = sys.stdout
+    period = 1 / args.fps
+    start = time.monotonic()
+    frames = 0
+    written = 0
+    status = None
+    try:
+        while args.frames is None or frames < args.frames:
+            frame_start = time.monotonic()
+            # Read what the journal holds so far.
+            for record in records:
+                if record is None:
+                    break
+                if record.kind == RESET:
+                    if session is not None:
+                        out.write(session.view.close())
+                    session = _Session(record.draw_style, record.width, record.height, columns, rows)
+                    status = None
+                elif session is not None:
+                    session.tracker.add_action(record.action, record.is_undo)
+            if session is not None:
+                view = session.view
+                if args.replay:
+                    finished = session.tracker.play_actions(session.grid, args.speed)
+                else:
+                    session.tracker.play_to_end(session.grid)
+                    finished = True
+            else:
+                finished = view is not None
+            if view is None:
+                line = f"waiting for {args.session}..."
+                text = "" if line == status else line
+                status = line
+            else:
+                text = view.draw(frame_start - start)
+                written += len(text.encode())
+                played = "" if session is None else f"  {session.tracker.cursor.position}/{len(session.tracker.log)} actions"
+                line = f"{view.grid.draw_style} {view.x_size}x{view.y_size}{played}  {written / 1024:.1f} KiB drawn"
+                # The status is only written again when it changes, so a still canvas sends nothing.
+                if line != status:
+                    text += view.status(line)
+                    status = line
+            if text:
+                out.write(text)
+                out.flush()
+            frames += 1
+            if finished and not args.follow and not args.animate:
+                break
+            time.sleep(max(0.0, period - (time.monotonic() - frame_start)))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if view is not None:
+            out.write(view.close() + "\n")
+            out.flush()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,50 @@
+import unittest
+from ed_utils.decorators import number
+
+from layer_store import AdditiveLayerStore, SequenceLayerStore, SetLayerStore
+from layer_util import get_layers, Layer
+
+class TestInPlace(unittest.TestCase):
+
+    @number("8.1")
+    def test_layers_match(self):
+        for layer in get_layers():
+            if layer is None:
+                break
+            for color in [(255, 255, 255), (0, 0, 0), (20, 150, 230)]:
+                for timestamp, x, y in [(0, 0, 0), (7, 3, 9), (12.5, 31, 2)]:
+                    rgb = bytearray(color)
+                    layer.apply_into(rgb, timestamp, x, y)
+                    self.assertEqual(tuple(rgb), tuple(layer.apply(color, timestamp, x, y)), layer.name)
+
+    @number("8.2")
+    def test_fallback(self):
+        def swap(color, timestamp, x, y):
+            return (color[2], color[1], color[0])
+        layer = Layer(-1, swap)
+        rgb = bytearray((1, 2, 3))
+        layer.apply_into(rgb, 0, 0, 0)
+        self.assertEqual(tuple(rgb), (3, 2, 1))
+        # Float or out of range results are converted and clamped, as they would not fit in the buffer.
+        def brighten(color, timestamp, x, y):
+            return (color[0] * 1.5, color[1] - 300, color[2] + 0.75)
+        layer = Layer(-1, brighten)
+        rgb = bytearray((200, 2, 3))
+        layer.apply_into(rgb, 0, 0, 0)
+        self.assertEqual(tuple(rgb), (255, 0, 3))
+
+    @number("8.3")
+    def test_stores_match(self):
+        layers = [layer for layer in get_layers() if layer is not None]
+        for store_type in [SetLayerStore, AdditiveLayerStore, SequenceLayerStore]:
+            s = store_type()
+            for i, layer in enumerate(layers * 2):
+                s.add(layer)
+                if i % 3 == 2:
+                    s.special()
+                if i % 4 == 3:
+                    s.erase(layer)
+                for timestamp, x, y in [(0, 0, 0), (7, 3, 9)]:
+                    rgb = bytearray((100, 120, 140))
+                    s.get_color_into(rgb, timestamp, x, y)
+                    self.assertEqual(tuple(rgb), tuple(s.get_color((100, 120, 140), timestamp, x, y)))
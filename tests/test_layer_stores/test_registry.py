@@ -0,0 +1,69 @@
+import sys
+import unittest
+from ed_utils.decorators import number
+
+import layer_util
+from layer_store import SequenceLayerStore
+from layer_util import get_layer, get_layer_by_name, get_layers, layer_list, register, register_plugin
+from layers import black, red
+
+class TestRegistry(unittest.TestCase):
+
+    def setUp(self):
+        # The plugins registered here are undone after each test, so other tests see the built-in layers only.
+        get_layers()
+        self.saved = (
+            layer_util.LAYERS, tuple(layer_util.LAYERS), layer_util.cur_layer_index, dict(layer_util.LAYERS_BY_NAME),
+            list(layer_util.PLUGINS), layer_util._loaded, layer_util._layer_list,
+        )
+        # The palette is imported again by each test, so that its layers are registered again.
+        self.palette = sys.modules.pop("palette", None)
+
+    def tearDown(self):
+        layers, contents, cur_layer_index, by_name, plugins, loaded, cached = self.saved
+        for i, layer in enumerate(contents):
+            layers[i] = layer
+        layer_util.LAYERS = layers
+        layer_util.cur_layer_index = cur_layer_index
+        layer_util.LAYERS_BY_NAME.clear()
+        layer_util.LAYERS_BY_NAME.update(by_name)
+        layer_util.PLUGINS[:] = plugins
+        layer_util._loaded = loaded
+        layer_util._layer_list = cached
+        sys.modules.pop("palette", None)
+        if self.palette is not None:
+            sys.modules["palette"] = self.palette
+
+    @number("14.1")
+    def test_plugin_layers(self):
+        register_plugin("palette")
+        layers = layer_list()
+        # The palette registers past the 20 slots the registry starts with, after the built-in layers.
+        self.assertGreater(len(layers), 216)
+        self.assertIs(get_layer_by_name("flat_ff0000"), layers[get_layer_by_name("flat_ff0000").index])
+        self.assertIs(get_layer(red.index), red)
+        self.assertIs(layer_list(), layers)
+        self.assertEqual(tuple(layer for layer in get_layers() if layer is not None), layers)
+
+        rgb = bytearray(3)
+        get_layer_by_name("flat_3366cc").apply_into(rgb, 0, 0, 0)
+        self.assertEqual(tuple(rgb), (0x33, 0x66, 0xCC))
+        with self.assertRaises(KeyError):
+            get_layer_by_name("flat_123456")
+        with self.assertRaises(ValueError):
+            @register
+            def black(color, timestamp, x, y):
+                return (0, 0, 0)
+
+    @number("14.2")
+    def test_sequence_many_layers(self):
+        register_plugin("palette")
+        layers = layer_list()
+        store = SequenceLayerStore()
+        for layer in reversed(layers):
+            self.assertTrue(store.add(layer))
+        self.assertFalse(store.add(black))
+        for layer in layers[::2]:
+            self.assertTrue(store.erase(layer))
+            self.assertFalse(store.erase(layer))
+        self.assertEqual(store.get_state(), layers[1::2])
@@ -0,0 +1,64 @@
+import unittest
+from ed_utils.decorators import number
+
+from action import PaintAction, PaintStep
+from layers import green, red, blue
+from grid import Grid
+
+class TestAction(unittest.TestCase):
+
+    @number("7.1")
+    def test_steps_round_trip(self):
+        steps = [PaintStep((4, 4), green), PaintStep((300, 5), green), PaintStep((5, 4), green)]
+        action = PaintAction(steps[:])
+        self.assertEqual(action.steps, steps)
+        self.assertEqual(len(action), 3)
+        self.assertIsNone(action.layer_ids, "A single layer action should not store layer ids")
+
+        mixed = steps + [PaintStep((1, 2), red), PaintStep((2, 1), green), PaintStep((0, 0), blue)]
+        action = PaintAction(mixed[:])
+        self.assertEqual(action.steps, mixed)
+        self.assertEqual(action.layers, [green, red, blue])
+        self.assertEqual(action, PaintAction(mixed[:]))
+
+    @number("7.2")
+    def test_apply_matches_steps(self):
+        for style in Grid.DRAW_STYLE_OPTIONS:
+            grid = Grid(style, 10, 10)
+            control_grid = Grid(style, 10, 10)
+            steps = [PaintStep((4, 4), green), PaintStep((4, 5), red), PaintStep((4, 4), blue), PaintStep((9, 9), red)]
+            action = PaintAction(steps[:])
+            action.redo_apply(grid)
+            for step in steps:
+                step.redo_apply(control_grid)
+            self.assertGridEqual(grid, control_grid)
+            action.undo_apply(grid)
+            for step in steps:
+                step.undo_apply(control_grid)
+            self.assertGridEqual(grid, control_grid)
+
+    @number("7.3")
+    def test_steps_read_only_and_bounds(self):
+        action = PaintAction([PaintStep((4, 4), green)])
+        with self.assertRaises(TypeError):
+            action.steps.append(PaintStep((5, 5), red))
+        with self.assertRaises(TypeError):
+            action.steps[0] = PaintStep((5, 5), red)
+        self.assertEqual(len(action), 1)
+
+        action.add(65535, 0, red)
+        for x, y in [(65536, 0), (0, 65536), (-1, 3), (3, -1)]:
+            with self.assertRaises(ValueError):
+                action.add(x, y, red)
+        self.assertEqual(action.steps, [PaintStep((4, 4), green), PaintStep((65535, 0), red)])
+
+    def assertGridEqual(self, grid1: Grid, grid2: Grid):
+        for x in range(len(grid1.grid)):
+            for y in range(len(grid1[x])):
+                sq1 = grid1[x][y]
+                sq2 = grid2[x][y]
+                self.assertEqual(
+                    sq1.get_color((0, 0, 0), 0, x, y),
+                    sq2.get_color((0, 0, 0), 0, x, y),
+                    "Grid not the same after apply has been made."
+                )
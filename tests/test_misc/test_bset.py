@@ -0,0 +1,39 @@
+import random
+import unittest
+from ed_utils.decorators import number
+
+from data_structures.bset import BSet
+
+class TestBSet(unittest.TestCase):
+
+    @number("17.1")
+    def test_iteration_rank_select(self):
+        rng = random.Random(5)
+        items = rng.sample(range(1, 2000), 300)
+        s = BSet.from_iterable(items + items[:10])
+        self.assertEqual(len(s), 300)
+        self.assertEqual(list(s), sorted(items))
+        self.assertEqual(str(BSet.from_iterable([9, 1, 4])), "{1, 4, 9}")
+        for k, item in enumerate(sorted(items)):
+            self.assertEqual(s.rank(item), k)
+            self.assertEqual(s.select(k), item)
+        self.assertEqual(s.rank(2000), 300)
+        with self.assertRaises(IndexError):
+            s.select(300)
+        with self.assertRaises(TypeError):
+            BSet.from_iterable([3, 0])
+        self.assertTrue(BSet.from_iterable([]).is_empty())
+
+    @number("17.2")
+    def test_in_place(self):
+        s = BSet.from_iterable([1, 2, 3, 70])
+        t = BSet.from_iterable([3, 4, 70])
+        alias = s
+        s |= t
+        self.assertIs(s, alias)
+        self.assertEqual(list(s), [1, 2, 3, 4, 70])
+        s -= BSet.from_iterable([2, 4])
+        self.assertEqual(list(s), [1, 3, 70])
+        s &= t
+        self.assertEqual(list(s), [3, 70])
+        self.assertEqual(list(t), [3, 4, 70])
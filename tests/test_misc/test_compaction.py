@@ -0,0 +1,125 @@
+import os
+import random
+import tempfile
+import unittest
+from ed_utils.decorators import number
+
+from action import PaintAction, PaintStep
+from compaction import compact, compact_journal
+from layers import blue, green, red, invert, lighten
+from replay import ReplayTracker
+from grid import Grid
+from session import DrawingSession
+
+class TestCompaction(unittest.TestCase):
+
+    def random_log(self, seed: int, length: int):
+        """ Paints, undo / redo ping-pong of earlier paints, and specials, like a session records them. """
+        rng = random.Random(seed)
+        entries = []
+        paints = []
+        for _ in range(length):
+            roll = rng.random()
+            if roll < 0.1:
+                entries.append((PaintAction([], is_special=True), False))
+            elif roll < 0.35 and paints:
+                action = rng.choice(paints)
+                entries.append((action, True))
+                entries.append((action, False))
+            else:
+                layer = rng.choice([red, green, blue, invert, lighten])
+                action = PaintAction([PaintStep((rng.randrange(6), rng.randrange(5)), layer) for _ in range(rng.randrange(4))])
+                paints.append(action)
+                entries.append((action, False))
+        return entries
+
+    def play(self, entries, draw_style):
+        grid = Grid(draw_style, 6, 5)
+        frames = []
+        for action, is_undo in entries:
+            if is_undo:
+                action.undo_apply(grid)
+            else:
+                action.redo_apply(grid)
+            frames.append(self.states(grid))
+        return self.states(grid), frames
+
+    def states(self, grid):
+        return [grid[x][y].get_state() for x in range(6) for y in range(5)]
+
+    @number("13.1")
+    def test_same_final_grid(self):
+        for style in Grid.DRAW_STYLE_OPTIONS:
+            for seed in range(5):
+                entries = self.random_log(seed, 60)
+                compacted = compact(entries, style)
+                self.assertEqual(self.play(compacted, style)[0], self.play(entries, style)[0])
+                if style != Grid.DRAW_STYLE_ADD:
+                    self.assertLess(sum(len(action) for action, _ in compacted), sum(len(action) for action, _ in entries))
+
+        # Pairs of specials cancel out in SET mode, but only when next to each other in ADD mode.
+        special = PaintAction([], is_special=True)
+        paint = PaintAction([PaintStep((1, 1), red)])
+        entries = [(special, False), (paint, False), (special, False), (PaintAction(), False), (special, False)]
+        self.assertEqual(len(compact(entries, Grid.DRAW_STYLE_SET)), 2)
+        self.assertEqual(compact(entries, Grid.DRAW_STYLE_ADD), entries[:2])
+
+    @number("13.2")
+    def test_preserve_frames(self):
+        for style in Grid.DRAW_STYLE_OPTIONS:
+            entries = self.random_log(7, 60)
+            _, frames = self.play(entries, style)
+            _, compacted_frames = self.play(compact(entries, style, preserve_frames=10), style)
+            for k in range(9, len(frames), 10):
+                self.assertIn(frames[k], compacted_frames)
+
+    @number("13.4")
+    def test_recover_compacted_journal(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for style in Grid.DRAW_STYLE_OPTIONS:
+                path = os.path.join(directory, f"{style}.journal")
+                session = DrawingSession(style, 6, 5)
+                session.JOURNAL_PATH = path
+                session.setup()
+                # The redo after the special is the same action as the first paint.
+                session.on_paint(red, 1, 1)
+                session.on_special()
+                session.on_undo()
+                session.on_redo()
+                session.on_paint(blue, 4, 2)
+                session.on_paint(green, 4, 2)
+                session.on_undo()
+                session.close_journal()
+
+                compact_journal(path)
+                recovered = DrawingSession()
+                recovered.JOURNAL_PATH = path
+                recovered.setup()
+                recovered.close_journal()
+                self.assertEqual(self.states(recovered.grid), self.states(session.grid), style)
+
+    @number("13.3")
+    def test_background_compaction(self):
+        entries = self.random_log(3, 80)
+        replay = ReplayTracker()
+        replay.enable_compaction(Grid.DRAW_STYLE_SET, threshold=50)
+        for entry in entries[:50]:
+            replay.add_action(*entry)
+        replay.compactor.join()
+        # Part way through a replay, the compacted log is not swapped in.
+        grid = Grid(Grid.DRAW_STYLE_SET, 6, 5)
+        replay.play_next_action(grid)
+        replay.add_action(*entries[50])
+        self.assertEqual(len(replay.log), 51)
+        replay.play_to_end(grid)
+
+        for entry in entries[51:]:
+            replay.add_action(*entry)
+        self.assertLess(len(replay.log), len(entries))
+        replay.play_to_end(grid)
+        self.assertEqual(self.states(grid), self.play(entries, Grid.DRAW_STYLE_SET)[0])
+
+        replay.restart_replay()
+        grid = Grid(Grid.DRAW_STYLE_SET, 6, 5)
+        replay.play_to_end(grid)
+        self.assertEqual(self.states(grid), self.play(entries, Grid.DRAW_STYLE_SET)[0])
@@ -0,0 +1,204 @@
+import os
+import tempfile
+import time
+import unittest
+from ed_utils.decorators import number
+
+from action import PaintAction, PaintStep
+from journal import Journal, PAINT, REDO, RESET, SPECIAL, UNDO
+from layer_util import Layer, get_layers
+from layers import blue, green, red, invert
+from replay import ReplayTracker
+from undo import UndoTracker
+from grid import Grid
+
+class TestJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "test.journal")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    @number("11.1")
+    def test_round_trip(self):
+        paint = PaintAction([PaintStep((3, 4), red), PaintStep((2, 9), red), PaintStep((7, 0), red)])
+        mixed = PaintAction([PaintStep((5, 5), green), PaintStep((5, 6), invert), PaintStep((0, 0), green)])
+        special = PaintAction([], is_special=True)
+        outside = PaintAction([PaintStep((1, 1), blue)])
+
+        journal = Journal(self.path)
+        journal.start()
+        replay = ReplayTracker(journal=journal)
+        journal.reset(Grid.DRAW_STYLE_SEQUENCE, 10, 10)
+        for action, is_undo in [(paint, False), (mixed, False), (special, False),
+                                (mixed, True), (mixed, False), (special, True), (outside, True)]:
+            replay.add_action(action, is_undo)
+        journal.close()
+
+        records = list(Journal(self.path).recover())
+        self.assertEqual([(r.kind, r.is_undo) for r in records], [
+            (RESET, False), (PAINT, False), (PAINT, False), (SPECIAL, False),
+            (UNDO, True), (REDO, False), (UNDO, True), (PAINT, True),
+        ])
+        self.assertEqual((records[0].draw_style, records[0].width, records[0].height),
+                         (Grid.DRAW_STYLE_SEQUENCE, 10, 10))
+        self.assertEqual(records[1].action, paint)
+        self.assertEqual(records[2].action, mixed)
+        self.assertIs(records[4].action, records[2].action)
+        self.assertIs(records[6].action, records[3].action)
+        self.assertEqual(records[7].action, outside)
+
+        # Replaying the recovered records gives the same canvas.
+        grid = Grid(Grid.DRAW_STYLE_SEQUENCE, 10, 10)
+        control_grid = Grid(Grid.DRAW_STYLE_SEQUENCE, 10, 10)
+        replay.restart_replay()
+        replay.play_to_end(control_grid)
+        for record in records[1:]:
+            if record.is_undo:
+                record.action.undo_apply(grid)
+            else:
+                record.action.redo_apply(grid)
+        for x in range(10):
+            for y in range(10):
+                self.assertEqual(grid[x][y].get_color((0, 0, 0), 0, x, y),
+                                 control_grid[x][y].get_color((0, 0, 0), 0, x, y))
+
+    @number("11.2")
+    def test_damaged_tail(self):
+        paint = PaintAction([PaintStep((3, 4), red)])
+        journal = Journal(self.path, fsync_interval=None)
+        journal.start()
+        journal.reset(Grid.DRAW_STYLE_SET, 10, 10)
+        journal.record(paint)
+        journal.record(paint, True)
+        journal.close()
+        size = os.path.getsize(self.path)
+
+        # A torn write at the end is dropped, and the journal carries on after the last good record.
+        with open(self.path, "ab") as f:
+            f.write(b"\x09\x00\x01")
+        journal = Journal(self.path)
+        recovered = list(journal.recover())
+        self.assertEqual(len(recovered), 3)
+        self.assertEqual(journal.valid_end, size)
+        journal.start()
+        journal.record(recovered[1].action, False)
+        journal.close()
+        records = list(Journal(self.path).recover())
+        self.assertEqual([r.kind for r in records], [RESET, PAINT, UNDO, REDO])
+        self.assertIs(records[3].action, records[1].action)
+
+        # A record that fails its checksum ends the journal.
+        with open(self.path, "r+b") as f:
+            f.seek(size - 1)
+            f.write(b"\xff")
+        self.assertEqual([r.kind for r in Journal(self.path).recover()], [RESET, PAINT])
+
+    @number("11.3")
+    def test_follow(self):
+        records = Journal(self.path).follow()
+        # There is no journal yet.
+        self.assertIsNone(next(records))
+        journal = Journal(self.path, fsync_interval=None)
+        journal.start()
+        journal.reset(Grid.DRAW_STYLE_SET, 8, 8)
+        paint = PaintAction([PaintStep((3, 4), red)])
+        journal.record(paint)
+        journal.sync()
+        self.assertEqual(next(records).kind, RESET)
+        self.assertEqual(next(records).kind, PAINT)
+        self.assertIsNone(next(records))
+        # Records written later are picked up, even when half of one is written first.
+        journal.record(paint, True)
+        journal.sync()
+        with open(self.path, "rb") as f:
+            data = f.read()
+        cut = len(data) - 2
+        with open(self.path, "r+b") as f:
+            f.truncate(cut)
+        self.assertIsNone(next(records))
+        with open(self.path, "ab") as f:
+            f.write(data[cut:])
+        record = next(records)
+        self.assertEqual((record.kind, record.is_undo), (UNDO, True))
+        self.assertEqual(list(record.action.cells), list(paint.cells))
+        journal.close()
+
+    @number("11.4")
+    def test_idle_fsync_and_forget(self):
+        journal = Journal(self.path, flush_interval=0.01, fsync_interval=0.05)
+        journal.start()
+        journal.reset(Grid.DRAW_STYLE_SET, 8, 8)
+        started = journal.last_fsync
+        time.sleep(0.3)
+        # The last records are fsynced without waiting for another record.
+        self.assertGreater(journal.last_fsync, started)
+        self.assertFalse(journal.unsynced)
+
+        undo = UndoTracker(memory_budget=1)
+        undo.on_evict = journal.forget
+        actions = [PaintAction([PaintStep((i, i), red)]) for i in range(6)]
+        for action in actions:
+            undo.add_action(action)
+            journal.record(action)
+        # Only the action the undo tracker still holds is remembered.
+        self.assertEqual([known[1] for known in journal.known.values()], [actions[-1]])
+        journal.record(undo.undo(Grid(Grid.DRAW_STYLE_SET, 8, 8)), True)
+        journal.close()
+
+        reader = Journal(self.path)
+        records = list(reader.recover())
+        self.assertEqual([r.kind for r in records], [RESET] + [PAINT] * 6 + [UNDO])
+        self.assertEqual(list(records[-1].action.cells), list(actions[-1].cells))
+        self.assertEqual(len(reader.known), 1)
+
+    @number("11.5")
+    def test_unregistered_layer(self):
+        # A layer registered by a plugin in the session which wrote the journal, but not in the one reading it.
+        def plugin_colour(color, timestamp, x, y):
+            return (1, 2, 3)
+        plugin_layer = Layer(len(get_layers()) + 5, plugin_colour)
+        journal = Journal(self.path)
+        journal.start()
+        journal.reset(Grid.DRAW_STYLE_SET, 10, 10)
+        for layer in [red, plugin_layer, green]:
+            journal.record(PaintAction([PaintStep((1, 1), layer)]))
+        journal.close()
+        size = os.path.getsize(self.path)
+
+        reader = Journal(self.path)
+        with self.assertRaises(ValueError) as raised:
+            list(reader.recover())
+        self.assertIn("not registered", str(raised.exception))
+        # The record has a valid checksum, so it is not a damaged tail: nothing is cut off.
+        with self.assertRaises(ValueError):
+            reader.start()
+        self.assertEqual(os.path.getsize(self.path), size)
+
+    @number("11.6")
+    def test_fresh_reset(self):
+        journal = Journal(self.path)
+        journal.start()
+        journal.reset(Grid.DRAW_STYLE_SET, 10, 10)
+        for layer in [red, green, blue]:
+            journal.record(PaintAction([PaintStep((1, 1), layer)]))
+        journal.sync()
+        follower = Journal(self.path).follow()
+        self.assertEqual([r.kind for r in iter(lambda: next(follower), None)], [RESET, PAINT, PAINT, PAINT])
+
+        # A new canvas replaces the journal with one holding only that canvas, and the follower moves to it.
+        size = os.path.getsize(self.path)
+        journal.reset(Grid.DRAW_STYLE_ADD, 8, 6, fresh=True)
+        journal.record(PaintAction([PaintStep((2, 2), red)]))
+        journal.sync()
+        self.assertLess(os.path.getsize(self.path), size)
+        followed = list(iter(lambda: next(follower), None))
+        self.assertEqual([r.kind for r in followed], [RESET, PAINT])
+        self.assertEqual((followed[0].draw_style, followed[0].width), (Grid.DRAW_STYLE_ADD, 8))
+        journal.close()
+        records = list(Journal(self.path).recover())
+        self.assertEqual([r.kind for r in records], [RESET, PAINT])
+        self.assertEqual(records[1].action, PaintAction([PaintStep((2, 2), red)]))
+        self.assertEqual(os.listdir(self.directory.name), ["test.journal"])
@@ -0,0 +1,177 @@
+import os
+import struct
+import tempfile
+import unittest
+import zlib
+from ed_utils.decorators import number
+
+from action import PaintAction, PaintStep
+from journal import Journal
+from layers import blue, red, invert, lighten, rainbow, sparkle
+from parallel_render import ParallelRenderer
+from render import BG, GroupedRenderer, render_rgb, write_image
+from replay_cli import load_session
+from terminal_view import TerminalView
+from thumbnails import find_sessions, render_all
+from grid import Grid
+
+class TestRender(unittest.TestCase):
+
+    @number("12.1")
+    def test_render(self):
+        grid = Grid(Grid.DRAW_STYLE_ADD, 3, 2)
+        PaintAction([PaintStep((0, 0), red), PaintStep((2, 1), blue), PaintStep((2, 1), invert)]).redo_apply(grid)
+        pixels, width, height = render_rgb(grid, scale=2)
+        self.assertEqual((width, height), (6, 4))
+
+        def pixel(px, py):
+            return tuple(pixels[(py * width + px) * 3:(py * width + px) * 3 + 3])
+        # y grows upwards, so square (0, 0) is at the bottom left.
+        self.assertEqual(pixel(0, 3), (255, 0, 0))
+        self.assertEqual(pixel(1, 2), (255, 0, 0))
+        self.assertEqual(pixel(5, 0), (255, 255, 0))
+        self.assertEqual(pixel(2, 0), (255, 255, 255))
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "out.ppm")
+            write_image(path, pixels, width, height)
+            with open(path, "rb") as f:
+                self.assertEqual(f.read(), b"P6\n6 4\n255\n" + bytes(pixels))
+
+    @number("12.2")
+    def test_load_session(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "session.journal")
+            journal = Journal(path)
+            journal.start()
+            journal.reset(Grid.DRAW_STYLE_SET, 8, 8)
+            journal.record(PaintAction([PaintStep((1, 1), red)]))
+            journal.reset(Grid.DRAW_STYLE_SEQUENCE, 5, 4)
+            action = PaintAction([PaintStep((1, 1), red), PaintStep((4, 3), blue)])
+            journal.record(action)
+            journal.record(action, True)
+            journal.record(action)
+            journal.close()
+
+            tracker, draw_style, width, height, steps = load_session(path)
+            # Only the last session is replayed.
+            self.assertEqual((draw_style, width, height, steps, len(tracker.log)), (Grid.DRAW_STYLE_SEQUENCE, 5, 4, 6, 3))
+            grid = Grid(draw_style, width, height)
+            tracker.play_to_end(grid)
+            self.assertEqual(grid[4][3].get_state(), (blue,))
+
+    @number("12.3")
+    def test_parallel_render(self):
+        grid = Grid(Grid.DRAW_STYLE_SEQUENCE, 20, 40)
+        PaintAction([PaintStep((x, y), [rainbow, sparkle, red][(x + y) % 3]) for x in range(20) for y in range(0, 40, 3)]).redo_apply(grid)
+        with ParallelRenderer(grid, workers=2) as renderer:
+            self.assertEqual(len(renderer.pools), 2)
+            self.assertEqual(bytes(renderer.render(1.5)), render_rgb(grid, 1, 1.5)[0])
+            # Only the changed tiles are sent, the workers keep the other squares.
+            PaintAction([PaintStep((19, 39), blue), PaintStep((0, 0), invert)]).redo_apply(grid)
+            grid[5][5].add(blue)
+            grid.touch(5, 5)
+            self.assertEqual(bytes(renderer.render(2.5)), render_rgb(grid, 1, 2.5)[0])
+
+    @number("12.4")
+    def test_grouped_render(self):
+        for draw_style in Grid.DRAW_STYLE_OPTIONS:
+            grid = Grid(draw_style, 20, 18)
+            renderer = GroupedRenderer(grid)
+            PaintAction([PaintStep((x, y), [red, lighten, rainbow, invert][(x // 5 + y // 6) % 4])
+                         for x in range(20) for y in range(18)]).redo_apply(grid)
+            self.assertEqual(bytes(renderer.render(1.5)), render_rgb(grid, 1, 1.5)[0])
+            # One group per distinct stack, and only the rainbow squares are evaluated every frame.
+            self.assertEqual(len(renderer.groups), 4)
+            self.assertEqual(len(renderer.animated), 1)
+            action = PaintAction([PaintStep((x, 3), sparkle) for x in range(20)] + [PaintStep((19, 17), blue)])
+            action.redo_apply(grid)
+            grid.special()
+            self.assertEqual(bytes(renderer.render(2.5)), render_rgb(grid, 1, 2.5)[0])
+            action.undo_apply(grid)
+            self.assertEqual(bytes(renderer.render(3.5)), render_rgb(grid, 1, 3.5)[0])
+
+    @number("12.5")
+    def test_thumbnails(self):
+        with tempfile.TemporaryDirectory() as directory:
+            sessions = os.path.join(directory, "sessions")
+            os.makedirs(os.path.join(sessions, "old"))
+            journal = Journal(os.path.join(sessions, "old", "a.journal"))
+            journal.start()
+            journal.reset(Grid.DRAW_STYLE_SET, 4, 2)
+            journal.record(PaintAction([PaintStep((0, 0), red)]))
+            journal.close()
+            # Red on the left half, blue on the bottom half, so the sampled image shows four quarters.
+            grid = Grid(Grid.DRAW_STYLE_ADD, 300, 150)
+            for x in range(300):
+                for y in range(150):
+                    if x < 150:
+                        grid[x][y].add(red)
+                    if y < 75:
+                        grid[x][y].add(blue)
+            grid.save(os.path.join(sessions, "b.grid"))
+            with open(os.path.join(sessions, "notes.txt"), "w") as f:
+                f.write("not a session")
+            output = os.path.join(directory, "thumbnails")
+
+            found = find_sessions(sessions, output)
+            self.assertEqual([os.path.relpath(image, output) for _, image in found],
+                             ["b.grid.png", os.path.join("old", "a.journal.png")])
+            result = render_all(found, 16, workers=1)
+            self.assertEqual((len(result["rendered"]), result["failed"]), (2, []))
+            # The 4x2 journal is scaled up 4 times to 16x8, with its red square at the bottom left.
+            pixels, width, height = self.read_png(os.path.join(output, "old", "a.journal.png"))
+            self.assertEqual((width, height), (16, 8))
+            white, red_pixel = bytes(BG), bytes(red.apply(BG, 0, 0, 0))
+            self.assertEqual(pixels[3 * 16 * 4:3 * 16 * 4 + 12], red_pixel * 4)
+            self.assertEqual(pixels[3 * 16 * 3:3 * 16 * 3 + 12], white * 4)
+            self.assertEqual(pixels[3 * 16 * 4 + 12:3 * 16 * 5], white * 12)
+            # The 300x150 grid is sampled down to 16x8.
+            pixels, width, height = self.read_png(os.path.join(output, "b.grid.png"))
+            self.assertEqual((width, height), (16, 8))
+            for px, py, x, y in [(0, 0, 0, 149), (15, 0, 299, 149), (0, 7, 0, 0), (15, 7, 299, 0), (7, 3, 140, 80)]:
+                expected = bytes(grid[x][y].get_color(BG, 0, x, y))
+                self.assertEqual(pixels[3 * (16 * py + px):3 * (16 * py + px) + 3], expected, (px, py))
+            # Images newer than their session are not rendered again, unless forced.
+            self.assertEqual(len(render_all(found, 16, workers=1)["skipped"]), 2)
+            forced = render_all(found, 16, workers=1, force=True)
+            self.assertEqual((len(forced["rendered"]), forced["skipped"]), (2, []))
+            self.assertEqual(self.read_png(os.path.join(output, "b.grid.png"))[0], pixels)
+            # Images rendered at another size are rendered again.
+            resized = render_all(found, 8, workers=1)
+            self.assertEqual((len(resized["rendered"]), resized["skipped"]), (2, []))
+            self.assertEqual(self.read_png(os.path.join(output, "b.grid.png"))[1:], (8, 4))
+            self.assertEqual(len(render_all(found, 8, workers=1)["skipped"]), 2)
+            self.assertEqual(sorted(os.listdir(output)), ["b.grid.png", "old"])
+
+    def read_png(self, path: str) -> tuple[bytes, int, int]:
+        """ Packed RGB pixels, width and height of a PNG written by write_image. """
+        with open(path, "rb") as f:
+            data = f.read()
+        self.assertTrue(data.startswith(b"\x89PNG\r\n\x1a\n"))
+        position, chunks = 8, {}
+        while position < len(data):
+            length, tag = struct.unpack(">I4s", data[position:position + 8])
+            chunks[tag] = chunks.get(tag, b"") + data[position + 8:position + 8 + length]
+            position += 12 + length
+        width, height = struct.unpack(">II", chunks[b"IHDR"][:8])
+        rows = zlib.decompress(chunks[b"IDAT"])
+        # Every row starts with its filter type, 0 (none).
+        stride = 3 * width + 1
+        return b"".join(rows[i * stride + 1:(i + 1) * stride] for i in range(height)), width, height
+
+    @number("12.6")
+    def test_terminal_view(self):
+        grid = Grid(Grid.DRAW_STYLE_SET, 4, 3)
+        view = TerminalView(grid)
+        self.assertEqual((view.columns, view.rows), (4, 2))
+        PaintAction([PaintStep((0, 2), red), PaintStep((0, 1), blue)]).redo_apply(grid)
+        first = view.draw()
+        self.assertTrue(first.startswith("\x1b[?25l\x1b[2J"))
+        # Square (0, 2) is on top of (0, 1) in the first character.
+        self.assertIn("\x1b[1;1H\x1b[48;2;0;0;255m\x1b[38;2;255;0;0m\u2580", first)
+        self.assertEqual(first.count("\u2580") + first.count(" "), 8)
+        # Nothing changed, so nothing is drawn.
+        self.assertEqual(view.draw(), "")
+        PaintAction([PaintStep((3, 0), red)]).redo_apply(grid)
+        self.assertEqual(view.draw(), "\x1b[2;4H\x1b[48;2;255;255;255m\x1b[38;2;255;0;0m\u2580\x1b[0m")
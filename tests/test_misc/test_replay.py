@@ -1,10 +1,18 @@
+import os
+import pickle
+import tempfile
 import unittest
 from ed_utils.decorators import number
 
 from action import PaintAction, PaintStep
 from replay import ReplayTracker
+from action_log import ActionLog
 from layers import blue, green, red, invert
 from grid import Grid
+from layer_util import Layer
+
+def swap(color, timestamp, x, y):
+    return (color[2], color[1], color[0])
 
 class TestReplay(unittest.TestCase):
 
@@ -102,6 +110,106 @@ class TestReplay(unittest.TestCase):
         self.assertGridEqual(grid, control_grid)
         self.assertEqual(replay.play_next_action(grid), True) # Finished.
 
+    @number("5.4")
+    def test_batch_replay(self):
+        actions = [PaintAction([PaintStep((i % 10, i // 10), [red, green, blue][i % 3])]) for i in range(50)]
+        control_grid = Grid(Grid.DRAW_STYLE_ADD, 10, 10)
+        for action in actions:
+            action.redo_apply(control_grid)
+
+        grid = Grid(Grid.DRAW_STYLE_ADD, 10, 10)
+        replay = ReplayTracker()
+        for action in actions:
+            replay.add_action(action)
+        replay.start_replay()
+        self.assertFalse(replay.play_actions(grid, 20))
+        self.assertFalse(replay.play_for(grid, 0))
+        self.assertTrue(replay.play_actions(grid, 29))
+        self.assertTrue(replay.play_actions(grid, 5))
+        self.assertGridEqual(grid, control_grid)
+
+        grid = Grid(Grid.DRAW_STYLE_ADD, 10, 10)
+        for action in actions:
+            replay.add_action(action)
+        replay.start_replay()
+        self.assertTrue(replay.play_for(grid, 60))
+        self.assertGridEqual(grid, control_grid)
+
+        grid = Grid(Grid.DRAW_STYLE_ADD, 10, 10)
+        for action in actions:
+            replay.add_action(action)
+        replay.start_replay()
+        replay.play_to_end(grid)
+        self.assertTrue(replay.play_next_action(grid))
+        self.assertGridEqual(grid, control_grid)
+
+    @number("5.5")
+    def test_restart_and_cursors(self):
+        actions = [PaintAction([PaintStep((i % 10, i // 10), [red, green, blue][i % 3])]) for i in range(30)]
+        control_grid = Grid(Grid.DRAW_STYLE_SET, 10, 10)
+        for action in actions:
+            action.redo_apply(control_grid)
+
+        replay = ReplayTracker()
+        for action in actions:
+            replay.add_action(action)
+        grid = Grid(Grid.DRAW_STYLE_SET, 10, 10)
+        replay.start_replay()
+        replay.play_actions(grid, 10)
+
+        # A second cursor reads the whole log without disturbing the replay.
+        cursor = replay.log.cursor()
+        self.assertEqual([cursor.next()[0] for _ in range(30)], actions)
+        self.assertFalse(cursor.has_next())
+        self.assertEqual(replay.cursor.remaining(), 20)
+
+        replay.play_to_end(grid)
+        self.assertGridEqual(grid, control_grid)
+
+        # Restarting plays every action again.
+        replay.restart_replay()
+        grid = Grid(Grid.DRAW_STYLE_SET, 10, 10)
+        replay.play_to_end(grid)
+        self.assertGridEqual(grid, control_grid)
+
+    @number("5.6")
+    def test_spilled_log(self):
+        actions = [PaintAction([PaintStep((i % 10, i // 10 % 10), [red, green, invert][i % 3])]) for i in range(200)]
+        actions.append(PaintAction([], is_special=True))
+        log = ActionLog(chunk_size=16, max_resident_chunks=2)
+        for i, action in enumerate(actions):
+            log.append(action, i % 7 == 0)
+        self.assertEqual(len(log), len(actions))
+        self.assertLessEqual(sum(isinstance(chunk, list) for chunk in log.chunks), 3)
+
+        grid = Grid(Grid.DRAW_STYLE_ADD, 10, 10)
+        control_grid = Grid(Grid.DRAW_STYLE_ADD, 10, 10)
+        replay = ReplayTracker(log)
+        for i, action in enumerate(actions):
+            if i % 7 == 0:
+                action.undo_apply(control_grid)
+            else:
+                action.redo_apply(control_grid)
+        replay.play_to_end(grid)
+        self.assertGridEqual(grid, control_grid)
+        # Layers come back as the registered layers themselves.
+        self.assertIs(log[1][0].steps[0].affected_layer, green)
+
+        # A layer which is not the registered one with its index is pickled whole.
+        unregistered = pickle.loads(pickle.dumps(Layer(green.index, swap)))
+        self.assertIsNot(unregistered, green)
+        self.assertEqual((unregistered.index, unregistered.name), (green.index, "swap"))
+
+        # Logs spilling to the same directory keep their chunks apart.
+        with tempfile.TemporaryDirectory() as directory:
+            logs = [ActionLog(chunk_size=4, max_resident_chunks=1, spill_dir=directory) for _ in range(2)]
+            for i, action in enumerate(actions[:20]):
+                logs[0].append(action)
+                logs[1].append(actions[-1 - i])
+            self.assertEqual(len(os.listdir(directory)), 2 * 3)
+            self.assertEqual([logs[0][i][0] for i in range(20)], actions[:20])
+            self.assertEqual([logs[1][i][0] for i in range(20)], actions[:-21:-1])
+
     def assertGridEqual(self, grid1: Grid, grid2: Grid):
         for x in range(len(grid1.grid)):
             for y in range(len(grid1[x])):
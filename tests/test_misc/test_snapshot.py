@@ -0,0 +1,165 @@
+import os
+import tempfile
+import unittest
+from ed_utils.decorators import number
+
+from action import PaintAction, PaintStep
+from data_structures.persistent_array import PersistentArray
+from layers import blue, green, red, invert
+from grid import Grid
+from render import GroupedRenderer, render_rgb
+
+class TestSnapshot(unittest.TestCase):
+
+    @number("9.1")
+    def test_persistent_array(self):
+        a = PersistentArray(1000, 0)
+        b = a.set(5, 1).set(999, 2)
+        c = b.set(500, 3)
+        self.assertEqual((a[5], a[999], a[500]), (0, 0, 0))
+        self.assertEqual((b[5], b[999], b[500]), (1, 2, 0))
+        self.assertEqual((c[5], c[999], c[500]), (1, 2, 3))
+        self.assertEqual(list(a.diff(c)), [5, 500, 999])
+        self.assertEqual(list(b.diff(c)), [500])
+        self.assertEqual(list(c.diff(c)), [])
+        self.assertEqual(len(list(c)), 1000)
+        with self.assertRaises(IndexError):
+            a[1000]
+
+    @number("9.2")
+    def test_snapshot_restore(self):
+        for style in Grid.DRAW_STYLE_OPTIONS:
+            grid = Grid(style, 20, 18)
+            empty = grid.snapshot()
+            self.assertIs(grid.snapshot(), empty, "Nothing changed, so the snapshot should be reused")
+
+            PaintAction([PaintStep((1, 1), red), PaintStep((1, 2), green), PaintStep((1, 1), invert)]).redo_apply(grid)
+            first = grid.snapshot()
+            control_first = self.colors(grid)
+
+            PaintAction([PaintStep((19, 17), blue), PaintStep((1, 2), blue)]).redo_apply(grid)
+            grid.special()
+            second = grid.snapshot()
+            control_second = self.colors(grid)
+
+            grid.restore(first)
+            self.assertEqual(self.colors(grid), control_first)
+            grid.restore(empty)
+            self.assertEqual(self.colors(grid), self.colors(Grid(style, 20, 18)))
+            grid.restore(second)
+            self.assertEqual(self.colors(grid), control_second)
+            self.assertEqual(self.colors(second.to_grid()), control_second)
+            self.assertEqual(second.state(19, 17), grid[19][17].get_state())
+
+    @number("9.3")
+    def test_structural_sharing(self):
+        grid = Grid(Grid.DRAW_STYLE_SET, 64, 64)
+        before = grid.snapshot()
+        grid[0][0].add(red)
+        grid.touch(0, 0)
+        after = grid.snapshot()
+        # Only the tile of (0, 0) was copied.
+        self.assertEqual(list(before.tiles.diff(after.tiles)), [0])
+
+    @number("9.4")
+    def test_save_load(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "grid.bin")
+            for style in Grid.DRAW_STYLE_OPTIONS:
+                grid = Grid(style, 20, 18)
+                PaintAction([PaintStep((1, 1), red), PaintStep((1, 2), green), PaintStep((1, 1), invert),
+                             PaintStep((1, 1), blue), PaintStep((19, 17), blue)]).redo_apply(grid)
+                grid.special()
+                PaintAction([PaintStep((5, 3), green)]).redo_apply(grid)
+                control = self.colors(grid)
+                grid.save(path)
+
+                loaded = Grid.load(path)
+                self.assertEqual(loaded.draw_style, style)
+                self.assertEqual((len(loaded.grid), len(loaded[0])), (20, 18))
+                self.assertEqual(loaded[19][17].get_state(), grid[19][17].get_state())
+                # Saving a partly built loaded grid gives the same file.
+                loaded.save(path + "2")
+                with open(path, "rb") as f, open(path + "2", "rb") as g:
+                    self.assertEqual(f.read(), g.read())
+                self.assertEqual(self.colors(loaded), control)
+                # The loaded grid is a normal grid from then on.
+                PaintAction([PaintStep((0, 0), red)]).redo_apply(loaded)
+                self.assertEqual(loaded.snapshot().state(1, 1), grid[1][1].get_state())
+
+            del loaded
+            with open(path, "r+b") as f:
+                f.truncate(40)
+            with self.assertRaises(ValueError):
+                Grid.load(path)
+
+    @number("9.5")
+    def test_save_over_loaded(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "grid.bin")
+            grid = Grid(Grid.DRAW_STYLE_SET, 64, 64)
+            PaintAction([PaintStep((x, y), red) for x in range(64) for y in range(64)]).redo_apply(grid)
+            grid.special()
+            grid.save(path)
+
+            # Saving a loaded grid over its own file, while most of its squares are still read from it.
+            loaded = Grid.load(path)
+            PaintAction([PaintStep((0, y), red) for y in range(64)]).undo_apply(loaded)
+            loaded.save(path)
+            again = Grid.load(path)
+            self.assertEqual(list(again.snapshot().tiles), list(loaded.snapshot().tiles))
+            self.assertEqual(again[5][5].get_state(), (red, True))
+            self.assertEqual(again[0][5].get_state(), (None, True))
+
+            # Once closed, the file is no longer needed.
+            loaded.close()
+            again.close()
+            os.remove(path)
+            self.assertEqual(loaded[63][63].get_state(), (red, True))
+
+            grid.save(path)
+            with open(path, "r+b") as f:
+                f.seek(7)
+                f.write(b"\x09")
+            with self.assertRaises(ValueError):
+                Grid.load(path)
+
+    @number("9.6")
+    def test_direct_changes(self):
+        # Squares changed through the LayerStore methods, without Grid.touch, are still seen.
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "grid.bin")
+            for style in Grid.DRAW_STYLE_OPTIONS:
+                grid = Grid(style, 40, 36)
+                renderer = GroupedRenderer(grid)
+                renderer.render(0)
+                empty = grid.snapshot()
+                grid[33][20].add(red)
+                grid[2][35].add(blue)
+                grid[2][35].special()
+                first = grid.snapshot()
+                self.assertEqual(first.state(33, 20), grid[33][20].get_state())
+                self.assertEqual(first.state(2, 35), grid[2][35].get_state())
+                self.assertEqual(bytes(renderer.render(0)), render_rgb(grid, 1, 0)[0])
+                grid[33][20].erase(red)
+                self.assertEqual(grid.snapshot().state(33, 20), grid[33][20].get_state())
+                self.assertEqual(bytes(renderer.render(0)), render_rgb(grid, 1, 0)[0])
+
+                # Restoring leaves nothing dirty, and the squares of a loaded grid report changes too.
+                grid.restore(first)
+                self.assertIs(grid.snapshot(), first)
+                grid.save(path)
+                loaded = Grid.load(path)
+                loaded.snapshot()
+                loaded[39][0].add(green)
+                self.assertEqual(loaded.snapshot().state(39, 0), loaded[39][0].get_state())
+                loaded.restore(empty)
+                self.assertEqual(self.colors(loaded), self.colors(Grid(style, 40, 36)))
+                loaded.close()
+
+    def colors(self, grid: Grid):
+        return [
+            grid[x][y].get_color((0, 0, 0), 0, x, y)
+            for x in range(len(grid.grid))
+            for y in range(len(grid[x]))
+        ]
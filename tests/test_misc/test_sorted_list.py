@@ -0,0 +1,101 @@
+import random
+import unittest
+from ed_utils.decorators import number
+
+from data_structures.array_sorted_list import ArraySortedList
+from data_structures.sorted_list_adt import ListItem
+from data_structures.tree_sorted_list import TreeSortedList
+from layer_store import SequenceLayerStore
+from layer_util import layer_list
+
+class TestArraySortedList(unittest.TestCase):
+
+    def items(self, sorted_list):
+        return [(sorted_list[i].value, sorted_list[i].key) for i in range(len(sorted_list))]
+
+    @number("16.1")
+    def test_contains_duplicate_keys(self):
+        sorted_list = ArraySortedList(1)
+        for value, key in [("a", 2), ("b", 1), ("c", 2), ("d", 3), ("e", 2)]:
+            sorted_list.add(ListItem(value, key))
+        self.assertEqual([key for _, key in self.items(sorted_list)], [1, 2, 2, 2, 3])
+        for value in "abcde":
+            self.assertIn(ListItem(value, {"b": 1, "d": 3}.get(value, 2)), sorted_list)
+        self.assertNotIn(ListItem("a", 1), sorted_list)
+        self.assertNotIn(ListItem("f", 2), sorted_list)
+        sorted_list.remove(ListItem("c", 2))
+        self.assertNotIn(ListItem("c", 2), sorted_list)
+        self.assertEqual(len(sorted_list), 4)
+        sorted_list.delete_at_index(0)
+        self.assertEqual(self.items(sorted_list)[-1], ("d", 3))
+
+    @number("16.2")
+    def test_bulk(self):
+        rng = random.Random(4)
+        keys = [rng.randrange(100) for _ in range(300)]
+        sorted_list = ArraySortedList(1)
+        for key in keys[:50]:
+            sorted_list.add(ListItem(key, key))
+        # Unsorted input, then input that is already sorted.
+        sorted_list.add_all(ListItem(key, key) for key in keys[50:200])
+        sorted_list.add_all([ListItem(key, key) for key in sorted(keys[200:])])
+        self.assertEqual([key for key, _ in self.items(sorted_list)], sorted(keys))
+
+        # Equal keys keep the items already in the list first.
+        sorted_list = ArraySortedList.from_sorted([ListItem("old", 1), ListItem("old", 2)])
+        sorted_list.add_all([ListItem("new", 2), ListItem("new", 0)])
+        self.assertEqual(self.items(sorted_list), [("new", 0), ("old", 1), ("old", 2), ("new", 2)])
+        with self.assertRaises(ValueError):
+            ArraySortedList.from_sorted([ListItem("a", 2), ListItem("b", 1)])
+
+    @number("16.3")
+    def test_tree_matches_array(self):
+        rng = random.Random(9)
+        tree = TreeSortedList()
+        array = ArraySortedList(1)
+        for step in range(2000):
+            roll = rng.random()
+            if roll < 0.6 or not len(array):
+                item = ListItem(step, rng.randrange(50))
+                tree.add(item)
+                array.add(item)
+            elif roll < 0.8:
+                index = rng.randrange(len(array))
+                item = array.delete_at_index(index)
+                tree.remove(item)
+            else:
+                key = rng.randrange(50)
+                self.assertEqual(tree.rank(key), array._bisect_left(key))
+        self.assertEqual(len(tree), len(array))
+        self.assertEqual(sorted(self.items(tree), key=lambda item: item[1]), self.items(tree))
+        self.assertEqual(sorted(self.items(tree)), sorted(self.items(array)))
+        self.assertEqual([item.value for item in tree], [value for value, _ in self.items(tree)])
+        # An AVL tree of n nodes is at most about 1.44 log2(n) high.
+        self.assertLessEqual(tree.root.height, 1.45 * len(tree).bit_length())
+        with self.assertRaises(IndexError):
+            tree[len(tree)]
+        with self.assertRaises(IndexError):
+            tree[0] = ListItem("late", 99)
+
+        tree = TreeSortedList.from_sorted([ListItem(i, i) for i in range(0, 100, 2)])
+        tree.add_all(ListItem(i, i) for i in range(99, 0, -2))
+        self.assertEqual([tree.select(k).key for k in range(100)], list(range(100)))
+        tree[100] = ListItem(100, 100)
+        self.assertIn(ListItem(100, 100), tree)
+
+    @number("16.4")
+    def test_tree_in_store(self):
+        # The tree can be swapped in for the array list of a store.
+        layers = layer_list()
+        store = SequenceLayerStore()
+        store.mySortedlist = TreeSortedList()
+        store.lexicographic_list = TreeSortedList()
+        control = SequenceLayerStore()
+        for layer in layers[::-1]:
+            self.assertEqual(store.add(layer), control.add(layer))
+        for layer in layers[::3]:
+            self.assertEqual(store.erase(layer), control.erase(layer))
+        for _ in range(3):
+            store.special()
+            control.special()
+            self.assertEqual(store.get_state(), control.get_state())
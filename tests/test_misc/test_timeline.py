@@ -0,0 +1,124 @@
+import random
+import unittest
+from ed_utils.decorators import number
+
+from action import PaintAction, PaintStep
+from grid import Grid
+from layer_util import get_layers
+from timeline import HistoryTimeline
+from undo import UndoTracker
+
+class TestTimeline(unittest.TestCase):
+
+    @number("10.1")
+    def test_seek(self):
+        layers = [layer for layer in get_layers() if layer is not None]
+        for style in Grid.DRAW_STYLE_OPTIONS:
+            rng = random.Random(style)
+            timeline = HistoryTimeline(style, 6, 5, keyframe_interval=7, keyframe_cells=20)
+            grid = Grid(style, 6, 5)
+            undo = UndoTracker()
+            entries = []
+            for _ in range(60):
+                choice = rng.random()
+                if choice < 0.6:
+                    action = PaintAction([
+                        PaintStep((rng.randrange(6), rng.randrange(5)), rng.choice(layers))
+                        for _ in range(rng.randrange(1, 5))
+                    ])
+                    action.redo_apply(grid)
+                    undo.add_action(action)
+                    entries.append((action, False))
+                elif choice < 0.8:
+                    action = undo.undo(grid)
+                    if action is not None:
+                        entries.append((action, True))
+                elif choice < 0.9:
+                    action = undo.redo(grid)
+                    if action is not None:
+                        entries.append((action, False))
+                else:
+                    action = PaintAction([], True)
+                    action.redo_apply(grid)
+                    entries.append((action, False))
+                if entries and (len(timeline) < len(entries)):
+                    timeline.add_action(*entries[-1])
+            # No grid is built until the first seek, which takes the keyframes as it goes.
+            self.assertIsNone(timeline.grid)
+            self.assertGridEqual(timeline.seek(len(entries)), grid)
+            self.assertGreater(len(timeline.keyframes), 2)
+            for k in [0, 13, 7, len(entries), 1, 40, 39, 41, 12]:
+                control = Grid(style, 6, 5)
+                for action, is_undo in entries[:k]:
+                    if is_undo:
+                        action.undo_apply(control)
+                    else:
+                        action.redo_apply(control)
+                self.assertGridEqual(timeline.seek(k), control)
+                self.assertEqual(timeline.position, k)
+
+    @number("10.2")
+    def test_max_entries(self):
+        rng = random.Random(2)
+        layers = [layer for layer in get_layers() if layer is not None]
+        timeline = HistoryTimeline(Grid.DRAW_STYLE_SEQUENCE, 6, 5, keyframe_interval=4, max_entries=10)
+        controls = [Grid(Grid.DRAW_STYLE_SEQUENCE, 6, 5).snapshot()]
+        grid = Grid(Grid.DRAW_STYLE_SEQUENCE, 6, 5)
+        for i in range(57):
+            action = PaintAction([PaintStep((rng.randrange(6), rng.randrange(5)), rng.choice(layers))])
+            action.redo_apply(grid)
+            controls.append(grid.snapshot())
+            timeline.add_action(action)
+            if i == 30:
+                timeline.seek(3)
+            if i == 45:
+                timeline.release()
+        self.assertEqual(len(timeline), 57)
+        # The older actions were dropped, up to a keyframe, leaving at least max_entries.
+        self.assertGreater(timeline.start, 0)
+        self.assertGreaterEqual(len(timeline) - timeline.start, 10)
+        self.assertLess(len(timeline.entries), 20)
+        self.assertEqual(timeline.keyframe_positions[0], timeline.start)
+        self.assertIsNone(timeline.grid)
+        for k in [57, timeline.start, 50, timeline.start + 1, 0]:
+            # Seeking before start shows start.
+            self.assertGridEqual(timeline.seek(k), controls[max(k, timeline.start)].to_grid())
+            self.assertEqual(timeline.position, max(k, timeline.start))
+
+    @number("10.3")
+    def test_keyframes_without_grid(self):
+        rng = random.Random(3)
+        layers = [layer for layer in get_layers() if layer is not None]
+        timeline = HistoryTimeline(Grid.DRAW_STYLE_SEQUENCE, 6, 5, keyframe_interval=8)
+        controls = [Grid(Grid.DRAW_STYLE_SEQUENCE, 6, 5).snapshot()]
+        grid = Grid(Grid.DRAW_STYLE_SEQUENCE, 6, 5)
+        for i in range(200):
+            action = PaintAction([PaintStep((rng.randrange(6), rng.randrange(5)), rng.choice(layers))])
+            action.redo_apply(grid)
+            controls.append(grid.snapshot())
+            timeline.add_action(action)
+            if i == 100:
+                # A grid left behind the latest action does not hold the keyframes back either.
+                timeline.seek(3)
+            if i == 150:
+                timeline.release()
+            # There is always a keyframe within an interval of the latest action.
+            self.assertLess(len(timeline) - timeline.keyframe_positions[-1], 8)
+        self.assertIsNone(timeline.grid)
+        # Nothing is dropped by default.
+        self.assertEqual(timeline.start, 0)
+        self.assertEqual(len(timeline.entries), 200)
+        for k in [200, 0, 37, 199, 120]:
+            self.assertGridEqual(timeline.seek(k), controls[k].to_grid())
+            self.assertEqual(timeline.position, k)
+
+    def assertGridEqual(self, grid1: Grid, grid2: Grid):
+        for x in range(len(grid1.grid)):
+            for y in range(len(grid1[x])):
+                sq1 = grid1[x][y]
+                sq2 = grid2[x][y]
+                self.assertEqual(
+                    sq1.get_color((0, 0, 0), 0, x, y),
+                    sq2.get_color((0, 0, 0), 0, x, y),
+                    "Grid not the same after apply has been made."
+                )
@@ -0,0 +1,73 @@
+import unittest
+from ed_utils.decorators import number
+
+from data_structures.typed_array import Int8ArrayR, Int32ArrayR, RGBArrayR, UInt8ArrayR
+
+class TestTypedArray(unittest.TestCase):
+
+    @number("15.1")
+    def test_ints(self):
+        a = Int32ArrayR(10, fill=7)
+        self.assertEqual(list(a), [7] * 10)
+        a[3] = -2 ** 31
+        a.fill(-1, 5, 8)
+        self.assertEqual(list(a), [7, 7, 7, -2 ** 31, 7, -1, -1, -1, 7, 7])
+        with self.assertRaises(OverflowError):
+            Int8ArrayR(2)[0] = 128
+        with self.assertRaises(OverflowError):
+            UInt8ArrayR(2)[0] = -1
+        with self.assertRaises(IndexError):
+            a.fill(0, 8, 11)
+        with self.assertRaises(ValueError):
+            UInt8ArrayR(0)
+
+        # Copies within the same array may overlap.
+        for i in range(10):
+            a[i] = i
+        a.copy_from(a, 2, 0, 6)
+        self.assertEqual(list(a), [0, 1, 0, 1, 2, 3, 4, 5, 8, 9])
+        b = Int32ArrayR(3)
+        b.copy_from(a, source_start=7)
+        self.assertEqual(list(b), [5, 8, 9])
+        with self.assertRaises(TypeError):
+            b.copy_from(Int8ArrayR(3))
+
+    @number("15.2")
+    def test_shared_memory(self):
+        a = UInt8ArrayR(4)
+        view = a.view()
+        view[1] = 200
+        self.assertEqual(a[1], 200)
+        a[2] = 9
+        self.assertEqual(bytes(view), bytes([0, 200, 9, 0]))
+
+        buffer = bytearray(8)
+        shared = Int32ArrayR.from_buffer(buffer)
+        self.assertEqual(len(shared), 2)
+        shared[1] = 0x01020304
+        self.assertEqual(memoryview(buffer).cast("i")[1], 0x01020304)
+        with self.assertRaises(ValueError):
+            Int32ArrayR.from_buffer(bytearray(6))
+
+    @number("15.3")
+    def test_colours(self):
+        colours = RGBArrayR(4, fill=(255, 255, 255))
+        colours[1] = (1, 2, 3)
+        self.assertEqual(colours[0], (255, 255, 255))
+        self.assertEqual(colours[1], (1, 2, 3))
+        rgb = bytearray(3)
+        colours.get_into(1, rgb)
+        self.assertEqual(rgb, bytearray((1, 2, 3)))
+        colours.fill((0, 0, 255), 2)
+        self.assertEqual(colours.view().shape, (4, 3))
+        self.assertEqual(colours.view()[3, 2], 255)
+        self.assertEqual(bytes(colours.view()), bytes((255, 255, 255, 1, 2, 3, 0, 0, 255, 0, 0, 255)))
+        with self.assertRaises(IndexError):
+            colours[4]
+
+        frame = bytearray(12)
+        shared = RGBArrayR.from_buffer(frame)
+        shared.copy_from(colours, 0, 1, 2)
+        self.assertEqual(bytes(frame[:6]), bytes((1, 2, 3, 0, 0, 255)))
+        shared.view()[3, 0] = 7
+        self.assertEqual(frame[9], 7)
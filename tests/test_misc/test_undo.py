@@ -65,6 +65,46 @@ class TestUndo(unittest.TestCase):
         action = undo.undo(grid)
         self.assertEqual(action, None)
 
+    @number("4.2")
+    def test_unbounded_count(self):
+        # More than a fixed-size history used to hold: the newest action is still undone.
+        grid = Grid(Grid.DRAW_STYLE_SET, 10, 10)
+        undo = UndoTracker()
+        actions = [PaintAction([PaintStep((i % 10, i // 10 % 10), red)]) for i in range(2500)]
+        for action in actions:
+            undo.add_action(action)
+        self.assertEqual(len(undo), 2500)
+        self.assertEqual(undo.evictions, 0)
+        self.assertIs(undo.undo(grid), actions[-1])
+        self.assertIs(undo.redo(grid), actions[-1])
+
+    @number("4.3")
+    def test_memory_budget(self):
+        grid = Grid(Grid.DRAW_STYLE_SET, 10, 10)
+        actions = [PaintAction([PaintStep((i % 10, j), green) for j in range(10)]) for i in range(20)]
+        size = actions[0].nbytes()
+        undo = UndoTracker(memory_budget=5 * size)
+        for action in actions:
+            undo.add_action(action)
+            self.assertLessEqual(undo.memory_used, 5 * size)
+        self.assertEqual(len(undo), 5)
+        self.assertEqual(undo.evictions, 15)
+        self.assertEqual(undo.memory_used, 5 * size)
+        # Only the newest five can be undone, newest first.
+        for action in reversed(actions[-5:]):
+            self.assertIs(undo.undo(grid), action)
+        self.assertIsNone(undo.undo(grid))
+        # Undone actions stay within the budget, and can be redone.
+        self.assertEqual(undo.memory_used, 5 * size)
+        self.assertIs(undo.redo(grid), actions[-5])
+
+        # A single action larger than the budget is still kept.
+        undo = UndoTracker(memory_budget=1)
+        undo.add_action(actions[0])
+        undo.add_action(actions[1])
+        self.assertEqual(len(undo), 1)
+        self.assertIs(undo.undo(grid), actions[1])
+
     def assertGridEqual(self, grid1: Grid, grid2: Grid):
         for x in range(len(grid1.grid)):
             for y in range(len(grid1[x])):
@@ -1,19 +1,23 @@
+import os
+import subprocess
+import sys
+import tempfile
 import unittest
 from ed_utils.decorators import number
 
 from layers import green, red, blue
 from grid import Grid
-from main import MyWindow
+from session import DrawingSession, cells_on_segment
 
 class FakeWindow:
     def __init__(self, grid: Grid):
         self.grid = grid
 
-FakeWindow.on_init = MyWindow.on_init
-FakeWindow.on_reset = MyWindow.on_reset
-FakeWindow.on_paint = MyWindow.on_paint
-FakeWindow.on_increase_brush_size = MyWindow.on_increase_brush_size
-FakeWindow.on_decrease_brush_size = MyWindow.on_decrease_brush_size
+FakeWindow.on_init = DrawingSession.on_init
+FakeWindow.on_reset = DrawingSession.on_reset
+FakeWindow.on_paint = DrawingSession.on_paint
+FakeWindow.on_increase_brush_size = DrawingSession.on_increase_brush_size
+FakeWindow.on_decrease_brush_size = DrawingSession.on_decrease_brush_size
 
 class TestGrid(unittest.TestCase):
 
@@ -83,6 +87,54 @@ class TestGrid(unittest.TestCase):
 
         self.assertGridEqual(grid, control_grid)
 
+    @number("6.3")
+    def test_segment_traversal(self):
+        # Dense sampling along the segment finds every crossed square.
+        segments = [
+            (0.5, 0.5, 97.3, 41.2), (97.3, 41.2, 0.5, 0.5), (10, 10, 10, 90),
+            (90, 15, 5, 15), (0, 0, 60, 60), (33.3, 7.1, 34.9, 8.2), (5, 5, 5, 5),
+        ]
+        for x0, y0, x1, y1 in segments:
+            cells = list(cells_on_segment(x0, y0, x1, y1, 10, 20))
+            self.assertEqual(len(cells), len(set(cells)), "A square was visited twice")
+            prev = (int(x0 // 10), int(y0 // 20))
+            self.assertNotIn(prev, cells)
+            for cell in cells:
+                self.assertEqual(abs(cell[0] - prev[0]) + abs(cell[1] - prev[1]), 1, "Squares should be adjacent")
+                prev = cell
+            self.assertEqual(prev, (int(x1 // 10), int(y1 // 20)))
+            sampled = set()
+            for d in range(10001):
+                t = d / 10000
+                sampled.add((int((x0 + t * (x1 - x0)) // 10), int((y0 + t * (y1 - y0)) // 20)))
+            sampled.discard((int(x0 // 10), int(y0 // 20)))
+            self.assertTrue(sampled <= set(cells), "A crossed square was skipped")
+
+    @number("6.4")
+    def test_headless_session(self):
+        # The engine runs without arcade.
+        code = "import sys, session; print('arcade' in sys.modules)"
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.strip(), "False")
+
+        with tempfile.TemporaryDirectory() as directory:
+            session = DrawingSession(Grid.DRAW_STYLE_SEQUENCE, 6, 4)
+            session.JOURNAL_PATH = os.path.join(directory, "session.journal")
+            session.setup()
+            session.on_paint(red, 1, 1)
+            session.on_paint(blue, 4, 2)
+            session.on_undo()
+            session.on_special()
+            session.close_journal()
+
+            recovered = DrawingSession()
+            recovered.JOURNAL_PATH = session.JOURNAL_PATH
+            recovered.setup()
+            recovered.close_journal()
+            self.assertEqual((recovered.draw_style, recovered.GRID_SIZE_X, recovered.GRID_SIZE_Y), (Grid.DRAW_STYLE_SEQUENCE, 6, 4))
+            self.assertGridEqual(recovered.grid, session.grid)
+            self.assertEqual(len(recovered.timeline), len(session.timeline))
+
     def assertGridEqual(self, grid1: Grid, grid2: Grid):
         for x in range(len(grid1.grid)):
             for y in range(len(grid1[x])):
@@ -0,0 +1,222 @@
+"""
+Batch rendering of saved sessions to PNG thumbnails, across a process pool.
+
+Every session journal (see journal.py) and saved grid (see Grid.save) under the
+input directory is loaded into a Grid, replaying the journal's last session, and
+rendered with no window to a PNG in the output directory, at the same relative path
+with .png added. The longest side of each image is at most --size pixels: small grids
+are scaled up by the largest whole number of pixels per square that fits, so each square
+stays sharp, and grids larger than --size are sampled down to exactly --size.
+
+Each worker process is replaced after --tasks-per-child sessions, so that one large
+session does not keep a worker's memory high for the rest of the batch, and only a
+few sessions per worker are queued at a time. Images are written to a temporary file
+and then renamed, so an interrupted batch leaves no partial images: running it again
+skips the images newer than their session and rendered at the same --size, and renders
+the rest. Each image records its --size in a tEXt chunk for this. --force renders every
+session again, still through a temporary file, so existing images are only replaced.
+
+    python thumbnails.py sessions/ [-o thumbnails/] [--size 128] [--workers 4] [--plugin palette] [--force]
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from grid import Grid
+from journal import MAGIC
+from layer_util import register_plugin
+from render import read_png_text, render_rgb, write_image
+from replay_cli import load_session, peak_rss
+
+OUTPUT_SUFFIX = ".png"
+# The tEXt key the --size an image was rendered at is recorded under.
+SIZE_KEY = "Thumbnail-Size"
+
+
+def session_kind(path: str) -> str | None:
+    """ "journal" or "grid" for the session files this reads, by their magic bytes, None for any other file. """
+    try:
+        with open(path, "rb") as f:
+            head = f.read(max(len(MAGIC), len(Grid.FILE_MAGIC)))
+    except OSError:
+        return None
+    if head.startswith(MAGIC):
+        return "journal"
+    if head.startswith(Grid.FILE_MAGIC):
+        return "grid"
+    return None
+
+
+def load_grid(path: str) -> Grid:
+    """
+    Loads a saved grid, or replays the last session of a journal onto a new grid.
+
+    :raises ValueError: if the file is not a session file, or holds no session
+    """
+    kind = session_kind(path)
+    if kind == "grid":
+        return Grid.load(path)
+    if kind != "journal":
+        raise ValueError(f"{path} is not a session journal or saved grid")
+    tracker, draw_style, width, height, _ = load_session(path)
+    grid = Grid(draw_style, width, height)
+    tracker.start_replay()
+    tracker.play_to_end(grid)
+    return grid
+
+
+def shrink(pixels: bytes, width: int, height: int, new_width: int, new_height: int) -> bytearray:
+    """ Samples packed RGB rows down to new_width x new_height, taking the nearest pixel. """
+    columns = [3 * (x * width // new_width) for x in range(new_width)]
+    out = bytearray()
+    for y in range(new_height):
+        row = 3 * width * (y * height // new_height)
+        for column in columns:
+            out += pixels[row + column:row + column + 3]
+    return out
+
+
+def render_thumbnail(source: str, output: str, size: int, timestamp: float = 0) -> tuple[int, int]:
+    """
+    Renders a session file to a PNG whose longest side is at most size pixels (see the module
+    docstring), and returns its width and height.
+    The image is written to a temporary file first, then renamed over output.
+    """
+    grid = load_grid(source)
+    try:
+        x_size, y_size = len(grid.grid), len(grid.grid[0])
+        longest = max(x_size, y_size)
+        pixels, width, height = render_rgb(grid, max(1, size // longest), timestamp)
+    finally:
+        # A saved grid keeps its file mapped until it is closed.
+        grid.close()
+    if longest > size:
+        new_width, new_height = max(1, x_size * size // longest), max(1, y_size * size // longest)
+        pixels = shrink(pixels, width, height, new_width, new_height)
+        width, height = new_width, new_height
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    # The temporary file keeps the extension, which write_image picks the format by.
+    root, extension = os.path.splitext(output)
+    partial = f"{root}.{os.getpid()}.partial{extension}"
+    try:
+        write_image(partial, pixels, width, height, {SIZE_KEY: str(size)})
+        os.replace(partial, output)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+    return width, height
+
+
+def find_sessions(directory: str, output_directory: str) -> list[tuple[str, str]]:
+    """ (session file, image path) for every session file under directory, in path order. """
+    output_directory = os.path.abspath(output_directory)
+    sessions = []
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = sorted(d for d in dirs if os.path.abspath(os.path.join(root, d)) != output_directory)
+        for name in sorted(files):
+            source = os.path.join(root, name)
+            if session_kind(source) is not None:
+                output = os.path.join(output_directory, os.path.relpath(source, directory) + OUTPUT_SUFFIX)
+                sessions.append((source, output))
+    return sessions
+
+
+def up_to_date(source: str, output: str, size: int) -> bool:
+    """ Whether the image exists, is at least as new as its session file, and was rendered at size. """
+    try:
+        return (os.stat(output).st_mtime_ns >= os.stat(source).st_mtime_ns
+                and read_png_text(output).get(SIZE_KEY) == str(size))
+    except (OSError, ValueError):
+        return False
+
+
+def _init_worker(plugins: list[str]) -> None:
+    # Journals and saved grids refer to layers by index, so the workers register the same plugins.
+    for plugin in plugins:
+        register_plugin(plugin)
+
+
+def render_all(sessions: list[tuple[str, str]], size: int, workers: int | None = None, timestamp: float = 0,
+               tasks_per_child: int = 50, plugins: list[str] = (), on_done=None,
+               force: bool = False) -> dict[str, list[str]]:
+    """
+    Renders every (session file, image path) whose image is not up to date, or every one with force,
+    across a process pool.
+    Returns the session files "rendered", "skipped" as up to date, and "failed", with
+    on_done(source, error or None) called as each one finishes.
+    """
+    result = {"rendered": [], "skipped": [], "failed": []}
+    pending = []
+    for source, output in sessions:
+        if not force and up_to_date(source, output, size):
+            result["skipped"].append(source)
+        else:
+            pending.append((source, output))
+    if not pending:
+        return result
+    workers = max(1, min(workers or os.cpu_count() or 1, len(pending)))
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(list(plugins),),
+                             max_tasks_per_child=tasks_per_child) as pool:
+        queued = {}
+        work = iter(pending)
+        while True:
+            # Only a couple of sessions per worker are queued, so the queue stays small for any batch.
+            for source, output in work:
+                queued[pool.submit(render_thumbnail, source, output, size, timestamp)] = source
+                if len(queued) >= 2 * workers:
+                    break
+            if not queued:
+                break
+            done, _ = wait(queued, return_when=FIRST_COMPLETED)
+            for future in done:
+                source = queued.pop(future)
+                error = future.exception()
+                result["failed" if error else "rendered"].append(source)
+                if on_done is not None:
+                    on_done(source, error)
+    return result
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    p.add_argument("directory", help="directory of session journals and saved grids")
+    p.add_argument("-o", "--output", default="thumbnails", help="directory for the images (default: %(default)s)")
+    p.add_argument("--size", type=int, default=128, help="most pixels on the longest side of the images (default: %(default)s)")
+    p.add_argument("--workers", type=int, help="worker processes (default: one per core)")
+    p.add_argument("--tasks-per-child", type=int, default=50,
+                   help="sessions a worker renders before it is replaced (default: %(default)s)")
+    p.add_argument("--timestamp", type=float, default=0, help="timestamp to render at (default: %(default)s)")
+    p.add_argument("--plugin", action="append", default=[], help="layer plugin module to register, in order")
+    p.add_argument("--force", action="store_true", help="render every session, even if its image is up to date")
+    args = p.parse_args(argv)
+    if args.size <= 0:
+        p.error("size should be positive")
+    if not os.path.isdir(args.directory):
+        p.error(f"{args.directory} is not a directory")
+
+    sessions = find_sessions(args.directory, args.output)
+
+    def report(source: str, error: BaseException | None) -> None:
+        if error is not None:
+            print(f"failed:   {source}: {error}", file=sys.stderr)
+
+    start = time.perf_counter()
+    result = render_all(sessions, args.size, args.workers, args.timestamp, args.tasks_per_child, args.plugin, report,
+                        args.force)
+    seconds = time.perf_counter() - start
+    rendered = len(result["rendered"])
+    # The pool has shut down, so every worker has finished and is counted.
+    rss = peak_rss(children=True)
+    print(f"sessions: {len(sessions)} ({rendered} rendered, {len(result['skipped'])} up to date, "
+          f"{len(result['failed'])} failed)")
+    print(f"time:     {seconds:8.3f} s")
+    print(f"sessions/s {rendered / seconds if seconds else float('inf'):11.1f}")
+    print(f"peak RSS  {'n/a' if rss is None else f'{rss / 2**20:10.1f} MiB'} (largest worker)")
+    return 1 if result["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
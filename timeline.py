@@ -0,0 +1,173 @@
+from __future__ import annotations
+"""
+History timeline, to show the canvas as it was after any number of actions.
+"""
+
+from bisect import bisect_right
+from action import PaintAction
+from grid import Grid, GridSnapshot
+
+
+class HistoryTimeline:
+    """
+    Records the same actions as the replay, and can seek to the canvas after any of them.
+
+    The timeline takes a snapshot of its grid (a keyframe) every `keyframe_interval` actions,
+    or sooner once `keyframe_cells` squares have changed.
+    seek(k) restores the last keyframe at or before k and applies the few actions after it.
+    Snapshots share unchanged tiles, so keyframes only cost the tiles changed between them.
+
+    The grid seeks are shown on is only built on the first seek, and release() drops it again,
+    so a session which is never scrubbed does not hold a second grid. Keyframes are taken as
+    that grid is played forward, and while it is not shown or behind, by playing the actions after
+    the last keyframe on a grid built for the purpose. So every seek applies at most a keyframe's worth of actions.
+    By default the whole history is kept. With `max_entries`, only about the last `max_entries`
+    actions are: once twice as many are recorded, the older ones are dropped, up to a keyframe,
+    and `start` is the first action left.
+    """
+
+    DEFAULT_KEYFRAME_INTERVAL = 64
+    DEFAULT_KEYFRAME_CELLS = 4096
+    DEFAULT_MAX_ENTRIES = None
+
+# Explanation coding concept:
+# The timeline starts with a keyframe of the empty grid at position 0, made without building a grid.
+# position is the number of actions applied to self.grid, when there is one.
+
+# Complexity analysis:
+# O(1), since the tiles of the empty keyframe all share the same tuple and no grid is built.
+    def __init__(self, draw_style: str, x: int, y: int,
+                 keyframe_interval: int = DEFAULT_KEYFRAME_INTERVAL,
+                 keyframe_cells: int = DEFAULT_KEYFRAME_CELLS,
+                 max_entries: int | None = DEFAULT_MAX_ENTRIES) -> None:
+        self.keyframe_interval = keyframe_interval
+        self.keyframe_cells = keyframe_cells
+        self.max_entries = max_entries
+        self.grid = None
+        self.entries = []
+        self.start = 0
+        self.position = 0
+        self.changed_cells = 0
+        self.unplayed_cells = 0
+        self.keyframe_positions = [0]
+        self.keyframes = [GridSnapshot.empty(draw_style, x, y)]
+
+    def __len__(self) -> int:
+        """ The number of actions recorded, including the ones dropped before start. """
+        return self.start + len(self.entries)
+
+# Explanation coding concept:
+# Record the action, and apply it straight away if the timeline grid is showing the latest action,
+# so that keyframes keep being taken while the grid is shown.
+# Otherwise count the actions and cells since the last keyframe, and catch up once a keyframe is due.
+# Once the entries reach twice max_entries, the older ones are dropped, see _trim.
+
+# Complexity analysis:
+# O(Comp(apply)) plus the cost of a snapshot when a keyframe is due.
+# Catching up is O(x*y + N*Comp(apply)) for the keyframe interval N, once every N actions at most.
+# Trimming is O(max_entries * Comp(apply)) at worst, once every max_entries actions, so O(Comp(apply)) amortised.
+    def add_action(self, action: PaintAction, is_undo: bool = False) -> None:
+        """
+        Adds an action to the timeline, with the same arguments as ReplayTracker.add_action.
+        """
+        self.entries.append((action, is_undo))
+        if self.grid is not None and self.position == len(self) - 1:
+            self._step_forward()
+        else:
+            self.unplayed_cells += self._cells(action)
+            if (len(self) - self.keyframe_positions[-1] >= self.keyframe_interval
+                    or self.unplayed_cells >= self.keyframe_cells):
+                self._catch_up()
+        if self.max_entries is not None and len(self.entries) >= 2 * self.max_entries:
+            self._trim()
+
+    def _cells(self, action: PaintAction) -> int:
+        """ The number of squares an action changes, every square for a special. """
+        if action.is_special:
+            return self.keyframes[0].x * self.keyframes[0].y
+        return len(action)
+
+    def _catch_up(self) -> None:
+        """
+        Takes the keyframes due after the last one, on a grid built from it,
+        leaving the timeline grid (if any) where it was.
+        """
+        shown, position, changed_cells = self.grid, self.position, self.changed_cells
+        self.grid = None
+        self.seek(len(self))
+        # The cells changed since the last keyframe, which this grid is about to forget.
+        self.unplayed_cells = self.changed_cells
+        self.grid, self.position, self.changed_cells = shown, position, changed_cells
+
+    def _step_forward(self) -> None:
+        """ Applies the next recorded action to the grid, taking a keyframe if one is due. """
+        action, is_undo = self.entries[self.position - self.start]
+        if is_undo:
+            action.undo_apply(self.grid)
+        else:
+            action.redo_apply(self.grid)
+        self.position += 1
+        self.changed_cells += self._cells(action)
+        if self.position > self.keyframe_positions[-1] and (
+                self.position - self.keyframe_positions[-1] >= self.keyframe_interval
+                or self.changed_cells >= self.keyframe_cells):
+            self.keyframe_positions.append(self.position)
+            self.keyframes.append(self.grid.snapshot())
+            self.changed_cells = 0
+
+# Explanation coding concept:
+# The grid is played forward to the last action, so that there are keyframes up to it.
+# Then everything before the last keyframe which still leaves max_entries actions is dropped:
+# the entries before it, and the keyframes before it.
+# If there was no grid before, it is dropped again.
+
+# Complexity analysis:
+# Let n be the number of entries, 2 * max_entries.
+# Worst case: O(n * Comp(apply)), when the grid has to be built and played from the first keyframe.
+# Best case: O(n), to move the entries left down the list.
+    def _trim(self) -> None:
+        shown = self.grid is not None
+        self.seek(len(self))
+        keep = bisect_right(self.keyframe_positions, len(self) - self.max_entries) - 1
+        cut = self.keyframe_positions[keep]
+        del self.keyframe_positions[:keep]
+        del self.keyframes[:keep]
+        del self.entries[:cut - self.start]
+        self.start = cut
+        if not shown:
+            self.release()
+
+# Explanation coding concept:
+# Find the last keyframe at or before k with a binary search.
+# If there is no grid yet, it is built from that keyframe.
+# If the grid is already between that keyframe and k, keep going forward from where it is.
+# Otherwise restore the keyframe (only the tiles that differ are written) and go forward from there.
+
+# Complexity analysis:
+# Let N be the keyframe interval and K the number of keyframes.
+# Worst case: O(log K + Comp(restore) + N*Comp(apply)), since there is a keyframe within N actions of every k.
+# O(x*y) more when the grid is built.
+# Best case: O(log K), when the grid is already at k.
+    def seek(self, k: int) -> Grid:
+        """
+        Makes the timeline grid show the canvas after the first k actions, and returns it.
+        k is clamped to [start, len(self)].
+        """
+        k = max(self.start, min(k, len(self)))
+        keyframe = bisect_right(self.keyframe_positions, k) - 1
+        start = self.keyframe_positions[keyframe]
+        if self.grid is None:
+            self.grid = self.keyframes[keyframe].to_grid()
+            self.position = start
+            self.changed_cells = 0
+        elif not start <= self.position <= k:
+            self.grid.restore(self.keyframes[keyframe])
+            self.position = start
+            self.changed_cells = 0
+        while self.position < k:
+            self._step_forward()
+        return self.grid
+
+    def release(self) -> None:
+        """ Drops the timeline grid, which the next seek builds again from a keyframe. """
+        self.grid = None
@@ -1,55 +1,102 @@
 from __future__ import annotations
 from action import PaintAction
-from data_structures.stack_adt import ArrayStack
+from data_structures.queue_adt import CircularQueue
 from grid import Grid
 
 
 class UndoTracker:
+    """
+    Undo / redo history, bounded by an estimated memory budget rather than a number of actions.
+    When the history grows past the budget, the oldest actions are forgotten first,
+    so the most recent work can always be undone.
+
+    Counters:
+        len(tracker): number of actions held, undoable and redoable.
+        memory_used: estimated bytes held by those actions, see PaintAction.nbytes.
+        evictions: number of actions forgotten to stay within the budget.
+
+    on_evict, if set, is called with each action forgotten, for example so a journal can forget it too.
+    """
+
+    DEFAULT_MEMORY_BUDGET = 32 * 1024 * 1024
+    INITIAL_CAPACITY = 16
 
 # Explanation coding concept:
-# Initialise the self.action_list to create a ArrayStack with 100000 capacity
-# Initialise the self.undo_action to create a ArrayStack with 100000 capacity
+# Initialise the self.action_list with a growable CircularQueue of the actions that can be undone,
+# oldest at the front and newest at the rear.
+# Initialise the self.undo_action with a growable CircularQueue of the actions that can be redone.
+# Both ends of a CircularQueue can be removed from in O(1): the rear with pop, like a stack (undo / redo),
+# and the front with serve, to evict the oldest history.
+# Initialise the counters of the memory used and the evictions, and no callback for the evictions.
 
 # Time complexity analysis:
-# ArrayStack which is O(max_capacity) since the parameter is a constant.
-# Thus the time complexity is linear time O(1).
-    def __init__(self):
-        self.action_list = ArrayStack(1000)
-        self.undo_action = ArrayStack(1000)
+# The queues start with a constant capacity, so the time complexity is O(1).
+    def __init__(self, memory_budget: int = DEFAULT_MEMORY_BUDGET):
+        self.memory_budget = memory_budget
+        self.action_list = CircularQueue(self.INITIAL_CAPACITY, growable=True)
+        self.undo_action = CircularQueue(self.INITIAL_CAPACITY, growable=True)
+        self.memory_used = 0
+        self.evictions = 0
+        self.on_evict = None
+
+    def __len__(self) -> int:
+        return len(self.action_list) + len(self.undo_action)
 
 # Explanation coding concept:
 # This add_function is add the action to the action_list.
-# First, checking the action_list is full or not.
-# If the action_list is full do nothing and return None.
-# Otherwise, add the action to the action_list by implementing push method.
+# The estimated size of the action is added to memory_used.
+# If this takes the history over the memory budget, the oldest actions are evicted.
 
 # Time complexity analysis:
-# The is_full and push method is O(1).
-# In worst case, O(1)*O(1)+O(1) = O(1).
-# In best case, the action_list is full and return None, thus time complexity is O(1)
+# The append method is O(1) amortised.
+# Worst case: O(e), where e is the number of actions evicted.
+# Best case: O(1), when nothing has to be evicted.
     def add_action(self, action: PaintAction) -> None:
         """
         Adds an action to the undo tracker.
 
-        If your collection is already full,
-        feel free to exit early and not add the action.
+        If the history is over its memory budget afterwards,
+        the oldest actions are forgotten until it fits again.
         """
-        if not self.action_list.is_full():
-            self.action_list.push(action)
+        self.action_list.append(action)
+        self.memory_used += action.nbytes()
+        self._evict()
         return None
 
+# Explanation coding concept:
+# While the memory budget is exceeded, forget the oldest undoable action.
+# The newest undoable action is always kept.
+# If only that one is left, forget the redoable actions that would be redone last.
+
+# Time complexity analysis:
+# Worst case: O(e), where e is the number of actions evicted.
+# Best case: O(1), when the history is within budget.
+    def _evict(self) -> None:
+        """ Forgets the oldest actions until the history fits the memory budget. """
+        while self.memory_used > self.memory_budget:
+            if len(self.action_list) > 1:
+                evicted = self.action_list.serve()
+            elif not self.undo_action.is_empty():
+                evicted = self.undo_action.serve()
+            else:
+                return
+            self.memory_used -= evicted.nbytes()
+            self.evictions += 1
+            if self.on_evict is not None:
+                self.on_evict(evicted)
+
 # Explanation coding concept:
 # This undo function is to undo the last action in action_list.
 # First, checking the action_list is empty or not.
 # If the action_list is empty, do nothing and return None.
-# If the action_list is not empty, popping the top item in action_list.
+# If the action_list is not empty, popping the newest item in action_list.
 # Then implementing undo_apply with the parameter grid.
-# After undo, push the item into the undo_action for redo used.
+# After undo, append the item to the undo_action for redo used.
 # Returning undo at last.
 
 # Time complexity analysis:
 # Due to the is_empty method is O(1).So for the first comparison is O(1).
-# The time complexity of pop, undo_apply, and push method is constant, so Big-O notation is O(1).
+# The time complexity of pop, undo_apply, and append method is constant, so Big-O notation is O(1).
 # For undo_apply function, if the draw style is sequence layer store, time complexity is O(n^2*Comp==). Otherwise, O(1)
 # Worst case = O(1)*(O(1)+O(1)+O(1)+O(1)) =O(1)(For SET and ADD layer store) | O(1)*(O(1)+O(n^2*Comp==)+O(1)+O(1)) =O(n^2*Comp==)(For SEQUENCE layer store)
 # In best case, the action_list is empty, thus just return statement which is O(1).
@@ -63,7 +110,7 @@ class UndoTracker:
         if not self.action_list.is_empty():
             undo = self.action_list.pop()
             undo.undo_apply(grid)
-            self.undo_action.push(undo)
+            self.undo_action.append(undo)
             return undo
         return None
 
@@ -71,14 +118,14 @@ class UndoTracker:
 # This function is to redo the last action done by undo.
 # First, checking the undo_action is empty or not.
 # If the undo_action is empty, then do nothing and return None.
-# Otherwise, popping the top action in undo_action and assign it to redo variable.
+# Otherwise, popping the newest action in undo_action and assign it to redo variable.
 # Apply the redo with redo_apply.
-# After the action redo, pushing the redo variable to the action_list.
+# After the action redo, appending the redo variable to the action_list.
 # Lastly, return the redo variable.
 
 # Time complexity analysis:
 # Due to the is_empty method is O(1).So for the first comparison is O(1).
-# The time complexity of pop, redo_apply, and push method is constant, so Big-O notation is O(1).
+# The time complexity of pop, redo_apply, and append method is constant, so Big-O notation is O(1).
 # For redo_apply function, if the draw style is sequence layer store, time complexity is O(n^2*Comp==). Otherwise, O(1)
 # Worst case = O(1)*(O(1)+O(1)+O(1)+O(1)) =O(1)(For SET and ADD layer store) | O(1)*(O(1)+O(n^2*Comp==)+O(1)+O(1)) =O(n^2*Comp==)(For SEQUENCE layer store)
 # In best case, the action_list is empty, thus just return statement which is O(1).
@@ -92,6 +139,6 @@ class UndoTracker:
         if not self.undo_action.is_empty():
             redo = self.undo_action.pop()
             redo.redo_apply(grid)
-            self.action_list.push(redo)
+            self.action_list.append(redo)
             return redo
         return None